@@ -0,0 +1,163 @@
+# audio/endpointing.py
+
+"""
+Adaptive end-of-turn detection.
+
+VAD reports where speech pauses; deciding that the *turn* is over takes a
+guess about whether the speaker will carry on. Instead of a fixed hangover
+after every VAD end event, an Endpointer picks one per pause from:
+
+  - the speaker's own pause distribution (pauses inside their turns, and
+    turns that were cut off because they resumed right after we committed)
+  - the trailing punctuation / last word of the partial transcript
+  - the utterance length so far
+  - how the speech probability decayed into the pause
+
+EndpointStats aggregates the resulting turn-taking latency (end of speech to
+turn commit) across sessions for p50/p95 reporting.
+"""
+
+import re
+import time
+from collections import deque
+import numpy as np
+
+# Endings that suggest the thought is complete, or very much not.
+_FINAL_PUNCTUATION = re.compile(r"[.?!।]['\")\]]*$")
+_CONTINUATION = re.compile(
+    r"(,|;|:|-|\.\.\.|…|\b(?:and|but|or|so|because|if|the|a|to|of|with|aur|ki|ke|ko|toh|to|lekin|par|matlab|ya)\b)$",
+    re.IGNORECASE,
+)
+
+
+class EndpointStats:
+    """Rolling turn-taking latency samples shared by every session."""
+
+    def __init__(self, window: int = 1000):
+        self.latencies = deque(maxlen=window)
+        self.hangovers = deque(maxlen=window)
+        self.turns = 0
+        self.resumed_after_commit = 0
+
+    def record(self, latency: float, hangover: float):
+        self.turns += 1
+        self.latencies.append(latency)
+        self.hangovers.append(hangover)
+
+    def stats(self) -> dict:
+        def pct(values, q):
+            return round(float(np.percentile(values, q)) * 1000, 1) if values else None
+        return {
+            "turns": self.turns,
+            "turn_latency_p50_ms": pct(self.latencies, 50),
+            "turn_latency_p95_ms": pct(self.latencies, 95),
+            "hangover_p50_ms": pct(self.hangovers, 50),
+            "hangover_p95_ms": pct(self.hangovers, 95),
+            "resumed_after_commit": self.resumed_after_commit,
+        }
+
+
+class Endpointer:
+    """
+    Per-session hangover policy. The server calls:
+
+        observe(prob)             for every VAD window while the user speaks
+        speech_ended(samples)     on a VAD end event; returns the hangover (s)
+        transcript_ready(text)    once the utterance so far is transcribed, if
+                                  that happens within the hangover; returns the
+                                  hangover revised by the text's last words
+        speech_resumed()          on a VAD start event
+        turn_committed()          when the end-of-turn timer fires
+
+    silence_already_s is the silence VAD has already waited through before
+    reporting the end event (its min_silence_duration_ms); the hangover
+    only covers what is left of the target pause.
+    """
+
+    def __init__(self, stats: EndpointStats = None, sample_rate: int = 16000, silence_already_s: float = 0.1,
+                 min_hangover_s: float = 0.15, max_hangover_s: float = 1.2, default_pause_s: float = 0.6,
+                 history: int = 40):
+        self.stats = stats
+        self.sample_rate = sample_rate
+        self.silence_already_s = silence_already_s
+        self.min_hangover_s = min_hangover_s
+        self.max_hangover_s = max_hangover_s
+        self.default_pause_s = default_pause_s
+        # Pauses this speaker made inside a turn (seconds of silence before they carried on).
+        self.pauses = deque(maxlen=history)
+        self._recent_probs = deque(maxlen=10)
+        # What the hangover of the current pause was based on, for transcript_ready.
+        self._ended_probs = ()
+        self._ended_samples = 0
+        self._speech_end_time = None
+        self._committed_at = None
+        self._hangover = 0.0
+
+    def observe(self, speech_prob: float):
+        self._recent_probs.append(speech_prob)
+
+    def target_pause(self) -> float:
+        """Silence after which this speaker has usually finished (seconds)."""
+        if len(self.pauses) < 5:
+            return self.default_pause_s
+        # A little above the pauses they make mid-turn.
+        return float(np.percentile(self.pauses, 90)) * 1.15
+
+    def hangover(self, partial_text: str = "", utterance_samples: int = 0, recent_probs=None) -> float:
+        pause = self.target_pause()
+        recent_probs = self._recent_probs if recent_probs is None else recent_probs
+
+        text = (partial_text or "").strip()
+        if _FINAL_PUNCTUATION.search(text):
+            pause *= 0.6
+        elif _CONTINUATION.search(text):
+            pause *= 1.4
+
+        # Short replies ("haan", "yes", "okay") are usually complete.
+        if 0 < utterance_samples < self.sample_rate:
+            pause *= 0.8
+
+        # Speech that faded out into the pause tends to be a finished phrase;
+        # a confident voice cut off abruptly tends to be mid-sentence.
+        if recent_probs:
+            if max(recent_probs) < 0.8:
+                pause *= 0.85
+            elif min(recent_probs) > 0.9:
+                pause *= 1.15
+
+        return min(self.max_hangover_s, max(self.min_hangover_s, pause - self.silence_already_s))
+
+    def speech_ended(self, partial_text: str = "", utterance_samples: int = 0) -> float:
+        """Marks a VAD end event and returns how long to wait before committing the turn."""
+        self._speech_end_time = time.monotonic() - self.silence_already_s
+        self._ended_probs = tuple(self._recent_probs)
+        self._ended_samples = utterance_samples
+        self._hangover = self.hangover(partial_text, utterance_samples, self._ended_probs)
+        self._recent_probs.clear()
+        return self._hangover
+
+    def transcript_ready(self, partial_text: str) -> float:
+        """The current pause's hangover, now that the speech before it is transcribed."""
+        self._hangover = self.hangover(partial_text, self._ended_samples, self._ended_probs)
+        return self._hangover
+
+    def speech_resumed(self):
+        now = time.monotonic()
+        if self._speech_end_time is not None:
+            # A pause inside the turn.
+            self.pauses.append(now - self._speech_end_time)
+        elif self._committed_at is not None and now - self._committed_at < self.max_hangover_s:
+            # They carried on just after we ended the turn: that pause was
+            # too short to mean "done" for this speaker.
+            self.pauses.append(now - self._committed_at + self._hangover + self.silence_already_s)
+            if self.stats:
+                self.stats.resumed_after_commit += 1
+        self._speech_end_time = None
+        self._committed_at = None
+
+    def turn_committed(self):
+        now = time.monotonic()
+        if self._speech_end_time is not None and self.stats:
+            self.stats.record(now - self._speech_end_time, self._hangover)
+        self._speech_end_time = None
+        self._committed_at = now
@@ -0,0 +1,84 @@
+# audio/framing.py
+
+"""
+Binary framing for microphone audio on the /ws route.
+
+Every binary WebSocket message carries one frame: an 8-byte little-endian
+header followed by raw mono PCM at 16 kHz.
+
+    offset  size  field
+    0       2     magic, always b"VA"
+    2       1     protocol version (1)
+    3       1     sample format (0 = int16, 1 = float32)
+    4       4     frame sequence number (uint32, wraps)
+
+Text messages stay JSON and are only used for control traffic
+(text_message, etc.).
+"""
+
+import struct
+import numpy as np
+
+FRAME_MAGIC = b"VA"
+FRAME_VERSION = 1
+FORMAT_PCM16 = 0
+FORMAT_FLOAT32 = 1
+
+FRAME_HEADER = struct.Struct("<2sBBI")
+FRAME_HEADER_SIZE = FRAME_HEADER.size
+
+PCM16_SCALE = 1.0 / 32768.0
+
+_SAMPLE_DTYPES = {
+    FORMAT_PCM16: np.dtype("<i2"),
+    FORMAT_FLOAT32: np.dtype("<f4"),
+}
+
+
+class FrameError(ValueError):
+    """Raised when a binary message is not a valid audio frame."""
+
+
+def decode_audio_frame(payload: bytes):
+    """
+    Parses one binary frame and returns (sequence, samples).
+    `samples` is a read-only numpy view over `payload`; nothing is copied.
+    """
+    if len(payload) < FRAME_HEADER_SIZE:
+        raise FrameError(f"Frame too short: {len(payload)} bytes")
+
+    magic, version, sample_format, sequence = FRAME_HEADER.unpack_from(payload)
+    if magic != FRAME_MAGIC or version != FRAME_VERSION:
+        raise FrameError(f"Unsupported frame header: magic={magic!r} version={version}")
+
+    dtype = _SAMPLE_DTYPES.get(sample_format)
+    if dtype is None:
+        raise FrameError(f"Unsupported sample format: {sample_format}")
+    if (len(payload) - FRAME_HEADER_SIZE) % dtype.itemsize:
+        raise FrameError("Frame payload is not a whole number of samples")
+
+    samples = np.frombuffer(payload, dtype=dtype, offset=FRAME_HEADER_SIZE)
+    return sequence, samples
+
+
+def write_float32(samples: np.ndarray, out: np.ndarray):
+    """
+    Converts decoded frame samples into float32 in [-1, 1), writing straight
+    into `out` (which must have the same length) without a temporary array.
+    """
+    if samples.dtype.kind == "i":
+        np.multiply(samples, PCM16_SCALE, out=out, casting="unsafe")
+    else:
+        np.copyto(out, samples, casting="same_kind")
+
+
+def encode_audio_frame(samples: np.ndarray, sequence: int = 0) -> bytes:
+    """Builds a frame from int16 or float32 samples (used by test clients)."""
+    if samples.dtype == np.int16:
+        sample_format = FORMAT_PCM16
+    elif samples.dtype == np.float32:
+        sample_format = FORMAT_FLOAT32
+    else:
+        raise FrameError(f"Unsupported sample dtype: {samples.dtype}")
+    header = FRAME_HEADER.pack(FRAME_MAGIC, FRAME_VERSION, sample_format, sequence & 0xFFFFFFFF)
+    return header + samples.astype(samples.dtype.newbyteorder("<"), copy=False).tobytes()
@@ -0,0 +1,100 @@
+# audio/inferenceExecutor.py
+
+"""
+Dedicated executor for model inference.
+
+Forward passes run on a small, explicitly sized thread pool instead of the
+asyncio event loop, so a VAD batch never stalls other sockets (including TTS
+audio being streamed out). Torch and ONNX Runtime thread counts are set here
+rather than left at their defaults, which size themselves to every core and
+oversubscribe the CPU once several batches run at the same time.
+"""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+def parse_cpu_list(spec: str):
+    """Parses a CPU list like "0-3,6" into a set of CPU ids (None if empty)."""
+    if not spec:
+        return None
+    cpus = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if "-" in part:
+            start, end = part.split("-")
+            cpus.update(range(int(start), int(end) + 1))
+        elif part:
+            cpus.add(int(part))
+    return cpus
+
+
+class InferenceExecutor:
+    """
+    Thread pool for inference.
+
+    workers:          concurrent forward passes (batches)
+    intra_op_threads: threads used inside one forward pass
+    inter_op_threads: threads used across independent ops in one pass
+    cpu_affinity:     CPU ids the worker threads are pinned to (Linux only)
+    """
+
+    def __init__(self, workers: int = 2, intra_op_threads: int = 1, inter_op_threads: int = 1, cpu_affinity=None):
+        self.workers = workers
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.cpu_affinity = cpu_affinity
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="inference", initializer=self._init_worker
+        )
+        self._slots = None
+        self.in_flight = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            workers=int(os.getenv("INFERENCE_WORKERS", "2")),
+            intra_op_threads=int(os.getenv("INFERENCE_INTRA_OP_THREADS", "1")),
+            inter_op_threads=int(os.getenv("INFERENCE_INTER_OP_THREADS", "1")),
+            cpu_affinity=parse_cpu_list(os.getenv("INFERENCE_CPU_AFFINITY", "")),
+        )
+
+    def configure_torch(self):
+        """Applies the thread settings to torch; only call this when torch is in use."""
+        import torch
+        torch.set_num_threads(self.intra_op_threads)
+        try:
+            torch.set_num_interop_threads(self.inter_op_threads)
+        except RuntimeError:
+            # Can only be set once, before any inter-op work has started.
+            logging.warning("Torch inter-op thread count was already fixed; leaving it unchanged.")
+
+    def _init_worker(self):
+        if self.cpu_affinity and hasattr(os, "sched_setaffinity"):
+            # On Linux pid 0 pins only the calling (worker) thread.
+            os.sched_setaffinity(0, self.cpu_affinity)
+
+    def ort_session_options(self):
+        """ONNX Runtime session options with this executor's thread settings."""
+        import onnxruntime
+        opts = onnxruntime.SessionOptions()
+        opts.intra_op_num_threads = self.intra_op_threads
+        opts.inter_op_num_threads = self.inter_op_threads
+        opts.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        return opts
+
+    async def run(self, fn, *args):
+        """Runs fn(*args) on a worker thread, waiting for a free worker first."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        async with self._slots:
+            self.in_flight += 1
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+            finally:
+                self.in_flight -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,126 @@
+# audio/ringBuffer.py
+
+"""
+Per-session audio buffers for the /ws ingest path.
+
+AudioRingBuffer holds the incoming mic stream in a fixed block of memory and
+hands out VAD windows as views into it. UtteranceBuffer accumulates the
+speech of one utterance into a single growable array. Neither allocates per
+frame.
+"""
+
+import numpy as np
+
+from audio.framing import write_float32
+
+
+class AudioRingBuffer:
+    """
+    Fixed-capacity float32 ring buffer.
+
+    The storage is mirrored (every sample is written at `i` and `i + capacity`)
+    so any window of up to `capacity` samples is one contiguous slice and can
+    be returned as a view instead of being stitched together at the wrap point.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._storage = np.zeros(2 * capacity, dtype=np.float32)
+        self._written = 0
+        self._read = 0
+        self.dropped_samples = 0
+
+    @property
+    def available(self) -> int:
+        return self._written - self._read
+
+    def write(self, samples: np.ndarray):
+        """
+        Converts decoded frame samples (int16 or float32) directly into the
+        ring. If the reader has fallen behind, the oldest samples are dropped.
+        """
+        n = samples.shape[0]
+        if n > self.capacity:
+            self.dropped_samples += n - self.capacity
+            samples = samples[-self.capacity:]
+            n = self.capacity
+
+        overflow = self.available + n - self.capacity
+        if overflow > 0:
+            self._read += overflow
+            self.dropped_samples += overflow
+
+        start = self._written % self.capacity
+        first = min(n, self.capacity - start)
+        self._store(start, samples[:first])
+        if first < n:
+            self._store(0, samples[first:])
+        self._written += n
+
+    def _store(self, position: int, samples: np.ndarray):
+        end = position + samples.shape[0]
+        write_float32(samples, self._storage[position:end])
+        self._storage[position + self.capacity:end + self.capacity] = self._storage[position:end]
+
+    def read_window(self, size: int):
+        """
+        Returns the next `size` samples as a view into the ring, or None if
+        not enough audio has arrived yet. The view is valid until the next
+        call to write().
+        """
+        if size > self.capacity:
+            raise ValueError(f"Window of {size} samples exceeds ring capacity {self.capacity}")
+        if self.available < size:
+            return None
+        start = self._read % self.capacity
+        self._read += size
+        return self._storage[start:start + size]
+
+    def clear(self):
+        self._read = self._written
+
+
+class UtteranceBuffer:
+    """
+    Growable float32 buffer for one utterance. Capacity doubles when full,
+    so appends are amortised O(1) and the finished utterance is already one
+    contiguous array.
+    """
+
+    def __init__(self, initial_capacity: int = 16000 * 4):
+        self.initial_capacity = initial_capacity
+        self._data = None
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def append(self, samples: np.ndarray):
+        n = samples.shape[0]
+        if self._data is None:
+            self._data = np.empty(max(self.initial_capacity, n), dtype=np.float32)
+        elif self._length + n > self._data.shape[0]:
+            grown = np.empty(max(2 * self._data.shape[0], self._length + n), dtype=np.float32)
+            grown[:self._length] = self._data[:self._length]
+            self._data = grown
+        self._data[self._length:self._length + n] = samples
+        self._length += n
+
+    def view(self) -> np.ndarray:
+        """The audio accumulated so far; invalidated by the next append()."""
+        if self._data is None:
+            return np.empty(0, dtype=np.float32)
+        return self._data[:self._length]
+
+    def take(self) -> np.ndarray:
+        """
+        Hands off the accumulated audio without copying and resets the buffer.
+        The caller owns the returned array; the next append() starts a fresh one.
+        """
+        utterance = self.view()
+        self._data = None
+        self._length = 0
+        return utterance
+
+    def clear(self):
+        self._length = 0
@@ -0,0 +1,162 @@
+# audio/vadBackends.py
+
+"""
+Model backends for the batched VAD engine.
+
+Both backends share one interface, used from inference executor threads:
+
+    new_state()               -> per-stream state (has .current_sample)
+    forward(windows, states)  -> list of speech probabilities
+
+TorchVADBackend runs the Silero JIT (or OnnxWrapper) model through Silero's
+stateless stream_forward. OnnxVADBackend talks to ONNX Runtime directly with
+numpy only, so a server using it never imports torch.
+"""
+
+import os
+import queue
+import sys
+import numpy as np
+
+SILERO_REPO_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vad_model', 'silero-vad-master')
+SILERO_MODEL_DIR = os.path.join(SILERO_REPO_DIR, 'src', 'silero_vad', 'data')
+
+
+class TorchVADBackend:
+    """Wraps a Silero model loaded through torch.hub."""
+
+    name = "jit"
+
+    def __init__(self, model, sampling_rate: int = 16000):
+        # Same local Silero package the model was loaded from via torch.hub.
+        sys.path.insert(0, os.path.join(SILERO_REPO_DIR, 'src'))
+        import torch
+        from silero_vad.utils_vad import VADStreamState, stream_forward
+        self._torch = torch
+        self._state_cls = VADStreamState
+        self._stream_forward = stream_forward
+        self.model = model
+        self.sampling_rate = sampling_rate
+
+    @classmethod
+    def load(cls, sampling_rate: int = 16000, onnx: bool = False):
+        import torch
+        model, _ = torch.hub.load(
+            repo_or_dir=SILERO_REPO_DIR, model='silero_vad',
+            source='local', trust_repo=True, onnx=onnx
+        )
+        return cls(model, sampling_rate)
+
+    def new_state(self):
+        return self._state_cls(self.sampling_rate)
+
+    def forward(self, windows: list, states: list) -> list:
+        x = self._torch.from_numpy(np.stack(windows))
+        return self._stream_forward(self.model, x, states, self.sampling_rate)[:, 0].tolist()
+
+
+class OnnxStreamState:
+    """Recurrent state of one stream for OnnxVADBackend (about 1.3 KB at 16 kHz)."""
+
+    __slots__ = ("state", "context", "current_sample")
+
+    def __init__(self, context_size: int):
+        self.state = np.zeros((2, 1, 128), dtype=np.float32)
+        self.context = np.zeros(context_size, dtype=np.float32)
+        self.current_sample = 0
+
+
+class _SessionSlot:
+    """
+    One InferenceSession plus an IOBinding and input/output buffers sized for
+    the largest batch. Buffers are reused for every call; each batch binds
+    contiguous views over their leading elements.
+    """
+
+    def __init__(self, session, max_batch_size: int, window_size: int, context_size: int, uses_sr: bool, sampling_rate: int):
+        self.session = session
+        self.binding = session.io_binding()
+        self.row_size = context_size + window_size
+        self.input = np.zeros(max_batch_size * self.row_size, dtype=np.float32)
+        self.state = np.zeros(2 * max_batch_size * 128, dtype=np.float32)
+        self.output = np.zeros(max_batch_size, dtype=np.float32)
+        self.state_out = np.zeros(2 * max_batch_size * 128, dtype=np.float32)
+        self.sr = np.array(sampling_rate, dtype=np.int64)
+        self.uses_sr = uses_sr
+
+    def run(self, batch_size: int):
+        b = self.binding
+        b.bind_input('input', 'cpu', 0, np.float32, [batch_size, self.row_size], self.input.ctypes.data)
+        b.bind_input('state', 'cpu', 0, np.float32, [2, batch_size, 128], self.state.ctypes.data)
+        if self.uses_sr:
+            b.bind_input('sr', 'cpu', 0, np.int64, [], self.sr.ctypes.data)
+        b.bind_output('output', 'cpu', 0, np.float32, [batch_size, 1], self.output.ctypes.data)
+        b.bind_output('stateN', 'cpu', 0, np.float32, [2, batch_size, 128], self.state_out.ctypes.data)
+        self.session.run_with_iobinding(b)
+
+
+class OnnxVADBackend:
+    """
+    Silero VAD on ONNX Runtime with full graph optimisation, IOBinding over
+    preallocated buffers and a small pool of sessions (one per concurrent
+    batch). Only numpy and onnxruntime are imported.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_path: str, session_options=None, sampling_rate: int = 16000,
+                 max_batch_size: int = 64, pool_size: int = 1):
+        import onnxruntime
+
+        if sampling_rate not in [8000, 16000]:
+            raise ValueError('OnnxVADBackend does not support sampling rates other than [8000, 16000]')
+        if session_options is None:
+            session_options = onnxruntime.SessionOptions()
+        session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self.model_path = model_path
+        self.sampling_rate = sampling_rate
+        self.max_batch_size = max_batch_size
+        self.window_size = 512 if sampling_rate == 16000 else 256
+        self.context_size = 64 if sampling_rate == 16000 else 32
+
+        providers = ['CPUExecutionProvider']
+        self._slots = queue.Queue()
+        for _ in range(pool_size):
+            session = onnxruntime.InferenceSession(model_path, sess_options=session_options, providers=providers)
+            uses_sr = 'sr' in {i.name for i in session.get_inputs()}
+            if not uses_sr and sampling_rate != 16000:
+                raise ValueError(f'{os.path.basename(model_path)} supports only 16000 sampling rate')
+            self._slots.put(_SessionSlot(session, max_batch_size, self.window_size, self.context_size, uses_sr, sampling_rate))
+
+    @classmethod
+    def load(cls, model_name: str = 'silero_vad.onnx', **kwargs):
+        return cls(os.path.join(SILERO_MODEL_DIR, model_name), **kwargs)
+
+    def new_state(self) -> OnnxStreamState:
+        return OnnxStreamState(self.context_size)
+
+    def forward(self, windows: list, states: list) -> list:
+        batch_size = len(windows)
+        if batch_size > self.max_batch_size:
+            raise ValueError(f"Batch of {batch_size} exceeds max_batch_size {self.max_batch_size}")
+
+        slot = self._slots.get()
+        try:
+            x = slot.input[:batch_size * slot.row_size].reshape(batch_size, slot.row_size)
+            state = slot.state[:2 * batch_size * 128].reshape(2, batch_size, 128)
+            for i, (window, s) in enumerate(zip(windows, states)):
+                x[i, :self.context_size] = s.context
+                x[i, self.context_size:] = window
+                state[:, i] = s.state[:, 0]
+
+            slot.run(batch_size)
+
+            state_out = slot.state_out[:2 * batch_size * 128].reshape(2, batch_size, 128)
+            for i, s in enumerate(states):
+                s.state[:, 0] = state_out[:, i]
+                s.context[:] = x[i, -self.context_size:]
+                s.current_sample += self.window_size
+            return slot.output[:batch_size].tolist()
+        finally:
+            self._slots.put(slot)
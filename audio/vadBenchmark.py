@@ -0,0 +1,266 @@
+# audio/vadBenchmark.py
+
+"""
+Benchmarks the available Silero VAD variants on this machine and picks one.
+
+Each variant (the TorchScript model and every bundled .onnx graph) is loaded
+in its own subprocess so its memory footprint can be measured in isolation.
+For each one we record:
+
+  - per-window latency (p50/p95, batch of 1)
+  - batched throughput (windows/s at --batch-size)
+  - resident memory added by loading and running the model
+  - agreement of its speech probabilities with the reference (JIT) model
+
+The fastest variant whose probabilities stay within --tolerance of the
+reference is selected and written to a selection file keyed by a host
+fingerprint, so later boots on the same machine skip the benchmark.
+
+Usage:
+    python -m audio.vadBenchmark [--audio clip.wav] [--force]
+"""
+
+import argparse
+import hashlib
+from importlib import metadata
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import wave
+import numpy as np
+
+from audio.vadBackends import SILERO_MODEL_DIR
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SELECTION_FILE = os.path.join(REPO_ROOT, ".cache", "vad_selection.json")
+SAMPLE_RATE = 16000
+WINDOW_SIZE = 512
+REFERENCE_VARIANT = "jit"
+
+
+def available_variants() -> list:
+    variants = [REFERENCE_VARIANT]
+    for name in sorted(os.listdir(SILERO_MODEL_DIR)):
+        if name.endswith(".onnx"):
+            variants.append(f"onnx:{name}")
+    return variants
+
+
+def host_fingerprint() -> dict:
+    cpu_model = platform.processor()
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    cpu_model = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    versions = {}
+    for module in ("onnxruntime", "torch"):
+        # Installed package metadata: reading it doesn't import torch.
+        try:
+            versions[module] = metadata.version(module)
+        except metadata.PackageNotFoundError:
+            versions[module] = None
+    return {"cpu": cpu_model, "cpus": os.cpu_count(), "machine": platform.machine(), **versions}
+
+
+def _fingerprint_key(fingerprint: dict) -> str:
+    return hashlib.sha1(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()
+
+
+def synthetic_clip(seconds: float = 12.0, seed: int = 0) -> np.ndarray:
+    """
+    Deterministic stand-in for a speech clip: alternating background noise
+    and voiced segments (a glottal-like harmonic series with syllable-rate
+    amplitude modulation and a drifting pitch).
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+    audio = rng.standard_normal(n).astype(np.float32) * 0.003
+    segment = SAMPLE_RATE
+    for start in range(segment, n - segment, 2 * segment):
+        seg_t = t[start:start + segment]
+        pitch = 120 + 30 * np.sin(2 * np.pi * 0.7 * seg_t)
+        phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+        voiced = sum(np.sin(k * phase) / k for k in range(1, 12))
+        envelope = 0.5 * (1 - np.cos(2 * np.pi * 4 * seg_t)) * np.hanning(segment)
+        audio[start:start + segment] += (0.2 * voiced * envelope).astype(np.float32)
+    return np.clip(audio, -1, 1)
+
+
+def read_wav(path: str) -> np.ndarray:
+    with wave.open(path, "rb") as wf:
+        if wf.getframerate() != SAMPLE_RATE or wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            raise ValueError("Benchmark audio must be 16 kHz mono 16-bit WAV")
+        pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    return pcm.astype(np.float32) / 32768.0
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _load_backend(variant: str, max_batch_size: int):
+    if variant == REFERENCE_VARIANT:
+        from audio.vadBackends import TorchVADBackend
+        import torch
+        backend = TorchVADBackend.load(SAMPLE_RATE)
+        torch.set_num_threads(1)
+        return backend
+    from audio.vadBackends import OnnxVADBackend
+    import onnxruntime
+    opts = onnxruntime.SessionOptions()
+    opts.intra_op_num_threads = 1
+    opts.inter_op_num_threads = 1
+    return OnnxVADBackend.load(variant.split(":", 1)[1], session_options=opts,
+                               sampling_rate=SAMPLE_RATE, max_batch_size=max_batch_size)
+
+
+def measure_variant(variant: str, audio: np.ndarray, batch_size: int = 32, repeats: int = 3) -> dict:
+    """Measures one variant in the current process (run via a subprocess by benchmark())."""
+    rss_before = _rss_mb()
+    backend = _load_backend(variant, batch_size)
+    windows = [audio[i:i + WINDOW_SIZE] for i in range(0, len(audio) - WINDOW_SIZE + 1, WINDOW_SIZE)]
+
+    # Per-window latency and the probabilities used for the agreement check.
+    latencies, probs = [], []
+    for _ in range(repeats):
+        state = backend.new_state()
+        probs = []
+        for window in windows:
+            start = time.perf_counter()
+            probs.extend(backend.forward([window], [state]))
+            latencies.append(time.perf_counter() - start)
+
+    # Batched throughput: `batch_size` independent streams stepping together.
+    states = [backend.new_state() for _ in range(batch_size)]
+    steps = max(1, len(windows) // 4)
+    start = time.perf_counter()
+    for step in range(steps):
+        backend.forward([windows[(step + i) % len(windows)] for i in range(batch_size)], states)
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "variant": variant,
+        "latency_p50_ms": float(np.percentile(latencies_ms, 50)),
+        "latency_p95_ms": float(np.percentile(latencies_ms, 95)),
+        "batched_windows_per_s": steps * batch_size / elapsed,
+        "memory_mb": _rss_mb() - rss_before,
+        "probs": [float(p) for p in probs],
+    }
+
+
+def _measure_in_subprocess(variant: str, audio_path: str, batch_size: int) -> dict:
+    cmd = [sys.executable, "-m", "audio.vadBenchmark", "--measure", variant, "--batch-size", str(batch_size)]
+    if audio_path:
+        cmd += ["--audio", audio_path]
+    result = subprocess.run(cmd, cwd=REPO_ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"variant": variant, "error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def benchmark(audio_path: str = None, batch_size: int = 32, tolerance: float = 0.05) -> dict:
+    """Benchmarks every variant and returns the results plus the selected variant."""
+    results = [_measure_in_subprocess(v, audio_path, batch_size) for v in available_variants()]
+    measured = [r for r in results if "error" not in r]
+    if not measured:
+        raise RuntimeError("No VAD variant could be benchmarked: " + "; ".join(r["error"] for r in results))
+
+    reference = next((r for r in measured if r["variant"] == REFERENCE_VARIANT), measured[0])
+    ref_probs = np.array(reference["probs"])
+    for r in measured:
+        probs = np.array(r.pop("probs"))
+        r["max_prob_diff"] = float(np.abs(probs - ref_probs).max())
+        r["decision_agreement"] = float(np.mean((probs >= 0.5) == (ref_probs >= 0.5)))
+        r["within_tolerance"] = r["max_prob_diff"] <= tolerance
+
+    eligible = [r for r in measured if r["within_tolerance"]] or [reference]
+    best = max(eligible, key=lambda r: (r["batched_windows_per_s"], -r["latency_p50_ms"]))
+    return {
+        "selected": best["variant"],
+        "reference": reference["variant"],
+        "tolerance": tolerance,
+        "batch_size": batch_size,
+        "audio": audio_path or "synthetic",
+        "results": results,
+    }
+
+
+def load_selection(path: str = DEFAULT_SELECTION_FILE):
+    """Returns the persisted selection for this host, or None."""
+    try:
+        with open(path) as f:
+            selections = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return selections.get(_fingerprint_key(host_fingerprint()))
+
+
+def save_selection(selection: dict, path: str = DEFAULT_SELECTION_FILE):
+    try:
+        with open(path) as f:
+            selections = json.load(f)
+    except (OSError, ValueError):
+        selections = {}
+    fingerprint = host_fingerprint()
+    selections[_fingerprint_key(fingerprint)] = {**selection, "host": fingerprint, "benchmarked_at": time.time()}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(selections, f, indent=2)
+
+
+def select_variant(path: str = DEFAULT_SELECTION_FILE, audio_path: str = None, force: bool = False) -> str:
+    """Returns the persisted variant for this host, benchmarking first if there is none."""
+    if not force:
+        selection = load_selection(path)
+        if selection:
+            return selection["selected"]
+    logging.info("Benchmarking VAD model variants for this host...")
+    selection = benchmark(audio_path)
+    save_selection(selection, path)
+    logging.info(f"Selected VAD variant: {selection['selected']}")
+    return selection["selected"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Silero VAD variants and pick the fastest accurate one.")
+    parser.add_argument("--audio", help="16 kHz mono 16-bit WAV to benchmark on (default: synthetic clip)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--tolerance", type=float, default=0.05, help="max allowed speech-probability deviation from the reference")
+    parser.add_argument("--selection-file", default=os.getenv("VAD_SELECTION_FILE", DEFAULT_SELECTION_FILE))
+    parser.add_argument("--force", action="store_true", help="re-run even if a selection exists for this host")
+    parser.add_argument("--measure", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        audio = read_wav(args.audio) if args.audio else synthetic_clip()
+        print(json.dumps(measure_variant(args.measure, audio, args.batch_size)))
+        return
+
+    if not args.force and load_selection(args.selection_file):
+        print(json.dumps(load_selection(args.selection_file), indent=2))
+        return
+    selection = benchmark(args.audio, args.batch_size, args.tolerance)
+    save_selection(selection, args.selection_file)
+    print(json.dumps(selection, indent=2))
+
+
+if __name__ == "__main__":
+    main()
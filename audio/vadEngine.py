@@ -0,0 +1,213 @@
+# audio/vadEngine.py
+
+"""
+Cross-session micro-batched VAD inference.
+
+Instead of every connection running its own 512-sample forward pass, sessions
+submit windows to a shared BatchedVADEngine. The engine waits a few
+milliseconds for windows from other sessions, runs them through the Silero
+model as one batch, and scatters the speech probabilities back. Each
+session's recurrent state lives in its own stream state object and the
+model backend (audio/vadBackends.py) is stateless, so one loaded model is
+shared read-only by every stream.
+
+Forward passes run on an InferenceExecutor, never on the event loop. Batches
+for disjoint sets of streams may run concurrently on different workers.
+"""
+
+import asyncio
+import logging
+import numpy as np
+
+
+class VADStream:
+    """
+    Per-session handle on the engine. Awaiting the stream with a window
+    returns the same {'start': ...} / {'end': ...} events as Silero's
+    VADIterator, using the same threshold, silence and padding rules.
+    """
+
+    def __init__(self, engine, threshold: float = 0.5, min_silence_duration_ms: int = 100,
+                 speech_pad_ms: int = 30, max_pending: int = 4):
+        self.engine = engine
+        self.threshold = threshold
+        # Bounds how many windows this session may have queued at once.
+        self._pending_slots = asyncio.Semaphore(max_pending)
+        self.sampling_rate = engine.sampling_rate
+        self.min_silence_samples = self.sampling_rate * min_silence_duration_ms / 1000
+        self.speech_pad_samples = self.sampling_rate * speech_pad_ms / 1000
+        self.closed = False
+        self.reset_states()
+
+    def reset_states(self):
+        self.stream_state = self.engine.backend.new_state()
+        self.triggered = False
+        self.temp_end = 0
+        self.last_prob = 0.0
+
+    @property
+    def current_sample(self):
+        return self.stream_state.current_sample
+
+    async def __call__(self, window: np.ndarray, return_seconds: bool = False, time_resolution: int = 1):
+        """
+        window: np.ndarray
+            One float32 window of 512 samples (256 at 8 kHz). It must stay
+            unchanged until this call returns.
+        """
+        result = await self.submit(window)
+        return self.update(await result, window.shape[0], return_seconds, time_resolution)
+
+    async def submit(self, window: np.ndarray) -> asyncio.Future:
+        """
+        Queues a window without waiting for inference and returns a future
+        for its speech probability. Waits if the session already has
+        `max_pending` windows queued. Feed the results to update() in
+        submission order.
+        """
+        await self._pending_slots.acquire()
+        future = self.engine.submit(self, window)
+        future.add_done_callback(lambda _: self._pending_slots.release())
+        return future
+
+    def update(self, speech_prob: float, window_size_samples: int, return_seconds: bool = False, time_resolution: int = 1):
+        """Advances the start/end hysteresis with one window's speech probability."""
+        self.last_prob = speech_prob
+
+        if (speech_prob >= self.threshold) and self.temp_end:
+            self.temp_end = 0
+
+        if (speech_prob >= self.threshold) and not self.triggered:
+            self.triggered = True
+            speech_start = max(0, self.current_sample - self.speech_pad_samples - window_size_samples)
+            return {'start': int(speech_start) if not return_seconds else round(speech_start / self.sampling_rate, time_resolution)}
+
+        if (speech_prob < self.threshold - 0.15) and self.triggered:
+            if not self.temp_end:
+                self.temp_end = self.current_sample
+            if self.current_sample - self.temp_end < self.min_silence_samples:
+                return None
+            speech_end = self.temp_end + self.speech_pad_samples - window_size_samples
+            self.temp_end = 0
+            self.triggered = False
+            return {'end': int(speech_end) if not return_seconds else round(speech_end / self.sampling_rate, time_resolution)}
+
+        return None
+
+    def close(self):
+        self.closed = True
+        self.engine.close_stream(self)
+
+
+class BatchedVADEngine:
+    """
+    Collects pending windows from all open streams every `batch_interval_ms`
+    and runs them through `backend` as a single batched forward pass on
+    `executor`. The backend stacks the per-stream states into one batch
+    state for the call and scatters them back afterwards.
+    """
+
+    def __init__(self, backend, executor, sampling_rate: int = 16000, max_batch_size: int = 64, batch_interval_ms: float = 4):
+        if sampling_rate not in [8000, 16000]:
+            raise ValueError('BatchedVADEngine does not support sampling rates other than [8000, 16000]')
+        self.backend = backend
+        self.executor = executor
+        self.sampling_rate = sampling_rate
+        self.max_batch_size = max_batch_size
+        self.batch_interval = batch_interval_ms / 1000
+        self._pending = []
+        self._in_flight = set()
+        self._wakeup = None
+        self._task = None
+        self.open_streams = 0
+        self.windows_processed = 0
+        self.batches_run = 0
+
+    def open_stream(self, **kwargs) -> VADStream:
+        self.open_streams += 1
+        return VADStream(self, **kwargs)
+
+    def close_stream(self, stream: VADStream):
+        self.open_streams -= 1
+        for item in self._pending:
+            if item[0] is stream and not item[2].done():
+                item[2].cancel()
+        self._pending = [item for item in self._pending if item[0] is not stream]
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def submit(self, stream: VADStream, window: np.ndarray) -> asyncio.Future:
+        """Queues one window for the next batch; the future resolves to its speech probability."""
+        self._ensure_running()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((stream, window, future))
+        self._wakeup.set()
+        return future
+
+    async def infer(self, stream: VADStream, window: np.ndarray) -> float:
+        return await self.submit(stream, window)
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            # Give other sessions a moment to submit their windows.
+            await asyncio.sleep(self.batch_interval)
+            self._wakeup.clear()
+            batch = self._next_batch()
+            if not batch:
+                continue
+            for stream, _, _ in batch:
+                self._in_flight.add(stream)
+            asyncio.get_running_loop().create_task(self._run_batch(batch))
+
+    def _next_batch(self) -> list:
+        """
+        Takes at most one window per stream, and none from streams that are
+        still in flight, since a stream's windows depend on each other's state.
+        """
+        batch, deferred, seen = [], [], set()
+        for item in self._pending:
+            stream, _, future = item
+            if future.done():
+                continue
+            if stream in seen or stream in self._in_flight or len(batch) >= self.max_batch_size:
+                deferred.append(item)
+                continue
+            seen.add(stream)
+            batch.append(item)
+        self._pending = deferred
+        return batch
+
+    async def _run_batch(self, batch: list):
+        try:
+            windows = [window for _, window, _ in batch]
+            states = [stream.stream_state for stream, _, _ in batch]
+            # Each state is owned by this batch until the executor returns.
+            probs = await self.executor.run(self.backend.forward, windows, states)
+            for i, (_, _, future) in enumerate(batch):
+                if not future.done():
+                    future.set_result(probs[i])
+            self.windows_processed += len(batch)
+            self.batches_run += 1
+        except Exception as e:
+            logging.error(f"Error in batched VAD forward pass: {e}")
+            for _, _, future in batch:
+                if not future.done(): future.set_exception(e)
+        finally:
+            for stream, _, _ in batch:
+                self._in_flight.discard(stream)
+            if self._pending:
+                self._wakeup.set()
+
+    def stats(self) -> dict:
+        return {
+            "open_streams": self.open_streams,
+            "windows_processed": self.windows_processed,
+            "batches_run": self.batches_run,
+            "mean_batch_size": self.windows_processed / self.batches_run if self.batches_run else 0.0,
+            "queued_windows": len(self._pending),
+            "batches_in_flight": self.executor.in_flight,
+        }
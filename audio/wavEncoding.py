@@ -0,0 +1,32 @@
+# audio/wavEncoding.py
+
+"""
+In-memory WAV encoding for utterance uploads.
+"""
+
+import struct
+import numpy as np
+
+WAV_HEADER = struct.Struct("<4sI4s4sIHHIIHH4sI")
+WAV_HEADER_SIZE = WAV_HEADER.size
+
+
+def float_to_wav(samples: np.ndarray, sample_rate: int = 16000) -> bytearray:
+    """
+    Encodes float32 samples in [-1, 1] as a 16-bit mono WAV file in memory.
+    The int16 conversion is written straight into the returned buffer, after
+    the header, so the audio is converted exactly once. `samples` is clipped
+    in place, so pass an array you own (e.g. a handed-off utterance).
+    """
+    data_size = 2 * samples.shape[0]
+    wav = bytearray(WAV_HEADER_SIZE + data_size)
+    WAV_HEADER.pack_into(
+        wav, 0,
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, 1, 1, sample_rate, 2 * sample_rate, 2, 16,
+        b"data", data_size,
+    )
+    pcm = np.frombuffer(wav, dtype="<i2", offset=WAV_HEADER_SIZE)
+    np.clip(samples, -1.0, 1.0, out=samples)
+    np.multiply(samples, 32767, out=pcm, casting="unsafe")
+    return wav
@@ -0,0 +1,250 @@
+# brain/historyManager.py
+
+"""
+Token-budgeted conversation history.
+
+Every turn resends the history to Mistral, so an unbounded history makes
+request size, time to first token and memory grow with the length of the
+session. ConversationHistory is a drop-in for the plain message list
+(stream_mistral_chat_async and mistral_chat only append to it and pass it
+on) that keeps it bounded:
+
+  - tokens are counted once per message as it is appended, so the running
+    total costs nothing per turn
+  - once a finished turn takes the history over its token budget, the
+    oldest turns are compacted into a running summary, which is carried in
+    the system message; recent turns stay verbatim
+  - compaction runs in the background (an LLM summary via summarize(), with
+    a local extractive summary as the fallback), so no turn waits for it;
+    the old turns stay in the window until their summary is ready
+  - a hard cap on messages and tokens drops the oldest turns straight into
+    the local summary if compaction can't keep up
+
+Token counts are an estimate (word pieces and punctuation, like the Mistral
+tokenizer splits them) rather than the real tokenizer; they only have to be
+good enough to hold the window at a roughly constant size.
+
+Settings (environment, see from_env):
+    HISTORY_TOKEN_BUDGET     tokens of history sent per turn (default 2000)
+    HISTORY_MAX_MESSAGES     hard cap on messages kept in memory (default 40)
+    HISTORY_SUMMARY_WORDS    length of the running summary (default 120)
+"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import Counter
+
+from tts.textCondenser import condense
+
+_TOKEN_PIECES = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_HEADER = "\n\nSummary of the conversation so far:\n"
+
+
+def estimate_tokens(text: str) -> int:
+    # Long words split into several tokens; ~6 characters per piece.
+    return sum(1 + len(piece) // 6 for piece in _TOKEN_PIECES.findall(text))
+
+
+def summarize_locally(summary: str, messages: list, max_words: int = 120) -> str:
+    """Extends the summary with a condensed line per message, keeping the newest max_words words."""
+    lines = [line for line in summary.split("\n") if line] if summary else []
+    for message in messages:
+        speaker = "User" if message["role"] == "user" else "AI"
+        text = condense(message["content"], 20) or " ".join(message["content"].split()[:20])
+        lines.append(f"{speaker}: {text}")
+    while len(lines) > 1 and sum(len(line.split()) for line in lines) > max_words:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class HistoryStats:
+    """Compaction counters shared by every session."""
+
+    def __init__(self):
+        self.compactions = 0
+        self.compaction_failures = 0
+        self.messages_compacted = 0
+        self.tokens_compacted = 0
+        self.messages_dropped_over_cap = 0
+        self.compaction_seconds = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "compactions": self.compactions,
+            "compaction_failures": self.compaction_failures,
+            "messages_compacted": self.messages_compacted,
+            "tokens_compacted": self.tokens_compacted,
+            "messages_dropped_over_cap": self.messages_dropped_over_cap,
+            "mean_compaction_ms": round(self.compaction_seconds / self.compactions * 1000, 1) if self.compactions else None,
+        }
+
+
+class ConversationHistory(list):
+    """
+    The message list sent to the LLM: the system message (with the running
+    summary), then the recent turns.
+
+    summarize: optional coroutine function summarize(summary, messages) -> str
+               used for background compaction; without it (or outside an
+               event loop) compaction is local and immediate.
+    """
+
+    def __init__(self, system_message: dict = None, budget_tokens: int = 2000, max_messages: int = 40,
+                 keep_recent: int = 4, summary_words: int = 120, summarize=None, stats: HistoryStats = None):
+        super().__init__()
+        self.budget_tokens = budget_tokens
+        self.max_messages = max_messages
+        self.keep_recent = keep_recent
+        self.summary_words = summary_words
+        self.summarize = summarize
+        self.stats = stats or HistoryStats()
+        self.summary = ""
+        self.tokens = 0
+        # Token count of each message, kept in step with the list itself.
+        self._counts = []
+        self._system_prompt = None
+        self._compaction = None
+        if system_message is not None:
+            self.append(system_message)
+
+    @classmethod
+    def from_env(cls, system_message: dict = None, **kwargs):
+        return cls(system_message,
+                   budget_tokens=int(os.getenv("HISTORY_TOKEN_BUDGET", "2000")),
+                   max_messages=int(os.getenv("HISTORY_MAX_MESSAGES", "40")),
+                   summary_words=int(os.getenv("HISTORY_SUMMARY_WORDS", "120")),
+                   **kwargs)
+
+    # --- list interface used by the brain ---
+
+    def append(self, message: dict):
+        super().append(message)
+        self._counts.append(self._count(message))
+        if message["role"] == "assistant":
+            # A turn is complete: the only safe point to cut the history.
+            self._maybe_compact()
+        self._enforce_cap()
+
+    def insert(self, index: int, message: dict):
+        super().insert(index, message)
+        self._counts.insert(index, self._count(message))
+
+    # --- bookkeeping ---
+
+    def _count(self, message: dict) -> int:
+        tokens = estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+        self.tokens += tokens
+        return tokens
+
+    def _remove(self, messages: list) -> tuple:
+        """
+        Removes the oldest turns, those of messages that lead the window after
+        the system message (compaction and the cap both take from the front);
+        returns how many messages and tokens went.
+        """
+        # The ids are stable while messages holds the objects.
+        removing = Counter(id(m) for m in messages)
+        start = end = self._first_turn()
+        while end < len(self) and removing[id(self[end])]:
+            removing[id(self[end])] -= 1
+            end += 1
+        tokens = sum(self._counts[start:end])
+        del self[start:end]
+        del self._counts[start:end]
+        self.tokens -= tokens
+        return end - start, tokens
+
+    def _first_turn(self) -> int:
+        return 1 if self and self[0]["role"] == "system" else 0
+
+    def _set_summary(self, summary: str):
+        self.summary = summary
+        if self._first_turn():
+            if self._system_prompt is None:
+                self._system_prompt = self[0]["content"]
+            self.tokens -= self._counts[0]
+            self[0] = {"role": "system", "content": self._system_prompt + SUMMARY_HEADER + summary}
+            self._counts[0] = self._count(self[0])
+
+    def _oldest_turns(self, target_tokens: int) -> list:
+        """The oldest messages to compact to get under target_tokens, ending before a user message."""
+        start = self._first_turn()
+        end = len(self) - self.keep_recent
+        chosen, tokens = [], self.tokens
+        i = start
+        while i < end and tokens > target_tokens:
+            chosen.append(self[i])
+            tokens -= self._counts[i]
+            i += 1
+        # Don't leave an assistant reply without the question it answers.
+        while i < end and self[i]["role"] != "user":
+            chosen.append(self[i])
+            i += 1
+        return chosen if i < len(self) and self[i]["role"] == "user" else []
+
+    # --- compaction ---
+
+    def _maybe_compact(self):
+        if self.tokens <= self.budget_tokens or (self._compaction and not self._compaction.done()):
+            return
+        messages = self._oldest_turns(int(self.budget_tokens * 0.6))
+        if not messages:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if self.summarize is None or loop is None:
+            started = time.perf_counter()
+            self._apply(messages, summarize_locally(self.summary, messages, self.summary_words), started)
+        else:
+            self._compaction = loop.create_task(self._compact(messages))
+
+    async def _compact(self, messages: list):
+        started = time.perf_counter()
+        base = self.summary
+        try:
+            summary = await self.summarize(base, messages)
+            if not summary or not summary.strip():
+                raise ValueError("empty summary")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.warning(f"History summary failed, summarizing locally: {e}")
+            self.stats.compaction_failures += 1
+            summary = summarize_locally(base, messages, self.summary_words)
+        if self.summary != base:
+            # The hard cap folded newer turns into the summary meanwhile; keep them.
+            summary = "\n".join([summary.strip()] + [line for line in self.summary.split("\n") if line not in base])
+        self._apply(messages, summary.strip(), started)
+
+    def _apply(self, messages: list, summary: str, started: float):
+        # Messages the hard cap already dropped meanwhile are skipped.
+        removed, tokens = self._remove(messages)
+        self._set_summary(summary)
+        self.stats.compactions += 1
+        self.stats.messages_compacted += removed
+        self.stats.tokens_compacted += tokens
+        self.stats.compaction_seconds += time.perf_counter() - started
+
+    def _enforce_cap(self):
+        overflow = []
+        messages, tokens = len(self), self.tokens
+        i = self._first_turn()
+        while (messages > self.max_messages or tokens > self.budget_tokens * 2) and i < len(self) - self.keep_recent:
+            overflow.append(self[i])
+            messages -= 1
+            tokens -= self._counts[i]
+            i += 1
+        if overflow:
+            self.stats.messages_dropped_over_cap += len(overflow)
+            self._remove(overflow)
+            self._set_summary(summarize_locally(self.summary, overflow, self.summary_words))
+
+    def close(self):
+        if self._compaction and not self._compaction.done():
+            self._compaction.cancel()
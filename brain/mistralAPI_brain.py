@@ -1,12 +1,20 @@
 # brain/mistralAPI_brain.py
 
+import asyncio
 import os
+import re
 from dotenv import load_dotenv
 from mistralai.client import MistralClient
-from mistralai.async_client import MistralAsyncClient
+
+from providers.clientRegistry import provider_clients
+from brain.replyCache import ReplyCache
 
 load_dotenv()
 
+# Replies to short, repeated turns ("how are you") are reused; LLM_CACHE=1 enables it.
+reply_cache = ReplyCache.from_env()
+_TOKEN = re.compile(r"\s*\S+\s*")
+
 # ==============================================================================
 # SYNCHRONOUS FUNCTION (Unchanged)
 # ==============================================================================
@@ -50,23 +58,35 @@ def mistral_chat(user_message, conversation):
 # ==============================================================================
 # ASYNCHRONOUS STREAMING FUNCTION (MODIFIED)
 # ==============================================================================
-async def stream_mistral_chat_async(user_message: str, conversation: list):
+async def stream_mistral_chat_async(user_message: str, conversation: list, persona: str = "default"):
     """
     Asynchronous generator for the FastAPI server.
     It now relies on the conversation history already containing the system prompt.
     """
+    cached = reply_cache.lookup(persona, user_message, conversation) if reply_cache else None
+    if cached is not None:
+        conversation.append({"role": "user", "content": user_message})
+        conversation.append({"role": "assistant", "content": cached})
+        # Replayed word by word so the client sees the same stream as a live reply.
+        for token in _TOKEN.findall(cached):
+            yield token
+            await asyncio.sleep(0)
+        return
+
     api_key = os.getenv("MISTRAL_API_KEY")
     if not api_key:
         print("⚠️ MISTRAL_API_KEY not found.")
         return
 
-    async_client = MistralAsyncClient(api_key=api_key)
+    # Pooled, long-lived client: no new connection per turn.
+    async_client = provider_clients.mistral(api_key)
     MODEL = "mistral-small-latest"
     
     # --- MODIFICATION ---
     # The system prompt is now handled by server.py before calling this function.
     # We no longer define it here. We just append the new user message.
     
+    context = list(conversation)
     conversation.append({"role": "user", "content": user_message})
     
     full_reply = ""
@@ -79,7 +99,15 @@ async def stream_mistral_chat_async(user_message: str, conversation: list):
         
         # Append the full reply to the conversation history for context
         conversation.append({"role": "assistant", "content": full_reply})
+        if reply_cache:
+            reply_cache.store(persona, user_message, context, full_reply)
 
+    except (asyncio.CancelledError, GeneratorExit):
+        # Interrupted by the user (barge-in): keep the partial reply so the
+        # history still alternates between user and assistant.
+        if full_reply:
+            conversation.append({"role": "assistant", "content": full_reply})
+        raise
     except Exception as e:
         print(f"❌ Error during async Mistral chat: {e}")
 
@@ -91,7 +119,7 @@ async def summarize_text_async(text: str) -> str:
     if not api_key:
         return text
 
-    client = MistralAsyncClient(api_key=api_key)
+    client = provider_clients.mistral(api_key)
     MODEL = "mistral-small-latest"
 
     prompt = f"""
@@ -112,4 +140,34 @@ async def summarize_text_async(text: str) -> str:
         return text
     except Exception as e:
         print(f"❌ Error during summarization: {e}")
-        return text
\ No newline at end of file
+        return text
+
+
+async def summarize_history_async(summary: str, messages: list) -> str:
+    """
+    Folds older conversation turns into the running summary kept by
+    brain/historyManager.py. Raises on failure so the caller can fall back.
+    """
+    api_key = os.getenv("MISTRAL_API_KEY")
+    if not api_key:
+        raise RuntimeError("MISTRAL_API_KEY not found")
+
+    client = provider_clients.mistral(api_key)
+    MODEL = "mistral-small-latest"
+
+    transcript = "\n".join(f"{'User' if m['role'] == 'user' else 'AI'}: {m['content']}" for m in messages)
+    prompt = f"""
+    You keep a running summary of a conversation between a user and their AI companion.
+    Update the summary with the new messages below. Keep what matters for the rest of the chat:
+    names and facts about the user, their plans and feelings, open questions and promises made.
+    Write plain sentences, no markdown, under 120 words.
+
+    Current summary:
+    {summary or "(none yet)"}
+
+    New messages:
+    {transcript}
+    """
+
+    response = await client.chat(model=MODEL, messages=[{"role": "user", "content": prompt}])
+    return response.choices[0].message.content if response.choices else ""
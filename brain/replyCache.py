@@ -0,0 +1,221 @@
+# brain/replyCache.py
+
+"""
+Reply cache for short, repeated user turns.
+
+A good share of what people say is the same few things ("how are you",
+"hello", "thank you", "stop"), and each of them used to cost a full Mistral
+round trip. Replies to short utterances are cached under:
+
+    persona | normalized utterance | short suffix of the conversation context
+
+The context suffix (the tail of the previous LLM_CACHE_CONTEXT_MESSAGES
+messages, usually the AI's last line) keeps a reply from being reused where
+it wouldn't fit; with 0 only persona and utterance count.
+
+Lookup is an exact match on the key first, then, if LLM_CACHE_SIMILARITY is
+above 0, the most similar cached utterance in the same persona and context
+by character-trigram Jaccard similarity, accepted only above that
+threshold. It is off by default: one changed word in a longer sentence
+scores higher than a spelling variant of a short one, so no threshold
+separates them. Measured pairs:
+
+    0.806  "i am feeling very sad today" / "i am feeling very bad today"
+    0.786  "good morning" / "good mornin"
+    0.769  "kya haal hai" / "kya hal hai"
+    0.643  "i love you" / "i loved you"
+    0.600  "i am not okay" / "i am okay"
+    0.412  "how are you" / "who are you"
+
+A threshold low enough to catch the variants (about 0.75) answers sad
+with the reply meant for bad; above 0.81 hardly any variant matches.
+Normalization (case, punctuation, chat shorthand, stretched letters)
+already folds most of the repeats into one exact key.
+
+Entries expire after LLM_CACHE_TTL_S and the least recently used are
+evicted past LLM_CACHE_MAX_ENTRIES.
+
+Settings (environment):
+    LLM_CACHE                    1 to enable (off by default)
+    LLM_CACHE_MAX_WORDS          only utterances up to this many words (default 8)
+    LLM_CACHE_CONTEXT_MESSAGES   previous messages in the key (default 1; 0 hits far more
+                                 often but may answer "why?" out of context)
+    LLM_CACHE_SIMILARITY         similarity threshold, 0 for exact match only (default 0)
+    LLM_CACHE_TTL_S              entry lifetime (default 3600)
+    LLM_CACHE_MAX_ENTRIES        (default 2000)
+"""
+
+import hashlib
+import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict, defaultdict
+
+_NON_WORD = re.compile(r"[^\w\s]", re.UNICODE)
+_STRETCHED = re.compile(r"(\w)\1{2,}", re.UNICODE)
+_CONTEXT_WORDS = 12
+# Chat shorthand, so "hru" and "how r u" are the same key as "how are you".
+SHORTHAND = {
+    "r": "are", "u": "you", "ur": "your", "y": "why", "k": "okay", "ok": "okay", "pls": "please",
+    "plz": "please", "thx": "thanks", "ty": "thank you", "hru": "how are you", "gm": "good morning",
+    "gn": "good night",
+}
+
+
+def normalize_utterance(text: str) -> str:
+    text = unicodedata.normalize("NFC", text).lower()
+    # "hiii" / "heyyy" -> "hi" / "hey"
+    text = _STRETCHED.sub(r"\1", _NON_WORD.sub(" ", text))
+    return " ".join(SHORTHAND.get(word, word) for word in text.split())
+
+
+def trigrams(text: str) -> frozenset:
+    padded = f"  {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class _Entry:
+    def __init__(self, bucket: tuple, utterance: str, reply: str):
+        self.bucket = bucket
+        self.utterance = utterance
+        self.grams = trigrams(utterance)
+        self.reply = reply
+        self.created_at = time.monotonic()
+
+
+class PersonaCacheStats:
+    def __init__(self):
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+        self.stored = 0
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.similar_hits
+        lookups = hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "uncacheable": self.uncacheable,
+            "stored": self.stored,
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+        }
+
+
+class ReplyCache:
+    def __init__(self, max_words: int = 8, context_messages: int = 1, similarity: float = 0.0,
+                 ttl: float = 3600.0, max_entries: int = 2000):
+        self.max_words = max_words
+        self.context_messages = context_messages
+        self.similarity = similarity
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # (persona, context) -> keys, the candidates for a similarity match.
+        self._buckets = defaultdict(set)
+        self._persona_stats = defaultdict(PersonaCacheStats)
+        self.evicted = 0
+        self.expired = 0
+
+    @classmethod
+    def from_env(cls):
+        if os.getenv("LLM_CACHE", "0") != "1":
+            return None
+        return cls(
+            max_words=int(os.getenv("LLM_CACHE_MAX_WORDS", "8")),
+            context_messages=int(os.getenv("LLM_CACHE_CONTEXT_MESSAGES", "1")),
+            similarity=float(os.getenv("LLM_CACHE_SIMILARITY", "0")),
+            ttl=float(os.getenv("LLM_CACHE_TTL_S", "3600")),
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000")),
+        )
+
+    def key(self, persona: str, user_message: str, conversation: list):
+        """
+        The (key, bucket, utterance) of a turn, or None if it is too long to
+        be worth caching. conversation is the history before this message.
+        """
+        utterance = normalize_utterance(user_message)
+        if not utterance or len(utterance.split()) > self.max_words:
+            return None
+        context = ""
+        if self.context_messages:
+            recent = [m for m in conversation if m["role"] != "system"][-self.context_messages:]
+            context = "|".join(" ".join(normalize_utterance(m["content"]).split()[-_CONTEXT_WORDS:]) for m in recent)
+        bucket = (persona, hashlib.sha256(context.encode("utf-8")).hexdigest()[:16])
+        return bucket + (utterance,), bucket, utterance
+
+    def lookup(self, persona: str, user_message: str, conversation: list):
+        """The cached reply for this turn, or None."""
+        stats = self._persona_stats[persona]
+        key = self.key(persona, user_message, conversation)
+        if key is None:
+            stats.uncacheable += 1
+            return None
+        key, bucket, utterance = key
+
+        entry = self._live(key)
+        if entry is not None:
+            stats.exact_hits += 1
+            return entry.reply
+
+        if self.similarity > 0:
+            grams = trigrams(utterance)
+            best, best_score = None, self.similarity
+            for candidate_key in list(self._buckets.get(bucket, ())):
+                candidate = self._live(candidate_key)
+                if candidate is None:
+                    continue
+                score = len(grams & candidate.grams) / len(grams | candidate.grams)
+                if score >= best_score:
+                    best, best_score = candidate, score
+            if best is not None:
+                self._entries.move_to_end(best.bucket + (best.utterance,))
+                stats.similar_hits += 1
+                return best.reply
+
+        stats.misses += 1
+        return None
+
+    def store(self, persona: str, user_message: str, conversation: list, reply: str):
+        key = self.key(persona, user_message, conversation)
+        if key is None or not reply.strip():
+            return
+        key, bucket, utterance = key
+        self._drop(key)
+        self._entries[key] = _Entry(bucket, utterance, reply)
+        self._buckets[bucket].add(key)
+        self._persona_stats[persona].stored += 1
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+            self.evicted += 1
+
+    def _live(self, key):
+        """The entry under key if it hasn't expired (marking it recently used)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.created_at > self.ttl:
+            self._drop(key)
+            self.expired += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            bucket = self._buckets[entry.bucket]
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[entry.bucket]
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "evicted": self.evicted,
+            "expired": self.expired,
+            "personas": {name: s.stats() for name, s in self._persona_stats.items()},
+        }
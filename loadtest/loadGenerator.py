@@ -0,0 +1,427 @@
+# loadtest/loadGenerator.py
+
+"""
+Concurrent-session load test for the /ws voice route.
+
+Each simulated caller opens its own WebSocket, waits for the greeting, and
+then behaves like web/static/script.js: a microphone that never stops,
+sending one binary frame (audio/framing.py, int16, 32 ms) at real-time
+pace, with speech mixed in for each turn and low background noise in
+between. Every message the server sends back is recorded on the turn's
+timeline, measured from the moment the last frame of speech went out:
+
+    transcript    the user_transcript message
+    first_token   the first ai_text_chunk
+    first_audio   the first binary (audio) message; a filler counts, as it
+                  is what the caller hears (FILLER_AFTER_S=0 to leave them out)
+    complete      tts_end
+
+Like the browser, a caller reports playback_ended once it would have
+finished playing a reply's audio (at --playback-kbps, from its first byte),
+and only then thinks for --think-s and speaks again.
+
+The run is repeated at each --concurrency level and p50/p95/p99 of every
+metric are reported per level. Speech is a 16 kHz mono 16-bit WAV (--audio)
+or the synthetic voiced clip from audio/vadBenchmark.py.
+
+With --spawn, the provider stand-ins (loadtest/providerStandins.py) and
+server.py are started locally and wired together, so nothing leaves the
+machine; logs and rendered audio go to a temporary directory.
+
+Usage:
+    python -m loadtest.loadGenerator --spawn --concurrency 1,5,10,20 --turns 3
+    python -m loadtest.loadGenerator --url ws://127.0.0.1:8000/ws --password ... --concurrency 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+import numpy as np
+import websockets
+
+from audio.framing import encode_audio_frame
+from audio.vadBenchmark import read_wav, synthetic_clip
+from loadtest.providerStandins import server_env
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_RATE = 16000
+FRAME_MS = 32
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+NOISE_LEVEL = 0.003
+# Bitrate of the stand-ins' (and ElevenLabs' default) audio, to pace simulated playback.
+PLAYBACK_KBPS = 128
+METRICS = ("transcript", "first_token", "first_audio", "complete")
+
+
+def synthetic_utterance(seed: int = 0) -> np.ndarray:
+    """One second of the benchmark clip's voiced signal, which Silero detects as speech."""
+    return synthetic_clip(3.0, seed)[SAMPLE_RATE:2 * SAMPLE_RATE]
+
+
+def to_pcm16(samples: np.ndarray) -> np.ndarray:
+    return (np.clip(samples, -1, 1) * 32767).astype(np.int16)
+
+
+class Microphone:
+    """
+    Sends one frame every FRAME_MS, like the browser's audio worklet. Queued
+    speech goes out first; otherwise the frame is background noise.
+    """
+
+    def __init__(self, websocket, seed: int = 0):
+        self.websocket = websocket
+        self.rng = np.random.default_rng(seed)
+        self.sequence = 0
+        self._speech = None
+        self._position = 0
+        self._spoken = None
+        self.late_frames = 0
+
+    def say(self, pcm: np.ndarray) -> asyncio.Future:
+        """Queues an utterance; the future resolves with the time its last frame was sent."""
+        self._speech, self._position = pcm, 0
+        self._spoken = asyncio.get_running_loop().create_future()
+        return self._spoken
+
+    def _next_frame(self) -> np.ndarray:
+        frame = to_pcm16(self.rng.standard_normal(FRAME_SAMPLES).astype(np.float32) * NOISE_LEVEL)
+        if self._speech is not None:
+            speech = self._speech[self._position:self._position + FRAME_SAMPLES]
+            frame[:len(speech)] = speech
+            self._position += FRAME_SAMPLES
+        return frame
+
+    async def run(self):
+        frame_s = FRAME_MS / 1000
+        started = time.perf_counter()
+        while True:
+            await self.websocket.send(encode_audio_frame(self._next_frame(), self.sequence))
+            self.sequence += 1
+            if self._speech is not None and self._position >= len(self._speech):
+                self._speech = None
+                self._spoken.set_result(time.perf_counter())
+            # Scheduled on the absolute clock, so a slow send doesn't slow the stream down.
+            delay = started + self.sequence * frame_s - time.perf_counter()
+            if delay < 0:
+                self.late_frames += 1
+            await asyncio.sleep(max(delay, 0))
+
+
+class TurnTimeline:
+    """Everything the server sent during one turn, in ms after the end of speech."""
+
+    def __init__(self, session: int, index: int):
+        self.session = session
+        self.index = index
+        self.speech_end = None
+        self.events = []
+        self.marks = {}
+        self.status = "pending"
+        self.done = asyncio.Event()
+
+    def record(self, kind: str, at: float, size: int = None):
+        if self.speech_end is None:
+            return
+        offset = round((at - self.speech_end) * 1000, 1)
+        self.events.append((offset, kind, size) if size is not None else (offset, kind))
+        if kind == "tts_end" and "transcript" not in self.marks:
+            # The end of a greeting or an earlier turn's audio, not this reply.
+            return
+        mark = {"user_transcript": "transcript", "ai_text_chunk": "first_token", "audio": "first_audio",
+                "tts_end": "complete"}.get(kind)
+        if mark and mark not in self.marks:
+            self.marks[mark] = offset
+        if kind == "tts_end":
+            self.status = "ok"
+
+    def played(self, at: float):
+        self.record("playback_ended", at)
+        if self.status == "ok":
+            self.done.set()
+
+    def to_dict(self) -> dict:
+        return {"session": self.session, "turn": self.index, "status": self.status, **self.marks,
+                "events": self.events}
+
+
+class Caller:
+    """One simulated user: connects, waits for the greeting, then talks for `turns` turns."""
+
+    def __init__(self, index: int, url: str, speech: np.ndarray, turns: int, think_s: float, turn_timeout: float,
+                 playback_kbps: int = PLAYBACK_KBPS):
+        self.index = index
+        self.playback_bytes_per_s = playback_kbps * 1000 / 8
+        self.url = url
+        self.speech = speech
+        self.turns = turns
+        self.think_s = think_s
+        self.turn_timeout = turn_timeout
+        self.timelines = []
+        self.connect_ms = None
+        self.greeting_ms = None
+        self.error = None
+        self.late_frames = 0
+        self._turn = None
+        self._greeted = asyncio.Event()
+        self._playback_started = None
+        self._playback_bytes = 0
+        self._playback = None
+
+    async def run(self):
+        started = time.perf_counter()
+        try:
+            async with websockets.connect(self.url, max_size=None, open_timeout=30) as websocket:
+                self.connect_ms = round((time.perf_counter() - started) * 1000, 1)
+                receiver = asyncio.create_task(self._receive(websocket, started))
+                microphone = Microphone(websocket, seed=self.index)
+                sender = asyncio.create_task(microphone.run())
+                try:
+                    await self._wait_for_greeting()
+                    for i in range(self.turns):
+                        await self._turn_once(microphone, i)
+                        if receiver.done() or sender.done():
+                            break
+                        await asyncio.sleep(self.think_s)
+                finally:
+                    self.late_frames = microphone.late_frames
+                    sender.cancel()
+                    receiver.cancel()
+                    if self._playback is not None:
+                        self._playback.cancel()
+                    for task in (sender, receiver):
+                        if task.done() and not task.cancelled() and task.exception():
+                            self.error = self.error or repr(task.exception())
+        except Exception as e:
+            self.error = repr(e)
+
+    async def _wait_for_greeting(self, timeout: float = 10.0):
+        try:
+            await asyncio.wait_for(self._greeted.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _turn_once(self, microphone: Microphone, index: int):
+        timeline = TurnTimeline(self.index, index)
+        self.timelines.append(timeline)
+        self._turn = timeline
+        timeline.speech_end = await microphone.say(self.speech)
+        try:
+            await asyncio.wait_for(timeline.done.wait(), self.turn_timeout)
+        except asyncio.TimeoutError:
+            timeline.status = "timeout" if timeline.marks else "no_response"
+
+    async def _play_out(self, websocket, timeline: TurnTimeline):
+        """Waits as long as playing the audio received would take, then reports it played."""
+        if self._playback_started is not None:
+            ends = self._playback_started + self._playback_bytes / self.playback_bytes_per_s
+            await asyncio.sleep(max(ends - time.perf_counter(), 0))
+        self._playback_started, self._playback_bytes = None, 0
+        await websocket.send(json.dumps({"type": "playback_ended"}))
+        if timeline is None:
+            self._greeted.set()
+        else:
+            timeline.played(time.perf_counter())
+
+    async def _receive(self, websocket, started: float):
+        greeting_audio = False
+        async for message in websocket:
+            now = time.perf_counter()
+            if isinstance(message, bytes):
+                if self._playback_started is None:
+                    self._playback_started = now
+                self._playback_bytes += len(message)
+                if self._turn:
+                    self._turn.record("audio", now, len(message))
+                continue
+            kind = json.loads(message).get("type")
+            if kind == "greeting":
+                self.greeting_ms = round((now - started) * 1000, 1)
+                # Without pre-rendered audio the greeting is text only.
+                asyncio.get_running_loop().call_later(0.5, lambda: greeting_audio or self._greeted.set())
+                continue
+            if kind == "tts_start" and not self._greeted.is_set():
+                greeting_audio = True
+            if self._turn and self._greeted.is_set():
+                self._turn.record(kind, now)
+            if kind == "tts_end":
+                self._playback = asyncio.create_task(
+                    self._play_out(websocket, self._turn if self._greeted.is_set() else None))
+            elif kind == "tts_flush":
+                # Barge-in: the buffered audio is dropped unplayed.
+                if self._playback is not None:
+                    self._playback.cancel()
+                self._playback_started, self._playback_bytes = None, 0
+
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    return {f"p{q}": round(float(np.percentile(values, q)), 1) for q in (50, 95, 99)}
+
+
+async def run_level(url: str, concurrency: int, speech: np.ndarray, turns: int, think_s: float,
+                    turn_timeout: float, ramp_s: float, playback_kbps: int = PLAYBACK_KBPS) -> dict:
+    callers = [Caller(i, url, speech, turns, think_s, turn_timeout, playback_kbps) for i in range(concurrency)]
+
+    async def start(caller: Caller):
+        # Spread connections over the ramp so turns don't all line up.
+        await asyncio.sleep(ramp_s * caller.index / concurrency)
+        await caller.run()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(start(caller) for caller in callers))
+    timelines = [timeline for caller in callers for timeline in caller.timelines]
+    ok = [timeline for timeline in timelines if timeline.status == "ok"]
+    result = {
+        "concurrency": concurrency,
+        "seconds": round(time.perf_counter() - started, 1),
+        "sessions_failed": sum(1 for caller in callers if caller.error),
+        "turns": len(timelines),
+        "turns_ok": len(ok),
+        "turn_status": {status: sum(1 for t in timelines if t.status == status)
+                        for status in sorted({t.status for t in timelines})},
+        "late_frames": sum(caller.late_frames for caller in callers),
+        "connect_ms": percentiles([c.connect_ms for c in callers if c.connect_ms is not None]),
+        "greeting_ms": percentiles([c.greeting_ms for c in callers if c.greeting_ms is not None]),
+        "errors": sorted({caller.error for caller in callers if caller.error})[:5],
+    }
+    for metric in METRICS:
+        result[f"{metric}_ms"] = percentiles([t.marks[metric] for t in timelines if metric in t.marks])
+    result["timelines"] = [timeline.to_dict() for timeline in timelines]
+    return result
+
+
+def print_report(results: list):
+    header = f"{'conc':>5} {'turns':>8} " + " ".join(f"{metric + ' p50/p95/p99 ms':>28}" for metric in METRICS)
+    print(header)
+    print("-" * len(header))
+
+    def cell(p: dict) -> str:
+        return "/".join("-" if p[k] is None else f"{p[k]:.0f}" for k in ("p50", "p95", "p99"))
+
+    for r in results:
+        turns = f"{r['turns_ok']}/{r['turns']}"
+        print(f"{r['concurrency']:>5} {turns:>8} " + " ".join(f"{cell(r[metric + '_ms']):>28}" for metric in METRICS))
+        if r["sessions_failed"] or r["turns_ok"] < r["turns"] or r["late_frames"]:
+            print(f"{'':>5} sessions failed: {r['sessions_failed']}, turns: {r['turn_status']}, "
+                  f"late mic frames: {r['late_frames']} {'; '.join(r['errors'])}")
+
+
+# --- Local stand-in deployment (--spawn) ---
+
+def _wait_until_up(url: str, process: subprocess.Popen, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited during startup (code {process.returncode})")
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.25)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def spawn_stack(server_port: int, standin_port: int, standin_args: str, workdir: str) -> list:
+    """Starts the provider stand-ins and server.py pointed at them; returns the processes."""
+    standin_url = f"http://127.0.0.1:{standin_port}"
+    standins = subprocess.Popen([sys.executable, "-m", "loadtest.providerStandins", "--port", str(standin_port),
+                                 *shlex.split(standin_args)], cwd=REPO_ROOT, stdout=subprocess.DEVNULL)
+    processes = [standins]
+    try:
+        _wait_until_up(f"{standin_url}/stats", standins, 30)
+        env = dict(os.environ)
+        env.pop("APP_PASSWORD", None)
+        env.update(server_env(standin_url))
+        env.update({"MISTRAL_API_KEY": "loadtest", "ELEVENLABS_API_KEY": "loadtest", "SARVAM_API_KEY": "loadtest",
+                    "LOG_DIR": os.path.join(workdir, "logs"), "LOG_STORE": "0",
+                    "PERSONA_ASSETS_DIR": os.path.join(workdir, "personas"),
+                    "TTS_CACHE_DIR": os.path.join(workdir, "tts")})
+        # Every sentence reaches the TTS stand-in unless TTS_CACHE is set explicitly.
+        env.setdefault("TTS_CACHE", "0")
+        with open(os.path.join(REPO_ROOT, "persona", "personas.json"), encoding="utf-8") as f:
+            for persona in json.load(f)["personas"].values():
+                if persona.get("voice_id_env"):
+                    env.setdefault(persona["voice_id_env"], "loadtest-voice")
+        server_log = open(os.path.join(workdir, "server.log"), "w")
+        server = subprocess.Popen([sys.executable, "-m", "uvicorn", "server:app", "--port", str(server_port),
+                                   "--log-level", "warning"], cwd=REPO_ROOT, env=env,
+                                  stdout=server_log, stderr=subprocess.STDOUT)
+        processes.append(server)
+        _wait_until_up(f"http://127.0.0.1:{server_port}/stats", server, 180)
+    except Exception:
+        stop_stack(processes)
+        raise
+    return processes
+
+
+def stop_stack(processes: list):
+    for process in reversed(processes):
+        process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /ws with concurrent simulated callers.")
+    parser.add_argument("--url", default="ws://127.0.0.1:8000/ws", help="the server's /ws URL (ignored with --spawn)")
+    parser.add_argument("--password", default=os.getenv("APP_PASSWORD"))
+    parser.add_argument("--character", default="Taara")
+    parser.add_argument("--concurrency", default="1,5,10", help="comma-separated numbers of simultaneous callers")
+    parser.add_argument("--turns", type=int, default=3, help="turns per caller")
+    parser.add_argument("--think-s", type=float, default=1.0, help="pause after each reply before speaking again")
+    parser.add_argument("--turn-timeout", type=float, default=30.0, help="time allowed for a reply, including its playback")
+    parser.add_argument("--playback-kbps", type=int, default=PLAYBACK_KBPS, help="bitrate used to pace simulated playback")
+    parser.add_argument("--ramp-s", type=float, default=2.0, help="time over which callers connect")
+    parser.add_argument("--audio", help="16 kHz mono 16-bit WAV of one utterance (default: synthetic speech)")
+    parser.add_argument("--json", help="write the results, with every turn's timeline, to this file")
+    parser.add_argument("--spawn", action="store_true", help="start the provider stand-ins and server.py locally")
+    parser.add_argument("--server-port", type=int, default=8800)
+    parser.add_argument("--standin-port", type=int, default=9100)
+    parser.add_argument("--standin-args", default="", help='extra loadtest.providerStandins options, e.g. "--stt 500:200"')
+    args = parser.parse_args()
+
+    speech = to_pcm16(read_wav(args.audio) if args.audio else synthetic_utterance())
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+
+    processes = []
+    url = args.url
+    if args.spawn:
+        workdir = tempfile.mkdtemp(prefix="vaani-loadtest-")
+        print(f"🚀 Starting provider stand-ins and server.py (logs in {workdir})...")
+        processes = spawn_stack(args.server_port, args.standin_port, args.standin_args, workdir)
+        url = f"ws://127.0.0.1:{args.server_port}/ws"
+    query = {"character": args.character}
+    if args.password and not args.spawn:
+        query["password"] = args.password
+    url = f"{url}?{urllib.parse.urlencode(query)}"
+
+    results = []
+    try:
+        for concurrency in levels:
+            print(f"📞 {concurrency} concurrent callers x {args.turns} turns...")
+            results.append(asyncio.run(run_level(url, concurrency, speech, args.turns, args.think_s,
+                                                 args.turn_timeout, args.ramp_s, args.playback_kbps)))
+    finally:
+        stop_stack(processes)
+
+    print()
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results and turn timelines written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+# loadtest/providerStandins.py
+
+"""
+Local stand-ins for the three upstream APIs, so server.py can be load
+tested offline and without spending provider credits.
+
+One FastAPI app serves all of them, wire-compatible with the clients in
+providers/clientRegistry.py:
+
+    POST /speech-to-text                      Sarvam STT (SDK and STT_PROVIDER=http)
+    POST /v1/chat/completions                 Mistral chat, streamed (SSE) or not
+    POST /v1/text-to-speech/{voice}/stream    ElevenLabs streaming TTS
+
+Every delay is drawn from a configurable distribution (see Latency), and
+each provider fails a configurable share of its requests with an HTTP
+error, so tails and failure handling can be exercised too:
+
+  - STT answers after one delay, with a line from USER_LINES
+  - chat waits a time-to-first-token delay, then streams --reply-words
+    words with an inter-token delay
+  - TTS waits a time-to-first-byte delay, then streams audio-sized
+    payloads (about --audio-kbps for the text's speaking time) in chunks
+    with an inter-chunk delay; the bytes are filler, not decodable MP3
+
+Point the server at it with the environment printed on startup. GET /stats
+returns per-provider request, error and concurrency counters.
+
+Usage:
+    python -m loadtest.providerStandins [--port 9100] [--stt 350:120] [--llm-first-token 400:150:lognormal]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+WORDS_PER_SECOND = 2.5
+
+USER_LINES = [
+    "Hey, how was your day?",
+    "Can you tell me a fun fact about space?",
+    "I have an exam tomorrow and I'm a bit nervous.",
+    "What should I cook for dinner tonight?",
+    "Suggest a good movie for the weekend.",
+    "Kal milte hain, bye!",
+]
+
+REPLY_WORDS = ("Arre wah, that sounds like a solid plan. Honestly, take it one step at a time and you'll be fine. "
+               "I'm right here if you want to talk it through. Tell me more about what's on your mind, yaar. "
+               "Also, don't forget to drink some water and take a short break.").split()
+
+
+class Latency:
+    """
+    A delay distribution, written "MEAN_MS[:JITTER_MS[:DIST]]". JITTER_MS is
+    the standard deviation (the half-width for uniform); DIST is one of
+    fixed, uniform, normal or lognormal (the default, for realistic tails).
+    """
+
+    def __init__(self, mean_ms: float, jitter_ms: float = 0.0, distribution: str = "lognormal"):
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution {distribution!r}; use one of {', '.join(DISTRIBUTIONS)}")
+        self.mean_ms = mean_ms
+        self.jitter_ms = jitter_ms
+        self.distribution = distribution
+
+    @classmethod
+    def parse(cls, spec: str):
+        parts = spec.split(":")
+        if not 1 <= len(parts) <= 3:
+            raise ValueError(f"Bad latency {spec!r}; expected MEAN_MS[:JITTER_MS[:DIST]]")
+        return cls(float(parts[0]), float(parts[1]) if len(parts) > 1 else 0.0,
+                   parts[2] if len(parts) > 2 else "lognormal")
+
+    def sample(self, rng: random.Random) -> float:
+        """One delay, in seconds."""
+        mean, jitter = self.mean_ms, self.jitter_ms
+        if jitter <= 0 or mean <= 0 or self.distribution == "fixed":
+            delay = mean
+        elif self.distribution == "uniform":
+            delay = rng.uniform(mean - jitter, mean + jitter)
+        elif self.distribution == "normal":
+            delay = rng.gauss(mean, jitter)
+        else:
+            # Parameters chosen so the samples have this mean and standard deviation.
+            sigma = math.sqrt(math.log(1 + (jitter / mean) ** 2))
+            delay = rng.lognormvariate(math.log(mean) - sigma ** 2 / 2, sigma)
+        return max(delay, 0.0) / 1000
+
+    def __str__(self):
+        return f"{self.mean_ms:g}:{self.jitter_ms:g}:{self.distribution}"
+
+
+class ProviderStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def started(self):
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def finished(self):
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "errors": self.errors,
+                "in_flight": self.in_flight, "max_in_flight": self.max_in_flight}
+
+
+class ProviderStandins:
+    """The stand-ins' behaviour; build_app() serves it."""
+
+    def __init__(self, stt: Latency, llm_first_token: Latency, llm_token: Latency, tts_first_byte: Latency,
+                 tts_chunk: Latency, reply_words: int = 30, audio_kbps: int = 128, chunk_bytes: int = 4096,
+                 error_rates: dict = None, error_status: int = 503, seed: int = None):
+        self.stt = stt
+        self.llm_first_token = llm_first_token
+        self.llm_token = llm_token
+        self.tts_first_byte = tts_first_byte
+        self.tts_chunk = tts_chunk
+        self.reply_words = reply_words
+        self.audio_bytes_per_s = audio_kbps * 1000 // 8
+        self.chunk_bytes = chunk_bytes
+        self.error_rates = error_rates or {}
+        self.error_status = error_status
+        self.rng = random.Random(seed)
+        self.metrics = {name: ProviderStats() for name in ("stt", "llm", "tts")}
+        self._lines = 0
+
+    def fails(self, provider: str) -> bool:
+        if self.rng.random() < self.error_rates.get(provider, 0.0):
+            self.metrics[provider].errors += 1
+            return True
+        return False
+
+    def error(self, provider: str) -> JSONResponse:
+        return JSONResponse({"message": f"{provider} stand-in: injected error"}, status_code=self.error_status)
+
+    def user_line(self) -> str:
+        self._lines += 1
+        return USER_LINES[(self._lines - 1) % len(USER_LINES)]
+
+    def reply(self) -> list:
+        """The reply's tokens: words with their leading space, as Mistral streams them."""
+        start = self.rng.randrange(len(REPLY_WORDS))
+        words = [REPLY_WORDS[(start + i) % len(REPLY_WORDS)] for i in range(self.reply_words)]
+        return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+    def stats(self) -> dict:
+        return {name: metrics.stats() for name, metrics in self.metrics.items()}
+
+
+def _chat_chunk(content: str, finish_reason: str = None) -> str:
+    chunk = {"id": "standin", "object": "chat.completion.chunk", "created": int(time.time()), "model": "standin",
+             "choices": [{"index": 0, "delta": {"role": "assistant", "content": content},
+                          "finish_reason": finish_reason}]}
+    return f"data: {json.dumps(chunk)}\n\n"
+
+
+def build_app(standins: ProviderStandins) -> FastAPI:
+    app = FastAPI(title="Provider stand-ins")
+
+    @app.api_route("/", methods=["GET", "HEAD"])
+    async def root():
+        # Answers the server's connection pre-warming (providers/prewarm.py).
+        return {"status": "ok"}
+
+    @app.get("/stats")
+    async def stats():
+        return standins.stats()
+
+    @app.post("/speech-to-text")
+    async def speech_to_text(request: Request):
+        metrics = standins.metrics["stt"]
+        metrics.started()
+        try:
+            await request.body()
+            await asyncio.sleep(standins.stt.sample(standins.rng))
+            if standins.fails("stt"):
+                return standins.error("stt")
+            return {"request_id": "standin", "transcript": standins.user_line(), "language_code": "en-IN"}
+        finally:
+            metrics.finished()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        metrics = standins.metrics["llm"]
+        metrics.started()
+        tokens = standins.reply()
+        if not body.get("stream"):
+            try:
+                await asyncio.sleep(standins.llm_first_token.sample(standins.rng))
+                if standins.fails("llm"):
+                    return standins.error("llm")
+                return {"id": "standin", "object": "chat.completion", "created": int(time.time()), "model": "standin",
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)},
+                                     "finish_reason": "stop"}],
+                        "usage": {"prompt_tokens": 1, "completion_tokens": len(tokens), "total_tokens": len(tokens) + 1}}
+            finally:
+                metrics.finished()
+
+        try:
+            await asyncio.sleep(standins.llm_first_token.sample(standins.rng))
+        except asyncio.CancelledError:
+            metrics.finished()
+            raise
+        if standins.fails("llm"):
+            metrics.finished()
+            return standins.error("llm")
+
+        async def stream():
+            try:
+                for i, token in enumerate(tokens):
+                    if i:
+                        await asyncio.sleep(standins.llm_token.sample(standins.rng))
+                    yield _chat_chunk(token)
+                yield _chat_chunk("", "stop")
+                yield "data: [DONE]\n\n"
+            finally:
+                metrics.finished()
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.post("/v1/text-to-speech/{voice_id}/stream")
+    async def text_to_speech(voice_id: str, request: Request):
+        body = await request.json()
+        metrics = standins.metrics["tts"]
+        metrics.started()
+        try:
+            await asyncio.sleep(standins.tts_first_byte.sample(standins.rng))
+        except asyncio.CancelledError:
+            metrics.finished()
+            raise
+        if standins.fails("tts"):
+            metrics.finished()
+            return standins.error("tts")
+        words = max(len(body.get("text", "").split()), 1)
+        size = int(words / WORDS_PER_SECOND * standins.audio_bytes_per_s)
+
+        async def stream():
+            try:
+                sent = 0
+                while sent < size:
+                    if sent:
+                        await asyncio.sleep(standins.tts_chunk.sample(standins.rng))
+                    chunk = min(standins.chunk_bytes, size - sent)
+                    yield b"\xff" * chunk
+                    sent += chunk
+            finally:
+                metrics.finished()
+
+        return StreamingResponse(stream(), media_type="audio/mpeg")
+
+    return app
+
+
+def server_env(base_url: str) -> dict:
+    """Environment that points server.py's providers at the stand-ins."""
+    return {
+        "MISTRAL_ENDPOINT": base_url,
+        "ELEVENLABS_BASE_URL": base_url,
+        "SARVAM_BASE_URL": base_url,
+        "STT_PROVIDER": "http",
+        "STT_HTTP_URL": f"{base_url}/speech-to-text",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-ins for the Sarvam, Mistral and ElevenLabs APIs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--stt", type=Latency.parse, default="350:120", help="STT response time, MEAN_MS[:JITTER_MS[:DIST]]")
+    parser.add_argument("--llm-first-token", type=Latency.parse, default="400:150", help="chat time to first token")
+    parser.add_argument("--llm-token", type=Latency.parse, default="25:10", help="chat delay between tokens")
+    parser.add_argument("--tts-first-byte", type=Latency.parse, default="300:100", help="TTS time to first byte")
+    parser.add_argument("--tts-chunk", type=Latency.parse, default="40:15", help="TTS delay between chunks")
+    parser.add_argument("--reply-words", type=int, default=30, help="words per chat reply")
+    parser.add_argument("--audio-kbps", type=int, default=128, help="bitrate the TTS payload size is based on")
+    parser.add_argument("--stt-errors", type=float, default=0.0, help="share of STT requests that fail")
+    parser.add_argument("--llm-errors", type=float, default=0.0, help="share of chat requests that fail")
+    parser.add_argument("--tts-errors", type=float, default=0.0, help="share of TTS requests that fail")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    standins = ProviderStandins(
+        args.stt, args.llm_first_token, args.llm_token, args.tts_first_byte, args.tts_chunk,
+        reply_words=args.reply_words, audio_kbps=args.audio_kbps,
+        error_rates={"stt": args.stt_errors, "llm": args.llm_errors, "tts": args.tts_errors},
+        error_status=args.error_status, seed=args.seed,
+    )
+    print(f"🧪 Provider stand-ins on http://{args.host}:{args.port}")
+    print(f"   stt {args.stt} | llm first token {args.llm_first_token}, per token {args.llm_token} | "
+          f"tts first byte {args.tts_first_byte}, per chunk {args.tts_chunk}")
+    print("   Point server.py at them with:")
+    for name, value in server_env(f"http://{args.host}:{args.port}").items():
+        print(f"   export {name}={value}")
+    uvicorn.run(build_app(standins), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
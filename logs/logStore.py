@@ -0,0 +1,466 @@
+# logs/logStore.py
+
+"""
+Conversation archive in SQLite.
+
+The daily CSVs ("28th May, 2025.csv", older ones "28 May, 2025.csv") are
+fine for reading one day, but any question across days means parsing every
+file. The store keeps every message in one SQLite database in WAL mode
+(readers don't block the log writer), indexed for the lookups we make:
+
+    messages  one row per message: ts (ISO local time), session, persona,
+              speaker (User / AI), channel (voice / text / NULL) and text;
+              indexed on ts, and on session, persona and speaker with ts
+    sessions  one row per conversation with its persona, first and last
+              timestamp and message count, kept up to date on insert, so
+              listing sessions never scans messages
+    daily     per day and persona: user turns, AI replies and their word
+              counts, also kept up to date on insert, for the aggregate views
+    messages_fts
+              full-text index (FTS5) of the message text; refresh_search_index()
+              adds only the messages appended since it last ran
+
+The background log writer (logs/logWriter.py) inserts live messages with
+their session and persona. The CSVs written before that are imported once:
+rows that are git merge-conflict markers are skipped, rows already in the
+store are not inserted twice, and since those files have no session ids,
+a gap of more than IMPORT_SESSION_GAP between messages starts a new one.
+A file that grew since it was imported (today's) is read on from the byte
+offset the last import stopped at.
+
+    python -m logs.logStore import [--logs-dir logs] [--db logs/conversations.db]
+    python -m logs.logStore sessions --from 2025-06-01 --to 2025-07-01
+    python -m logs.logStore session <id>
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+LOGS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB = os.path.join(LOGS_DIR, "conversations.db")
+IMPORT_SESSION_GAP = timedelta(minutes=30)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id       INTEGER PRIMARY KEY,
+    ts       TEXT NOT NULL,
+    session  TEXT NOT NULL,
+    persona  TEXT,
+    speaker  TEXT NOT NULL,
+    channel  TEXT,
+    text     TEXT NOT NULL,
+    source   TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_messages_ts ON messages (ts);
+CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session, ts);
+CREATE INDEX IF NOT EXISTS idx_messages_persona ON messages (persona, ts);
+CREATE INDEX IF NOT EXISTS idx_messages_speaker ON messages (speaker, ts);
+
+CREATE TABLE IF NOT EXISTS sessions (
+    id          TEXT PRIMARY KEY,
+    persona     TEXT,
+    started_at  TEXT NOT NULL,
+    ended_at    TEXT NOT NULL,
+    messages    INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_started ON sessions (started_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_persona ON sessions (persona, started_at);
+
+CREATE TABLE IF NOT EXISTS daily (
+    day         TEXT NOT NULL,
+    persona     TEXT NOT NULL DEFAULT '',
+    user_turns  INTEGER NOT NULL DEFAULT 0,
+    ai_replies  INTEGER NOT NULL DEFAULT 0,
+    user_words  INTEGER NOT NULL DEFAULT 0,
+    ai_words    INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, persona)
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key    TEXT PRIMARY KEY,
+    value
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5 (
+    text, content = 'messages', content_rowid = 'id', tokenize = 'unicode61 remove_diacritics 2'
+);
+
+CREATE TABLE IF NOT EXISTS imports (
+    source       TEXT PRIMARY KEY,
+    size         INTEGER,
+    mtime        REAL,
+    rows         INTEGER,
+    skipped      INTEGER,
+    imported_at  TEXT,
+    session      TEXT,
+    last_ts      TEXT
+);
+"""
+# imports.size is how far into the file the last import read; a file that
+# grew is read on from there. These columns, added after imports was first
+# created, hold the session its last row went into.
+_IMPORT_RESUME_COLUMNS = {"session": "TEXT", "last_ts": "TEXT"}
+
+_FILE_DATE = re.compile(r"^(\d{1,2})(?:st|nd|rd|th)? (\w+), (\d{4})$")
+_PERSON = re.compile(r"^\s*(User|AI)\s*(?:\((\w+)\))?\s*$")
+_CONFLICT_MARKERS = ("<<<<<<<", "=======", ">>>>>>>")
+
+
+def parse_log_date(text: str):
+    """The date in a log file name or Date column ("28th May, 2025" or "28 May, 2025"), or None."""
+    match = _FILE_DATE.match((text or "").strip())
+    if not match:
+        return None
+    day, month, year = match.groups()
+    try:
+        return datetime.strptime(f"{day} {month} {year}", "%d %B %Y")
+    except ValueError:
+        return None
+
+
+def parse_person(person: str):
+    """("User", "voice") for "User (voice)", ("AI", None) for "AI"; None for anything else."""
+    match = _PERSON.match(person or "")
+    return (match.group(1), match.group(2)) if match else None
+
+
+def format_ts(when: datetime) -> str:
+    return when.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def word_count(text: str) -> int:
+    return len(text.split())
+
+
+def fts_query(text: str) -> str:
+    """A user's search box input as an FTS5 query: all words must match, the last one as a prefix."""
+    terms = ['"' + term.replace('"', '""') + '"' for term in text.split()]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+class LogStore:
+    def __init__(self, path: str = DEFAULT_DB):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=10)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.create_function("word_count", 1, word_count, deterministic=True)
+        self.db.executescript(_SCHEMA)
+        columns = {row["name"] for row in self.db.execute("PRAGMA table_info(imports)")}
+        for column, kind in _IMPORT_RESUME_COLUMNS.items():
+            if column not in columns:
+                self.db.execute(f"ALTER TABLE imports ADD COLUMN {column} {kind}")
+        if self.db.execute("SELECT NOT EXISTS (SELECT 1 FROM daily) AND EXISTS (SELECT 1 FROM messages)").fetchone()[0]:
+            self._rebuild_daily()
+
+    def close(self):
+        self.db.close()
+
+    # --- Writing ---
+
+    def insert_many(self, rows: list, source: str = None):
+        """
+        Inserts (ts, session, persona, speaker, channel, text) rows in one
+        transaction and updates their sessions.
+        """
+        if not rows:
+            return
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO messages (ts, session, persona, speaker, channel, text, source) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [row + (source,) for row in rows])
+            self.db.executemany(
+                """INSERT INTO sessions (id, persona, started_at, ended_at, messages) VALUES (?, ?, ?, ?, 1)
+                   ON CONFLICT (id) DO UPDATE SET
+                       started_at = min(started_at, excluded.started_at),
+                       ended_at = max(ended_at, excluded.ended_at),
+                       persona = coalesce(persona, excluded.persona),
+                       messages = messages + 1""",
+                [(session, persona, ts, ts) for ts, session, persona, *_ in rows])
+            self.db.executemany(
+                """INSERT INTO daily (day, persona, user_turns, ai_replies, user_words, ai_words) VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (day, persona) DO UPDATE SET
+                       user_turns = user_turns + excluded.user_turns,
+                       ai_replies = ai_replies + excluded.ai_replies,
+                       user_words = user_words + excluded.user_words,
+                       ai_words = ai_words + excluded.ai_words""",
+                [(ts[:10], persona or "", speaker == "User", speaker == "AI",
+                  word_count(text) if speaker == "User" else 0, word_count(text) if speaker == "AI" else 0)
+                 for ts, _, persona, speaker, _, text in rows])
+
+    def _rebuild_daily(self):
+        """Fills the daily table from messages (databases created before it existed)."""
+        with self.db:
+            self.db.execute("DELETE FROM daily")
+            self.db.execute(
+                """INSERT INTO daily (day, persona, user_turns, ai_replies, user_words, ai_words)
+                   SELECT substr(ts, 1, 10), coalesce(persona, ''),
+                          sum(speaker = 'User'), sum(speaker = 'AI'),
+                          sum(CASE WHEN speaker = 'User' THEN word_count(text) ELSE 0 END),
+                          sum(CASE WHEN speaker = 'AI' THEN word_count(text) ELSE 0 END)
+                   FROM messages GROUP BY 1, 2""")
+
+    def refresh_search_index(self) -> int:
+        """Adds the messages appended since the last call to the full-text index; returns how many."""
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'fts_indexed_id'").fetchone()
+        indexed = row[0] if row else 0
+        last = self.db.execute("SELECT coalesce(max(id), 0) FROM messages").fetchone()[0]
+        if last <= indexed:
+            return 0
+        with self.db:
+            # Messages are only ever appended, so everything past the last indexed id is new.
+            self.db.execute("INSERT INTO messages_fts (rowid, text) SELECT id, text FROM messages WHERE id > ?", (indexed,))
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('fts_indexed_id', ?)", (last,))
+        return last - indexed
+
+    def _existing(self, first_ts: str, last_ts: str) -> set:
+        """(ts, speaker, text) of every stored message between two timestamps, to skip rows logged live."""
+        return {tuple(row) for row in self.db.execute(
+            "SELECT ts, speaker, text FROM messages WHERE ts BETWEEN ? AND ?", (first_ts, last_ts))}
+
+    def import_csv(self, path: str, force: bool = False) -> dict:
+        """
+        Imports one daily CSV (once, unless it changed or force is set). A
+        file that only grew since its last import (today's, still being
+        written) is read from where that import stopped.
+        """
+        source = os.path.basename(path)
+        stat = os.stat(path)
+        done = self.db.execute("SELECT * FROM imports WHERE source = ?", (source,)).fetchone()
+        if done and not force and done["size"] == stat.st_size and done["mtime"] == stat.st_mtime:
+            return {"source": source, "status": "already imported"}
+        resume = done is not None and not force and stat.st_size >= done["size"]
+
+        with open(path, "rb") as f:
+            header = f.readline()
+            if resume:
+                f.seek(done["size"])
+            offset = f.tell()
+            data = f.read()
+        # A row still being written is left for the next import, unless the file
+        # hasn't changed since the last one (its last row has no line break).
+        if not data.endswith(b"\n") and not (done and done["mtime"] == stat.st_mtime):
+            data = data[:data.rfind(b"\n") + 1]
+        read_bytes = offset + len(data)
+        fieldnames = next(csv.reader([header.decode("utf-8")]), [])
+
+        file_date = parse_log_date(os.path.splitext(source)[0])
+        candidates, skipped = [], 0
+        for record in csv.DictReader(io.StringIO(data.decode("utf-8"), newline=""), fieldnames=fieldnames):
+            date = record.get("Date") or ""
+            person = parse_person(record.get("Person"))
+            text = record.get("Context")
+            if date.startswith(_CONFLICT_MARKERS) or person is None or not text:
+                skipped += 1
+                continue
+            day = parse_log_date(date) or file_date
+            try:
+                clock = datetime.strptime((record.get("Time") or "").strip(), "%I:%M:%S %p").time()
+            except ValueError:
+                clock = None
+            if day is None or clock is None:
+                skipped += 1
+                continue
+            candidates.append((datetime.combine(day.date(), clock), person, text))
+
+        # One query for the rows already stored, instead of one per row.
+        stored = (self._existing(format_ts(min(c[0] for c in candidates)), format_ts(max(c[0] for c in candidates)))
+                  if candidates else set())
+        rows = []
+        session = done["session"] if resume else None
+        last = datetime.fromisoformat(done["last_ts"]) if resume and done["last_ts"] else None
+        for when, (speaker, channel), text in candidates:
+            ts = format_ts(when)
+            if (ts, speaker, text) in stored:
+                # The same row on both sides of a merge conflict, or already logged live.
+                skipped += 1
+                continue
+            stored.add((ts, speaker, text))
+            if last is None or when - last > IMPORT_SESSION_GAP or when < last:
+                session = f"import-{ts}"
+            last = when
+            rows.append((ts, session, None, speaker, channel, text))
+
+        self.insert_many(rows, source=source)
+        total_rows, total_skipped = len(rows), skipped
+        if resume:
+            total_rows, total_skipped = total_rows + done["rows"], total_skipped + done["skipped"]
+        with self.db:
+            self.db.execute(
+                """INSERT OR REPLACE INTO imports (source, size, mtime, rows, skipped, imported_at, session, last_ts)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (source, read_bytes, stat.st_mtime, total_rows, total_skipped, format_ts(datetime.now()),
+                 session, format_ts(last) if last else None))
+        return {"source": source, "status": "imported", "rows": len(rows), "skipped": skipped}
+
+    def import_dir(self, logs_dir: str = LOGS_DIR, force: bool = False) -> list:
+        results = []
+        for name in sorted(os.listdir(logs_dir)):
+            if name.endswith(".csv") and parse_log_date(name[:-4]):
+                results.append(self.import_csv(os.path.join(logs_dir, name), force))
+        return results
+
+    # --- Queries ---
+
+    def range(self, start=None, end=None, persona: str = None, speaker: str = None, limit: int = 1000,
+              after: tuple = None) -> list:
+        """
+        Messages with start <= ts < end (datetimes or ISO strings, either may
+        be None), oldest first. For the next page, pass the last message's
+        (ts, id) as after.
+        """
+        where, params = [], []
+        if start is not None:
+            where.append("ts >= ?"); params.append(_ts(start))
+        if end is not None:
+            where.append("ts < ?"); params.append(_ts(end))
+        if persona is not None:
+            where.append("persona = ?"); params.append(persona)
+        if speaker is not None:
+            where.append("speaker = ?"); params.append(speaker)
+        if after is not None:
+            where.append("(ts, id) > (?, ?)"); params += list(after)
+        sql = "SELECT * FROM messages"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts, id LIMIT ?"
+        return [dict(row) for row in self.db.execute(sql, params + [limit])]
+
+    def session(self, session_id: str) -> list:
+        return [dict(row) for row in self.db.execute(
+            "SELECT * FROM messages WHERE session = ? ORDER BY ts, id", (session_id,))]
+
+    def sessions(self, start=None, end=None, persona: str = None, limit: int = 100) -> list:
+        """Sessions that started in [start, end), newest first."""
+        where, params = [], []
+        if start is not None:
+            where.append("started_at >= ?"); params.append(_ts(start))
+        if end is not None:
+            where.append("started_at < ?"); params.append(_ts(end))
+        if persona is not None:
+            where.append("persona = ?"); params.append(persona)
+        sql = "SELECT * FROM sessions"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY started_at DESC LIMIT ?"
+        return [dict(row) for row in self.db.execute(sql, params + [limit])]
+
+    def search(self, text: str, start=None, end=None, persona: str = None, limit: int = 50, offset: int = 0) -> list:
+        """
+        Messages containing every word of text (the last one as a prefix),
+        newest first, each with a highlighted snippet. Only messages already
+        in the search index are found; see refresh_search_index().
+        """
+        query = fts_query(text)
+        if not query:
+            return []
+        where, params = ["messages_fts MATCH ?"], [query]
+        if start is not None:
+            where.append("m.ts >= ?"); params.append(_ts(start))
+        if end is not None:
+            where.append("m.ts < ?"); params.append(_ts(end))
+        if persona is not None:
+            where.append("m.persona = ?"); params.append(persona)
+        sql = f"""SELECT m.*, snippet(messages_fts, 0, '**', '**', '…', 16) AS snippet
+                  FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid
+                  WHERE {" AND ".join(where)} ORDER BY m.ts DESC, m.id DESC LIMIT ? OFFSET ?"""
+        try:
+            return [dict(row) for row in self.db.execute(sql, params + [limit, offset])]
+        except sqlite3.OperationalError:
+            # Input FTS5 still can't parse (e.g. only punctuation): no matches.
+            return []
+
+    def count(self, start=None, end=None, persona: str = None, speaker: str = None) -> int:
+        where, params = [], []
+        if start is not None:
+            where.append("ts >= ?"); params.append(_ts(start))
+        if end is not None:
+            where.append("ts < ?"); params.append(_ts(end))
+        if persona is not None:
+            where.append("persona = ?"); params.append(persona)
+        if speaker is not None:
+            where.append("speaker = ?"); params.append(speaker)
+        sql = "SELECT count(*) FROM messages" + (" WHERE " + " AND ".join(where) if where else "")
+        return self.db.execute(sql, params).fetchone()[0]
+
+    def daily(self, start=None, end=None, persona: str = None) -> list:
+        """Per-day totals (user turns, AI replies, mean words per reply) for days in [start, end)."""
+        where, params = [], []
+        if start is not None:
+            where.append("day >= ?"); params.append(_ts(start)[:10])
+        if end is not None:
+            where.append("day < ?"); params.append(_ts(end)[:10])
+        if persona is not None:
+            where.append("persona = ?"); params.append(persona)
+        sql = """SELECT day, sum(user_turns) AS user_turns, sum(ai_replies) AS ai_replies,
+                        sum(user_words) AS user_words, sum(ai_words) AS ai_words FROM daily"""
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " GROUP BY day ORDER BY day"
+        days = [dict(row) for row in self.db.execute(sql, params)]
+        for day in days:
+            day["mean_reply_words"] = round(day["ai_words"] / day["ai_replies"], 1) if day["ai_replies"] else None
+        return days
+
+    def personas(self) -> list:
+        return [row[0] for row in self.db.execute("SELECT DISTINCT persona FROM daily WHERE persona != '' ORDER BY 1")]
+
+    def stats(self) -> dict:
+        messages, first, last = self.db.execute("SELECT count(*), min(ts), max(ts) FROM messages").fetchone()
+        sessions = self.db.execute("SELECT count(*) FROM sessions").fetchone()[0]
+        return {"messages": messages, "sessions": sessions, "first": first, "last": last}
+
+
+def _ts(value) -> str:
+    return format_ts(value) if isinstance(value, datetime) else str(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conversation log archive (SQLite).")
+    parser.add_argument("--db", default=os.getenv("LOG_DB") or DEFAULT_DB)
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import", help="import the daily CSV logs")
+    importer.add_argument("--logs-dir", default=LOGS_DIR)
+    importer.add_argument("--force", action="store_true", help="re-read files already imported")
+    listing = commands.add_parser("sessions", help="list sessions")
+    listing.add_argument("--from", dest="start")
+    listing.add_argument("--to", dest="end")
+    listing.add_argument("--persona")
+    listing.add_argument("--limit", type=int, default=50)
+    one = commands.add_parser("session", help="print one session")
+    one.add_argument("id")
+    args = parser.parse_args()
+
+    store = LogStore(args.db)
+    if args.command == "import":
+        started = time.perf_counter()
+        results = store.import_dir(args.logs_dir, args.force)
+        imported = [r for r in results if r["status"] == "imported"]
+        print(json.dumps({"files": len(results), "imported": len(imported),
+                          "rows": sum(r["rows"] for r in imported),
+                          "skipped": sum(r["skipped"] for r in imported),
+                          "seconds": round(time.perf_counter() - started, 3), "store": store.stats()}, indent=2))
+    elif args.command == "sessions":
+        for s in store.sessions(args.start, args.end, args.persona, args.limit):
+            print(f"{s['started_at']}  {s['ended_at'][11:]}  {s['messages']:4d}  {s['persona'] or '-':6s}  {s['id']}")
+    else:
+        for m in store.session(args.id):
+            channel = f" ({m['channel']})" if m["channel"] else ""
+            print(f"{m['ts']}  {m['speaker']}{channel}: {m['text']}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
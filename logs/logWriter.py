@@ -0,0 +1,231 @@
+# logs/logWriter.py
+
+"""
+Background writer for the conversation logs.
+
+log_conversation() used to read the whole day's CSV with pandas, add one
+row and write the file back, on the event loop, for every message. Now it
+only puts a record on a bounded in-memory queue. A single writer thread
+takes records off in batches and appends them to the day's file with the
+csv module, so the cost per message stays the same however long the day
+has been:
+
+  - the day's file is opened once and appended to; a record stamped with a
+    new date goes to the next day's file (rollover), with the header
+    written when a file is created
+  - each batch is flushed when written; fsync runs at most every
+    LOG_FSYNC_INTERVAL_S seconds, and on close
+  - when the queue is full the record is dropped and counted: log() runs
+    on the event loop, and waiting for room would stall every session
+
+Files go to LOG_DIR (default logs/). The file format is unchanged: Date,
+Time, Person, Context, e.g. "28th May, 2025", "03:02:01 PM". Each batch
+also goes into the SQLite archive (logs/logStore.py, LOG_DB) with its
+session and persona, unless LOG_STORE=0.
+"""
+
+import atexit
+import csv
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from logs.logStore import DEFAULT_DB, LogStore, format_ts, parse_person
+
+COLUMNS = ["Date", "Time", "Person", "Context"]
+
+
+def format_date(now: datetime) -> str:
+    day = now.day
+    day_suffix = "th" if 11 <= day <= 13 else {1: "st", 2: "nd", 3: "rd"}.get(day % 10, "th")
+    return f"{day}{day_suffix} {now.strftime('%B, %Y')}"  # e.g. 28th May, 2025
+
+
+class LogWriter:
+    def __init__(self, max_queue: int = 10000, batch_size: int = 256, fsync_interval: float = 1.0,
+                 db_path: str = None, logs_dir: str = "logs"):
+        self.db_path = db_path
+        self.logs_dir = logs_dir
+        # Messages logged without a session (e.g. from main.py) share this process's.
+        self.default_session = uuid.uuid4().hex[:12]
+        self._store = None
+        self.batch_size = batch_size
+        self.fsync_interval = fsync_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._file = None
+        self._path = None
+        self._writer = None
+        self._last_fsync = 0.0
+        self._dirty = False
+        self.queued = 0
+        self.written = 0
+        self.batches = 0
+        self.fsyncs = 0
+        self.dropped = 0
+        self.errors = 0
+        self.max_depth = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_queue=int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+            batch_size=int(os.getenv("LOG_BATCH_SIZE", "256")),
+            fsync_interval=float(os.getenv("LOG_FSYNC_INTERVAL_S", "1.0")),
+            db_path=(os.getenv("LOG_DB") or DEFAULT_DB) if os.getenv("LOG_STORE", "1") == "1" else None,
+            logs_dir=os.getenv("LOG_DIR", "logs"),
+        )
+
+    def log(self, person: str, message: str, logs_dir: str = None, session: str = None, persona: str = None):
+        """Queues one row, stamped now. Returns False if it had to be dropped."""
+        record = (logs_dir or self.logs_dir, datetime.now(), person, message, session or self.default_session, persona)
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            logging.warning("Conversation log queue is full; dropped a record.")
+            return False
+        self.queued += 1
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+        return True
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+
+    # --- Writer thread ---
+
+    def _run(self):
+        while True:
+            try:
+                record = self._queue.get(timeout=self.fsync_interval)
+            except queue.Empty:
+                # Idle: make sure the last batch reaches the disk.
+                self._fsync()
+                continue
+            if record is None:
+                break
+            batch = [record]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is None:
+                    stop = True
+                    break
+                batch.append(record)
+            self._write(batch)
+            if stop:
+                break
+        self._close_file()
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+    def _write(self, batch: list):
+        try:
+            for logs_dir, now, person, message, _, _ in batch:
+                date = format_date(now)
+                path = os.path.join(logs_dir, f"{date}.csv")
+                if path != self._path:
+                    self._open(logs_dir, path)
+                self._writer.writerow([date, now.strftime("%I:%M:%S %p"), person, message])
+            self._file.flush()
+            self._dirty = True
+            self.written += len(batch)
+            self.batches += 1
+            if time.monotonic() - self._last_fsync >= self.fsync_interval:
+                self._fsync()
+        except OSError as e:
+            self.errors += 1
+            logging.error(f"Could not write conversation log: {e}")
+            self._close_file()
+        if self.db_path:
+            self._archive(batch)
+
+    def _archive(self, batch: list):
+        rows = []
+        for _, now, person, message, session, persona in batch:
+            speaker, channel = parse_person(person) or (person, None)
+            rows.append((format_ts(now), session, persona, speaker, channel, message))
+        try:
+            if self._store is None:
+                # Opened on the writer thread, which is the only one using it.
+                self._store = LogStore(self.db_path)
+            self._store.insert_many(rows)
+        except sqlite3.Error as e:
+            self.errors += 1
+            logging.error(f"Could not archive conversation log: {e}")
+
+    def _open(self, logs_dir: str, path: str):
+        """Switches to another day's file (rollover), creating it with a header if needed."""
+        self._close_file()
+        os.makedirs(logs_dir, exist_ok=True)
+        self._file = open(path, "a+", newline="", encoding="utf-8")
+        self._path = path
+        self._writer = csv.writer(self._file, lineterminator="\n")
+        size = self._file.seek(0, os.SEEK_END)
+        if size == 0:
+            self._writer.writerow(COLUMNS)
+        else:
+            # Don't glue the first row onto a file that lacks a final newline.
+            self._file.seek(size - 1)
+            if self._file.read(1) != "\n":
+                self._file.write("\n")
+
+    def _fsync(self):
+        if self._file is not None and self._dirty:
+            os.fsync(self._file.fileno())
+            self.fsyncs += 1
+            self._dirty = False
+        self._last_fsync = time.monotonic()
+
+    def _close_file(self):
+        if self._file is None:
+            return
+        try:
+            self._file.flush()
+            self._fsync()
+            self._file.close()
+        except OSError as e:
+            logging.error(f"Could not close conversation log: {e}")
+        self._file = self._path = self._writer = None
+
+    # --- Lifecycle ---
+
+    def close(self, timeout: float = 5.0):
+        """Writes out everything queued and stops the writer thread."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queued,
+            "written": self.written,
+            "pending": self._queue.qsize(),
+            "max_queue_depth": self.max_depth,
+            "batches": self.batches,
+            "mean_batch": round(self.written / self.batches, 1) if self.batches else None,
+            "fsyncs": self.fsyncs,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+
+log_writer = LogWriter.from_env()
+atexit.register(log_writer.close)
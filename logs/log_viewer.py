@@ -1,34 +1,208 @@
-import streamlit as st
-import pandas as pd
+import os
+import sys
+from datetime import date, timedelta
 from pathlib import Path
-import re
+
+import pandas as pd
+import streamlit as st
+
+# Run as `streamlit run logs/log_viewer.py`; make the repo's packages importable.
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from logs.logStore import DEFAULT_DB, LogStore
 
 st.set_page_config(page_title="Shrudaya Logs Viewer", layout="wide")
 
 # Logs directory
-logs_dir = Path(__file__).resolve().parent.parent / "logs"
+logs_dir = ROOT / "logs"
+db_path = os.getenv("LOG_DB") or DEFAULT_DB
+# New CSV rows are picked up (and indexed for search) at most this often.
+SYNC_INTERVAL_S = int(os.getenv("LOG_VIEWER_SYNC_S", "30"))
+PAGE_SIZES = (50, 100, 250)
+
+
+# Everything reads from the SQLite archive (logs/logStore.py) instead of parsing
+# CSVs. Streamlit reruns this script on every widget change, so each run opens
+# a cheap connection, and query results are cached per archive version.
+def open_store() -> LogStore:
+    return LogStore(db_path)
+
+
+@st.cache_data(ttl=SYNC_INTERVAL_S, show_spinner="Indexing new log entries...")
+def sync() -> dict:
+    """Imports new or changed CSVs and indexes new messages for search; returns the archive's state."""
+    store = open_store()
+    try:
+        store.import_dir(str(logs_dir))
+        store.refresh_search_index()
+        stats = store.stats()
+        stats["personas"] = store.personas()
+        stats["version"] = store.db.execute("SELECT coalesce(max(id), 0) FROM messages").fetchone()[0]
+        return stats
+    finally:
+        store.close()
+
+
+@st.cache_data(max_entries=256)
+def load_page(start: str, end: str, persona, speaker, after, page_size: int, version: int) -> list:
+    store = open_store()
+    try:
+        return store.range(start, end, persona, speaker, limit=page_size, after=after)
+    finally:
+        store.close()
+
+
+@st.cache_data(max_entries=64)
+def load_count(start: str, end: str, persona, speaker, version: int) -> int:
+    store = open_store()
+    try:
+        return store.count(start, end, persona, speaker)
+    finally:
+        store.close()
 
-# Regex to match files like '28th May, 2025.csv'
-def date_sort_key(filename):
-    match = re.match(r"(\d{1,2})(st|nd|rd|th) (\w+), (\d{4})", filename.stem)
-    if not match:
-        # Return a very old timestamp so unmatched files appear at the end
-        return pd.Timestamp.min
-    day, _, month, year = match.groups()
-    return pd.to_datetime(f"{day} {month} {year}", format="%d %B %Y")
 
+@st.cache_data(max_entries=64)
+def load_sessions(start: str, end: str, persona, version: int) -> list:
+    store = open_store()
+    try:
+        return store.sessions(start, end, persona, limit=500)
+    finally:
+        store.close()
 
-# Find latest file
-csv_files = sorted(logs_dir.glob("*.csv"), key=date_sort_key, reverse=True)
 
-st.title("📜 Shrudaya - Daily Conversation Logs")
+@st.cache_data(max_entries=64)
+def load_session(session_id: str, version: int) -> list:
+    store = open_store()
+    try:
+        return store.session(session_id)
+    finally:
+        store.close()
 
-if csv_files:
-    latest_file = csv_files[0]
-    st.success(f"Showing logs from: **{latest_file.stem}**")
 
-    df = pd.read_csv(latest_file)
-    st.dataframe(df, use_container_width=True)
+@st.cache_data(max_entries=128)
+def search(text: str, start: str, end: str, persona, page: int, page_size: int, version: int) -> list:
+    store = open_store()
+    try:
+        # One extra row tells whether there is a next page.
+        return store.search(text, start, end, persona, limit=page_size + 1, offset=page * page_size)
+    finally:
+        store.close()
 
-else:
+
+@st.cache_data(max_entries=64)
+def load_daily(start: str, end: str, persona, version: int) -> pd.DataFrame:
+    store = open_store()
+    try:
+        return pd.DataFrame(store.daily(start, end, persona))
+    finally:
+        store.close()
+
+
+def messages_frame(messages: list) -> pd.DataFrame:
+    frame = pd.DataFrame(messages, columns=["ts", "persona", "speaker", "channel", "text"])
+    return frame.rename(columns={"ts": "Time", "persona": "Persona", "speaker": "Person",
+                                 "channel": "Channel", "text": "Context"})
+
+
+def pager(key: str, has_next: bool):
+    """Previous / next buttons over st.session_state[key] (a page number)."""
+    previous, position, following = st.columns([1, 2, 1])
+    if previous.button("← Previous", key=f"{key}-prev", disabled=st.session_state[key] == 0):
+        st.session_state[key] -= 1
+        st.rerun()
+    position.caption(f"Page {st.session_state[key] + 1}")
+    if following.button("Next →", key=f"{key}-next", disabled=not has_next):
+        st.session_state[key] += 1
+        st.rerun()
+
+
+st.title("📜 Shrudaya - Conversation Logs")
+
+archive = sync()
+if not archive["messages"]:
     st.warning("No logs found yet. Speak to your AI buddy first!")
+    st.stop()
+
+first_day = date.fromisoformat(archive["first"][:10])
+last_day = date.fromisoformat(archive["last"][:10])
+
+with st.sidebar:
+    st.caption(f"{archive['messages']} messages in {archive['sessions']} sessions, "
+               f"{first_day:%d %b %Y} to {last_day:%d %b %Y}")
+    if st.button("🔄 Refresh now"):
+        sync.clear()
+        st.rerun()
+    picked = st.date_input("Days", value=(max(first_day, last_day - timedelta(days=6)), last_day),
+                           min_value=first_day, max_value=last_day)
+    # While a range is being picked, only its first day is set.
+    days = picked if isinstance(picked, tuple) else (picked,)
+    start_day, end_day = days[0], days[-1]
+    persona = st.selectbox("Persona", ["All"] + archive["personas"])
+    persona = None if persona == "All" else persona
+    page_size = st.selectbox("Rows per page", PAGE_SIZES)
+
+start, end = start_day.isoformat(), (end_day + timedelta(days=1)).isoformat()
+version = archive["version"]
+
+conversations_tab, search_tab, stats_tab = st.tabs(["💬 Conversations", "🔎 Search", "📊 Stats"])
+
+with conversations_tab:
+    sessions = load_sessions(start, end, persona, version)
+    labels = {"All messages": None}
+    labels.update({f"{s['started_at']} · {s['messages']} messages" + (f" · {s['persona']}" if s["persona"] else ""): s["id"]
+                   for s in sessions})
+    chosen = labels[st.selectbox("Session", list(labels))]
+    if chosen is not None:
+        st.dataframe(messages_frame(load_session(chosen, version)), use_container_width=True, hide_index=True)
+    else:
+        speaker = st.radio("Person", ["Everyone", "User", "AI"], horizontal=True)
+        speaker = None if speaker == "Everyone" else speaker
+        # Keyset pagination: the cursor of each page is the last (ts, id) of the one before.
+        filters = (start, end, persona, speaker, page_size)
+        if st.session_state.get("page_filters") != filters:
+            st.session_state.page_filters = filters
+            st.session_state.cursors = [None]
+            st.session_state.page = 0
+        page = st.session_state.page
+        rows = load_page(start, end, persona, speaker, st.session_state.cursors[page], page_size, version)
+        total = load_count(start, end, persona, speaker, version)
+        st.caption(f"{total} messages")
+        st.dataframe(messages_frame(rows), use_container_width=True, hide_index=True)
+        if rows and len(st.session_state.cursors) == page + 1:
+            st.session_state.cursors.append((rows[-1]["ts"], rows[-1]["id"]))
+        pager("page", has_next=(page + 1) * page_size < total)
+
+with search_tab:
+    query = st.text_input("Search every day's messages", placeholder="e.g. pokemon, exam, kal milte")
+    if st.session_state.get("search_filters") != (query, start, end, persona, page_size):
+        st.session_state.search_filters = (query, start, end, persona, page_size)
+        st.session_state.search_page = 0
+    if query.strip():
+        all_days = st.checkbox("Search all days, not just the selected range", value=True)
+        results = search(query, None if all_days else start, None if all_days else end, persona,
+                         st.session_state.search_page, page_size, version)
+        if not results:
+            st.info("No matches.")
+        for message in results[:page_size]:
+            with st.container(border=True):
+                st.caption(f"{message['ts']} · {message['speaker']}" + (f" · {message['persona']}" if message["persona"] else ""))
+                st.markdown(message["snippet"])
+        pager("search_page", has_next=len(results) > page_size)
+
+with stats_tab:
+    daily = load_daily(start, end, persona, version)
+    if daily.empty:
+        st.info("No messages in this range.")
+    else:
+        daily = daily.set_index("day")
+        totals = st.columns(3)
+        totals[0].metric("User turns", int(daily["user_turns"].sum()))
+        totals[1].metric("AI replies", int(daily["ai_replies"].sum()))
+        replies = daily["ai_replies"].sum()
+        totals[2].metric("Words per reply", round(daily["ai_words"].sum() / replies, 1) if replies else "–")
+        st.subheader("Turns per day")
+        st.bar_chart(daily[["user_turns", "ai_replies"]])
+        st.subheader("Reply length (mean words per AI reply)")
+        st.line_chart(daily["mean_reply_words"])
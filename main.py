@@ -1,3 +1,5 @@
+import asyncio
+import os
 
 from brain.mistralAPI_brain import mistral_chat   # Brain
 from tts.elevenLabs.xiTTS import speak_text_xi    # TTS
@@ -5,13 +7,28 @@ from logs.logger import log_conversation          # Logger
 from misc.chimePlayer import play_chime           # Chime Notification
 from stt.sarvamSTT import transcribe_audio        # STT
 from recording.recordingAudio import record_audio # Audio Recorder
+from persona.personaRegistry import PersonaRegistry # Personas
+from brain.historyManager import ConversationHistory # Bounded history
+from tts.elevenLabs.xiTTS import render_tts_audio  # Renders pre-recorded lines
+from elevenlabs.play import play                    # Playback of pre-rendered lines
 
 def main():
-    conversation = []
-
-    # Greet the user first before loop starts
-    greeting = "Hello boss, how're you doing today?"
-    speak_text_xi(greeting)
+    registry = PersonaRegistry.load()
+    persona = registry.get(os.getenv("PERSONA", registry.default))
+    # No system message: mistral_chat adds the CLI's own prompt on the first turn.
+    conversation = ConversationHistory.from_env()
+
+    # Greet the user first before loop starts (rendered once, then replayed from the registry)
+    greeting, greeting_audio = registry.line(persona, "Hello boss, how're you doing today?")
+    if greeting_audio is None and persona.voice_id:
+        try:
+            greeting_audio = asyncio.run(registry.render_line(persona, greeting, render_tts_audio))
+        except Exception as e:
+            print(f"⚠️ Could not pre-render the greeting: {e}")
+    if greeting_audio:
+        play(greeting_audio)
+    else:
+        speak_text_xi(greeting, persona)
 
     print("🎤 Speak your heart out. Say 'stop' to exit anytime.\n")
 
@@ -32,7 +49,7 @@ def main():
             break
         conversation, ai_reply = mistral_chat(transcript, conversation)
         
-        speak_text_xi(ai_reply)
+        speak_text_xi(ai_reply, persona)
         if ai_reply:
             log_conversation("AI", ai_reply)
 
@@ -0,0 +1,148 @@
+# metrics/turnTrace.py
+
+"""
+Per-turn latency tracing.
+
+A TurnTrace follows one turn through the pipeline and collects timestamps
+(time.monotonic) as it passes each point:
+
+    speech_end       VAD reported the end of speech (the last one before
+                     the turn was committed)
+    endpoint         the end-of-turn timer fired and the turn was submitted
+    received         the turn was submitted (text turns start here)
+    turn_start       its response pipeline started (after any queue wait)
+    stt_start/end    the STT request the transcript waited on last
+    llm_start, llm_first_token, llm_end
+    summarize_start/end   reply summarization (TTS_REPLY_MODE=summarize)
+    tts_start, tts_first_byte   the first TTS request of the reply
+    audio_first, audio_last     first and last audio bytes sent (fillers count)
+
+When the turn ends the trace is turned into spans: stages (the time spent
+in each step) and milestones (time from the end of speech, or from the
+text message, to the transcript, first token, first and last audio). Both
+go into histograms in metrics/prometheus.py, and the trace is logged as
+one JSON line unless TURN_TRACE_LOG=0.
+"""
+
+import json
+import logging
+import os
+import time
+
+from metrics.prometheus import metrics_registry
+
+# stage: (from, to)
+STAGES = {
+    "endpoint": ("speech_end", "endpoint"),
+    "queue": ("received", "turn_start"),
+    "stt": ("stt_start", "stt_end"),
+    "llm_first_token": ("llm_start", "llm_first_token"),
+    "llm": ("llm_start", "llm_end"),
+    "summarize": ("summarize_start", "summarize_end"),
+    "tts_first_byte": ("tts_start", "tts_first_byte"),
+    "playout": ("audio_first", "audio_last"),
+}
+# milestone: mark, measured from the turn's origin
+MILESTONES = {
+    "transcript": "stt_end",
+    "first_token": "llm_first_token",
+    "first_audio": "audio_first",
+    "last_audio": "audio_last",
+}
+
+
+class TraceMetrics:
+    """The histograms and counters finished traces are aggregated into."""
+
+    def __init__(self, registry, log: bool = True):
+        self.log = log
+        self.stages = registry.histogram("vaani_turn_stage_seconds", "Time spent in each stage of a turn.",
+                                         ("kind", "stage"))
+        self.milestones = registry.histogram(
+            "vaani_turn_latency_seconds", "Time from the end of speech (or the text message) to each milestone.",
+            ("kind", "milestone"))
+        self.requests = registry.histogram(
+            "vaani_provider_request_seconds", "STT request duration, and TTS time to first byte, per request.",
+            ("provider",))
+        self.turns = registry.counter("vaani_turns_total", "Finished turns by outcome.", ("kind", "status"))
+        self.errors = registry.counter("vaani_turn_errors_total", "Pipeline stages that failed in a turn.",
+                                       ("stage",))
+
+    @classmethod
+    def from_env(cls, registry):
+        return cls(registry, log=os.getenv("TURN_TRACE_LOG", "1") == "1")
+
+    def record(self, trace: "TurnTrace"):
+        for stage, seconds in trace.stages().items():
+            self.stages.observe(seconds, kind=trace.kind, stage=stage)
+        for milestone, seconds in trace.milestones().items():
+            self.milestones.observe(seconds, kind=trace.kind, milestone=milestone)
+        for provider, seconds in trace.requests:
+            self.requests.observe(seconds, provider=provider)
+        for stage in trace.errors:
+            self.errors.inc(stage=stage)
+        self.turns.inc(kind=trace.kind, status=trace.status)
+        if self.log:
+            logging.info(f"Turn trace: {json.dumps(trace.to_dict())}")
+
+
+trace_metrics = TraceMetrics.from_env(metrics_registry)
+
+
+class TurnTrace:
+    def __init__(self, kind: str = "voice", session: str = None, sink: TraceMetrics = None):
+        self.kind = kind
+        self.session = session
+        self.sink = sink or trace_metrics
+        self.marks = {}
+        self.requests = []
+        self.errors = []
+        self.status = None
+
+    def mark(self, name: str, at: float = None, last: bool = False):
+        """Records a point; the first one wins unless last is set."""
+        if last or name not in self.marks:
+            self.marks[name] = time.monotonic() if at is None else at
+
+    def request(self, provider: str, started: float, finished: float):
+        """One upstream request (STT segment, TTS sentence) that finished."""
+        self.requests.append((provider, finished - started))
+        if provider == "stt" and finished >= self.marks.get("stt_end", 0.0):
+            # The transcript is ready when the last segment is.
+            self.marks["stt_start"], self.marks["stt_end"] = started, finished
+        elif provider == "tts" and "tts_first_byte" not in self.marks:
+            self.marks["tts_start"], self.marks["tts_first_byte"] = started, finished
+
+    def error(self, stage: str):
+        if stage not in self.errors:
+            self.errors.append(stage)
+
+    def _origin(self):
+        return self.marks.get("speech_end", self.marks.get("received"))
+
+    def stages(self) -> dict:
+        spans = {}
+        for stage, (start, end) in STAGES.items():
+            if start in self.marks and end in self.marks:
+                spans[stage] = max(self.marks[end] - self.marks[start], 0.0)
+        return spans
+
+    def milestones(self) -> dict:
+        origin = self._origin()
+        if origin is None:
+            return {}
+        return {milestone: max(self.marks[mark] - origin, 0.0)
+                for milestone, mark in MILESTONES.items() if mark in self.marks}
+
+    def finish(self, status: str):
+        """Ends the trace (once) and hands it to the metrics."""
+        if self.status is not None:
+            return
+        self.status = status
+        self.sink.record(self)
+
+    def to_dict(self) -> dict:
+        def ms(spans: dict) -> dict:
+            return {name: round(seconds * 1000, 1) for name, seconds in spans.items()}
+        return {"session": self.session, "kind": self.kind, "status": self.status,
+                "stages_ms": ms(self.stages()), "milestones_ms": ms(self.milestones()), "errors": self.errors}
@@ -0,0 +1,225 @@
+# persona/personaRegistry.py
+
+"""
+The characters a caller can talk to, loaded once at startup.
+
+Each persona in persona/personas.json has its system prompt, ElevenLabs voice
+(the id is read from the environment variable named by voice_id_env), model,
+optional voice_settings (without them the voice's settings stored at
+ElevenLabs apply) and a few fixed lines: a greeting, "thinking" fillers and
+error lines. Those lines are rendered to audio once, stored under
+PERSONA_ASSETS_DIR and kept in memory, so they go out the moment they are
+needed instead of waiting on a TTS round trip: the greeting as soon as a
+caller connects, a filler while STT and the LLM are still working, an error
+line when the LLM can't be reached (exactly when a live TTS call is most
+likely to fail as well).
+
+Rendered files are named after a hash of the voice, model, settings and
+text, so editing a line or changing a voice renders it again. Render ahead
+of time with:
+
+    python -m persona.personaRegistry
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+
+from tts.ttsCache import cache_key
+
+PERSONA_DIR = os.path.dirname(os.path.abspath(__file__))
+PERSONA_FILE = os.path.join(PERSONA_DIR, "personas.json")
+DEFAULT_ASSETS_DIR = os.path.join(os.path.dirname(PERSONA_DIR), ".cache", "personas")
+ASSET_KINDS = ("greeting", "fillers", "error_lines")
+
+
+class Persona:
+    def __init__(self, name: str, system_prompt: str, voice_id: str = None, model_id: str = "eleven_multilingual_v2",
+                 voice_settings: dict = None, greeting: str = "", fillers: list = (), error_lines: list = ()):
+        self.name = name
+        self.system_prompt = system_prompt
+        self.voice_id = voice_id
+        self.model_id = model_id
+        self.voice_settings = voice_settings
+        self.greeting = greeting
+        self.fillers = list(fillers)
+        self.error_lines = list(error_lines)
+
+    @classmethod
+    def from_config(cls, name: str, config: dict):
+        voice_id = config.get("voice_id") or os.getenv(config.get("voice_id_env", ""))
+        if not voice_id:
+            logging.warning(f"No voice id for persona {name}; set {config.get('voice_id_env')} in .env.")
+        return cls(name, config["system_prompt"], voice_id, config.get("model_id", "eleven_multilingual_v2"),
+                   config.get("voice_settings"), config.get("greeting", ""), config.get("fillers", ()),
+                   config.get("error_lines", ()))
+
+    def system_message(self, greeted_with: str = None) -> dict:
+        """
+        The system prompt. A greeting already sent goes in here rather than into
+        the history as an assistant turn: Mistral rejects an assistant message
+        right after the system prompt, and it isn't a model reply to summarize
+        or cache.
+        """
+        content = self.system_prompt
+        if greeted_with:
+            content += f'\n\nYou have already greeted the user with: "{greeted_with}"'
+        return {"role": "system", "content": content}
+
+    def lines(self) -> list:
+        """Every fixed line that gets a pre-rendered asset."""
+        return ([self.greeting] if self.greeting else []) + self.fillers + self.error_lines
+
+    def asset_key(self, text: str) -> str:
+        return cache_key(self.voice_id, self.model_id, text, self.voice_settings)
+
+
+class PersonaRegistry:
+    def __init__(self, personas: dict, default: str, assets_dir: str = DEFAULT_ASSETS_DIR):
+        if default not in personas:
+            raise ValueError(f"Default persona {default!r} is not defined")
+        self.personas = personas
+        self.default = default
+        self.assets_dir = assets_dir
+        self._audio = {}
+        self._last_filler = {}
+        self.assets_rendered = 0
+        self.assets_loaded = 0
+        self.render_errors = 0
+        self.served = {kind: 0 for kind in ASSET_KINDS + ("lines",)}
+        self.served_without_audio = 0
+
+    @classmethod
+    def load(cls, path: str = PERSONA_FILE, assets_dir: str = None):
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        personas = {name: Persona.from_config(name, c) for name, c in config["personas"].items()}
+        registry = cls(personas, config.get("default", next(iter(personas))),
+                       assets_dir or os.getenv("PERSONA_ASSETS_DIR", DEFAULT_ASSETS_DIR))
+        registry.load_assets()
+        return registry
+
+    def get(self, name: str) -> Persona:
+        return self.personas.get(name) or self.personas[self.default]
+
+    # --- Pre-rendered audio ---
+
+    def _path(self, persona: Persona, text: str) -> str:
+        return os.path.join(self.assets_dir, persona.name, persona.asset_key(text)[:24] + ".mp3")
+
+    def load_assets(self):
+        """Loads every line already rendered on disk into memory."""
+        for persona in self.personas.values():
+            if not persona.voice_id:
+                continue
+            for text in persona.lines():
+                try:
+                    with open(self._path(persona, text), "rb") as f:
+                        self._audio[(persona.name, text)] = f.read()
+                    self.assets_loaded += 1
+                except FileNotFoundError:
+                    pass
+
+    def missing_assets(self) -> list:
+        return [(persona, text) for persona in self.personas.values() if persona.voice_id
+                for text in persona.lines() if (persona.name, text) not in self._audio]
+
+    async def render_assets(self, render):
+        """
+        Renders the lines that aren't on disk yet with render(text, persona),
+        a coroutine returning the audio (and raising if synthesis fails).
+        """
+        for persona, text in self.missing_assets():
+            try:
+                audio = await render(text, persona)
+            except Exception as e:
+                self.render_errors += 1
+                logging.warning(f"Could not render {persona.name} line {text!r}: {e}")
+                continue
+            if audio:
+                await self._store(persona, text, audio)
+        if self.assets_rendered:
+            logging.info(f"Rendered {self.assets_rendered} persona audio assets into {self.assets_dir}.")
+
+    async def _store(self, persona: Persona, text: str, audio: bytes):
+        await asyncio.to_thread(_write_file, self._path(persona, text), audio)
+        self._audio[(persona.name, text)] = audio
+        self.assets_rendered += 1
+
+    async def render_line(self, persona: Persona, text: str, render) -> bytes:
+        """Renders and stores a line that isn't part of the persona (see line()); raises if synthesis fails."""
+        audio = await render(text, persona)
+        if audio:
+            await self._store(persona, text, audio)
+        return audio
+
+    def _serve(self, kind: str, persona: Persona, text: str):
+        self.served[kind] += 1
+        audio = self._audio.get((persona.name, text))
+        if audio is None:
+            self.served_without_audio += 1
+        return text, audio
+
+    def greeting(self, persona: Persona):
+        """(text, audio) of the greeting; audio is None until it has been rendered."""
+        return self._serve("greeting", persona, persona.greeting)
+
+    def filler(self, persona: Persona):
+        """(text, audio) of a filler line, not the same one twice in a row."""
+        if not persona.fillers:
+            return None, None
+        choices = [f for f in persona.fillers if f != self._last_filler.get(persona.name)] or persona.fillers
+        text = random.choice(choices)
+        self._last_filler[persona.name] = text
+        return self._serve("fillers", persona, text)
+
+    def error_line(self, persona: Persona):
+        if not persona.error_lines:
+            return None, None
+        return self._serve("error_lines", persona, random.choice(persona.error_lines))
+
+    def line(self, persona: Persona, text: str):
+        """
+        (text, audio) of a fixed line a caller keeps outside personas.json, such
+        as the CLI's greeting; audio is None until render_line has stored it.
+        """
+        key = (persona.name, text)
+        if key not in self._audio and persona.voice_id:
+            try:
+                with open(self._path(persona, text), "rb") as f:
+                    self._audio[key] = f.read()
+                self.assets_loaded += 1
+            except FileNotFoundError:
+                pass
+        return self._serve("lines", persona, text)
+
+    def stats(self) -> dict:
+        return {
+            "personas": list(self.personas),
+            "assets": len(self._audio),
+            "assets_missing": len(self.missing_assets()),
+            "assets_loaded": self.assets_loaded,
+            "assets_rendered": self.assets_rendered,
+            "render_errors": self.render_errors,
+            "served": dict(self.served),
+            "served_without_audio": self.served_without_audio,
+        }
+
+
+def _write_file(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    from tts.elevenLabs.xiTTS import render_tts_audio
+
+    logging.basicConfig(level=logging.INFO)
+    registry = PersonaRegistry.load()
+    asyncio.run(registry.render_assets(render_tts_audio))
+    print(json.dumps(registry.stats(), indent=2))
@@ -0,0 +1,253 @@
+# providers/clientRegistry.py
+
+"""
+Long-lived, pooled HTTP clients for the upstream providers.
+
+Mistral, ElevenLabs and Sarvam used to get a brand-new SDK client on every
+call, and so a new TCP + TLS handshake on every turn (every sentence, for
+TTS). The registry keeps one httpx client per provider for the lifetime of
+the app, with keep-alive, tunable pool limits and optional HTTP/2, and hands
+the SDK clients built on top of them to the provider modules (for Mistral,
+whose SDK can't use them, the chat client in providers/mistralChat.py).
+
+Pool metrics come from httpx event hooks and httpcore trace events: requests
+made, connections opened (every one of those paid a handshake) and the time
+spent in those handshakes. Connection pre-warming requests (see
+providers/prewarm.py) are counted separately, so "cold_requests" is the
+number of real requests that still had to open a connection.
+
+Settings (environment):
+    PROVIDER_MAX_CONNECTIONS      per-provider connection limit (default 20)
+    PROVIDER_MAX_KEEPALIVE        idle connections kept open (default 10)
+    PROVIDER_KEEPALIVE_EXPIRY_S   how long an idle connection is kept (default 60)
+    PROVIDER_HTTP2                1 to negotiate HTTP/2 (needs the h2 package)
+    PROVIDER_TIMEOUT_S            read timeout for provider calls (default 60)
+"""
+
+import importlib.util
+import logging
+import os
+import time
+import httpx
+from dotenv import load_dotenv
+
+PROVIDERS = ("mistral", "elevenlabs", "sarvam", "stt_http")
+
+
+class PoolMetrics:
+    """Request and connection counters for one provider's pool."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.connections_opened = 0
+        self.cold_requests = 0
+        self.prewarm_requests = 0
+        self.handshake_seconds = 0.0
+        self.last_used = 0.0
+
+    def on_request(self, request: httpx.Request):
+        self.last_used = time.monotonic()
+        if request.extensions.get("prewarm"):
+            self.prewarm_requests += 1
+        else:
+            self.requests += 1
+
+    def trace(self, request: httpx.Request, is_async: bool):
+        """An httpcore trace callback that times the handshake of any new connection."""
+        started = {}
+
+        def on_event(name: str, info: dict):
+            if name == "connection.connect_tcp.started":
+                started["at"] = time.perf_counter()
+            elif name == "connection.connect_tcp.complete":
+                self.connections_opened += 1
+                if not request.extensions.get("prewarm"):
+                    self.cold_requests += 1
+                if request.url.scheme == "http":
+                    self.handshake_seconds += time.perf_counter() - started.get("at", time.perf_counter())
+            elif name == "connection.start_tls.complete":
+                self.handshake_seconds += time.perf_counter() - started.get("at", time.perf_counter())
+
+        if not is_async:
+            return on_event
+
+        async def on_event_async(name: str, info: dict):
+            on_event(name, info)
+        return on_event_async
+
+    def stats(self, client=None) -> dict:
+        stats = {
+            "requests": self.requests,
+            "errors": self.errors,
+            "connections_opened": self.connections_opened,
+            "cold_requests": self.cold_requests,
+            "prewarm_requests": self.prewarm_requests,
+            "mean_handshake_ms": round(self.handshake_seconds / self.connections_opened * 1000, 1) if self.connections_opened else None,
+        }
+        # httpcore keeps the pool on the transport; not public API, so best effort.
+        pool = getattr(getattr(client, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is not None:
+            stats["pool_connections"] = len(connections)
+            stats["pool_idle"] = sum(1 for c in connections if c.is_idle())
+        return stats
+
+
+class ProviderClients:
+    """
+    Registry of pooled provider clients. Clients are created on first use
+    (or by open() at startup) and closed by aclose(); after aclose() the
+    next use creates fresh ones.
+    """
+
+    def __init__(self, max_connections: int = 20, max_keepalive: int = 10, keepalive_expiry: float = 60.0,
+                 http2: bool = False, timeout: float = 60.0):
+        if http2 and importlib.util.find_spec("h2") is None:
+            logging.warning("PROVIDER_HTTP2 is set but the h2 package is not installed; using HTTP/1.1.")
+            http2 = False
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive,
+                                   keepalive_expiry=keepalive_expiry)
+        self.http2 = http2
+        self.timeout = httpx.Timeout(timeout, connect=10.0)
+        self.metrics = {name: PoolMetrics() for name in PROVIDERS}
+        self._http = {}
+        self._http_sync = {}
+        self._sdk = {}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_connections=int(os.getenv("PROVIDER_MAX_CONNECTIONS", "20")),
+            max_keepalive=int(os.getenv("PROVIDER_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=float(os.getenv("PROVIDER_KEEPALIVE_EXPIRY_S", "60")),
+            http2=os.getenv("PROVIDER_HTTP2", "0") == "1",
+            timeout=float(os.getenv("PROVIDER_TIMEOUT_S", "60")),
+        )
+
+    def idle_connections(self, provider: str):
+        """Idle pooled connections for a provider (None if the pool can't be inspected)."""
+        client = self._http.get(provider)
+        connections = getattr(getattr(getattr(client, "_transport", None), "_pool", None), "connections", None)
+        if connections is None:
+            return None if client is not None else 0
+        return sum(1 for c in connections if c.is_idle())
+
+    def open(self):
+        """Creates the async provider clients up front (called at app startup)."""
+        for name in PROVIDERS:
+            self.http(name)
+
+    # --- Raw pooled httpx clients ---
+
+    def http(self, provider: str) -> httpx.AsyncClient:
+        client = self._http.get(provider)
+        if client is None:
+            metrics = self.metrics[provider]
+
+            async def on_request(request: httpx.Request):
+                metrics.on_request(request)
+                request.extensions["trace"] = metrics.trace(request, is_async=True)
+
+            async def on_response(response: httpx.Response):
+                if response.status_code >= 400 and not response.request.extensions.get("prewarm"):
+                    metrics.errors += 1
+
+            client = httpx.AsyncClient(
+                timeout=self.timeout, follow_redirects=True, http2=self.http2,
+                transport=httpx.AsyncHTTPTransport(limits=self.limits, http2=self.http2, retries=1),
+                event_hooks={"request": [on_request], "response": [on_response]},
+            )
+            self._http[provider] = client
+        return client
+
+    def http_sync(self, provider: str) -> httpx.Client:
+        client = self._http_sync.get(provider)
+        if client is None:
+            metrics = self.metrics[provider]
+
+            def on_request(request: httpx.Request):
+                metrics.on_request(request)
+                request.extensions["trace"] = metrics.trace(request, is_async=False)
+
+            def on_response(response: httpx.Response):
+                if response.status_code >= 400 and not response.request.extensions.get("prewarm"):
+                    metrics.errors += 1
+
+            client = httpx.Client(
+                timeout=self.timeout, follow_redirects=True, http2=self.http2,
+                transport=httpx.HTTPTransport(limits=self.limits, http2=self.http2, retries=1),
+                event_hooks={"request": [on_request], "response": [on_response]},
+            )
+            self._http_sync[provider] = client
+        return client
+
+    # --- SDK clients on top of the pools ---
+
+    def mistral(self, api_key: str):
+        key = ("mistral", api_key)
+        if key not in self._sdk:
+            # The 0.4 SDK can't take an httpx client, so chat goes straight to the pool.
+            from providers.mistralChat import PooledMistralClient
+            self._sdk[key] = PooledMistralClient(self.http("mistral"), api_key, self.base_url("mistral"))
+        return self._sdk[key]
+
+    def elevenlabs(self, api_key: str):
+        key = ("elevenlabs", api_key)
+        if key not in self._sdk:
+            from elevenlabs.client import AsyncElevenLabs
+            self._sdk[key] = AsyncElevenLabs(api_key=api_key, base_url=os.getenv("ELEVENLABS_BASE_URL"),
+                                             httpx_client=self.http("elevenlabs"))
+        return self._sdk[key]
+
+    def sarvam(self, api_key: str):
+        key = ("sarvam", api_key)
+        if key not in self._sdk:
+            from sarvamai import AsyncSarvamAI
+            self._sdk[key] = AsyncSarvamAI(api_subscription_key=api_key, httpx_client=self.http("sarvam"),
+                                           **_sarvam_environment())
+        return self._sdk[key]
+
+    def sarvam_sync(self, api_key: str):
+        key = ("sarvam_sync", api_key)
+        if key not in self._sdk:
+            from sarvamai import SarvamAI
+            self._sdk[key] = SarvamAI(api_subscription_key=api_key, httpx_client=self.http_sync("sarvam"),
+                                      **_sarvam_environment())
+        return self._sdk[key]
+
+    @staticmethod
+    def base_url(provider: str) -> str:
+        return {
+            "mistral": os.getenv("MISTRAL_ENDPOINT", "https://api.mistral.ai"),
+            "elevenlabs": os.getenv("ELEVENLABS_BASE_URL") or "https://api.elevenlabs.io",
+            "sarvam": os.getenv("SARVAM_BASE_URL") or "https://api.sarvam.ai",
+            "stt_http": os.getenv("STT_HTTP_URL", "http://127.0.0.1:9001/speech-to-text"),
+        }[provider]
+
+    def stats(self) -> dict:
+        return {name: self.metrics[name].stats(self._http.get(name) or self._http_sync.get(name))
+                for name in PROVIDERS}
+
+    async def aclose(self):
+        for client in self._http.values():
+            await client.aclose()
+        for client in self._http_sync.values():
+            client.close()
+        self._http.clear()
+        self._http_sync.clear()
+        self._sdk.clear()
+
+
+def _sarvam_environment() -> dict:
+    base_url = os.getenv("SARVAM_BASE_URL")
+    if not base_url:
+        return {}
+    from sarvamai.environment import SarvamAIEnvironment
+    return {"environment": SarvamAIEnvironment(base=base_url, creative=base_url, production=base_url)}
+
+
+load_dotenv()
+
+# Shared by every provider module; the server closes it on shutdown.
+provider_clients = ProviderClients.from_env()
@@ -0,0 +1,65 @@
+# providers/mistralChat.py
+
+"""
+Mistral chat completions over the pooled httpx client.
+
+The 0.4 SDK (mistralai==0.4.2) builds its own httpx client in its
+constructor and takes no client from outside, so its calls can't share the
+registry's pool. This sends the two calls the brain makes, chat and
+chat_stream, through providers/clientRegistry.py's "mistral" client
+instead, and parses the answers into the SDK's own response models, so
+callers see exactly what MistralAsyncClient would have returned.
+"""
+
+import json
+import httpx
+
+from mistralai.exceptions import MistralAPIException
+from mistralai.models.chat_completion import ChatCompletionResponse, ChatCompletionStreamResponse
+
+
+class PooledMistralClient:
+    def __init__(self, http: httpx.AsyncClient, api_key: str, endpoint: str):
+        self.http = http
+        self.url = endpoint.rstrip("/") + "/v1/chat/completions"
+        self._api_key = api_key
+
+    def _headers(self, stream: bool) -> dict:
+        return {
+            "Accept": "text/event-stream" if stream else "application/json",
+            "Authorization": f"Bearer {self._api_key}",
+        }
+
+    @staticmethod
+    def _payload(model: str, messages: list, stream: bool, options: dict) -> dict:
+        payload = {"model": model, "messages": [_message(m) for m in messages], "stream": stream}
+        payload.update({name: value for name, value in options.items() if value is not None})
+        return payload
+
+    async def chat(self, model: str, messages: list, **options) -> ChatCompletionResponse:
+        response = await self.http.post(self.url, headers=self._headers(False),
+                                         json=self._payload(model, messages, False, options))
+        if response.status_code >= 400:
+            raise MistralAPIException.from_response(response, message=f"Status {response.status_code}: {response.text}")
+        return ChatCompletionResponse(**response.json())
+
+    async def chat_stream(self, model: str, messages: list, **options):
+        """Yields ChatCompletionStreamResponse chunks as the server-sent events arrive."""
+        async with self.http.stream("POST", self.url, headers=self._headers(True),
+                                    json=self._payload(model, messages, True, options)) as response:
+            if response.status_code >= 400:
+                body = (await response.aread()).decode("utf-8", "replace")
+                raise MistralAPIException.from_response(response, message=f"Status {response.status_code}: {body}")
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                if data:
+                    yield ChatCompletionStreamResponse(**json.loads(data))
+
+
+def _message(message) -> dict:
+    # The brain passes dicts; SDK ChatMessage objects work too.
+    return message if isinstance(message, dict) else message.model_dump(exclude_none=True)
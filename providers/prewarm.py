@@ -0,0 +1,91 @@
+# providers/prewarm.py
+
+"""
+Warms upstream connections when a turn is about to start.
+
+VAD reporting speech means an STT -> LLM -> TTS turn will follow within a
+second or two. At that point the Prewarmer makes sure each provider pool has
+a live, recently used connection: if it doesn't, a cheap HEAD request to the
+provider's base URL opens one (the status doesn't matter, only that the
+connection is left in the keep-alive pool). The real requests of the turn
+then skip the TCP + TLS handshake.
+
+A connection that has sat idle longer than refresh_after is refreshed too,
+as providers and load balancers drop idle connections well before our own
+keep-alive expiry. Pre-warming is bounded by a global budget of requests in
+flight, so a burst of sessions starting to speak can't turn into a burst of
+handshakes.
+
+Whether it worked shows up in the pool metrics: "cold_requests" counts real
+requests that still had to open a connection (misses).
+"""
+
+import asyncio
+import logging
+import time
+
+
+class Prewarmer:
+    """
+    clients:       the ProviderClients registry
+    budget:        pre-warm requests allowed in flight across all sessions
+    refresh_after: seconds after which an idle connection is refreshed anyway
+    """
+
+    def __init__(self, clients, budget: int = 4, refresh_after: float = 15.0):
+        self.clients = clients
+        self.budget = budget
+        self.refresh_after = refresh_after
+        self.in_flight = 0
+        self._warming = set()
+        self.requested = 0
+        self.started = 0
+        self.already_warm = 0
+        self.skipped_budget = 0
+        self.errors = 0
+
+    def prewarm(self, *providers: str):
+        """Schedules pre-warming for the given provider pools; returns immediately."""
+        for provider in providers:
+            self.requested += 1
+            if provider in self._warming:
+                continue
+            idle = self.clients.idle_connections(provider)
+            recently_used = time.monotonic() - self.clients.metrics[provider].last_used < self.refresh_after
+            if idle and recently_used:
+                self.already_warm += 1
+                continue
+            if self.in_flight >= self.budget:
+                self.skipped_budget += 1
+                continue
+            self.in_flight += 1
+            self._warming.add(provider)
+            self.started += 1
+            asyncio.create_task(self._warm(provider))
+
+    async def _warm(self, provider: str):
+        try:
+            await self.clients.http(provider).head(
+                self.clients.base_url(provider), extensions={"prewarm": True}, timeout=5.0
+            )
+        except Exception as e:
+            self.errors += 1
+            logging.warning(f"Pre-warming {provider} connection failed: {e}")
+        finally:
+            self.in_flight -= 1
+            self._warming.discard(provider)
+
+    def stats(self) -> dict:
+        metrics = self.clients.metrics
+        requests = sum(m.requests for m in metrics.values())
+        cold = sum(m.cold_requests for m in metrics.values())
+        return {
+            "requested": self.requested,
+            "started": self.started,
+            "already_warm": self.already_warm,
+            "skipped_budget": self.skipped_budget,
+            "errors": self.errors,
+            "warm_requests": requests - cold,
+            "cold_requests": cold,
+            "hit_rate": round((requests - cold) / requests, 3) if requests else None,
+        }
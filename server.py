@@ -1,27 +1,41 @@
 # server.py
 
 import asyncio
-import base64
 import json
 import logging
-import numpy as np
-import torch
-import tempfile
-import wave
 import os
 import re
-from typing import List
+import time
+import uuid
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from dotenv import load_dotenv
 
-from brain.mistralAPI_brain import stream_mistral_chat_async, summarize_text_async
-from stt.sarvamSTT import transcribe_audio
+from brain.mistralAPI_brain import reply_cache, stream_mistral_chat_async, summarize_history_async, summarize_text_async
+from brain.historyManager import ConversationHistory, HistoryStats
+from stt.streamingSTT import StreamingTranscriber, stt_provider_from_env
 from logs.logger import log_conversation
-from tts.elevenLabs.xiTTS import stream_tts_audio
+from logs.logWriter import log_writer
+from tts.elevenLabs.xiTTS import render_tts_audio, stream_tts_audio, tts_cache
+from tts.sentenceSegmenter import SentenceSegmenter, SpokenBudget
+from tts.textCondenser import condense
+from audio.framing import FrameError, decode_audio_frame
+from audio.ringBuffer import AudioRingBuffer, UtteranceBuffer
+from audio.vadEngine import BatchedVADEngine
+from audio.vadBackends import OnnxVADBackend, TorchVADBackend
+from audio.inferenceExecutor import InferenceExecutor
+from audio.vadBenchmark import DEFAULT_SELECTION_FILE, select_variant
+from audio.endpointing import EndpointStats, Endpointer
+from session.turnController import Turn, TurnController, TurnStats
+from providers.clientRegistry import provider_clients
+from providers.prewarm import Prewarmer
+from persona.personaRegistry import PersonaRegistry
+from metrics.prometheus import metrics_registry
+from metrics.turnTrace import TurnTrace
 
 # ==============================================================================
 # 1. CONFIGURATION & SETUP
@@ -29,25 +43,133 @@ from tts.elevenLabs.xiTTS import stream_tts_audio
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Provider connections are pooled for the life of the app (providers/clientRegistry.py).
+    provider_clients.open()
+    # Persona greetings, fillers and error lines not yet on disk are rendered in the background.
+    render_task = asyncio.create_task(persona_registry.render_assets(render_tts_audio))
+    yield
+    render_task.cancel()
+    await provider_clients.aclose()
+    inference_executor.shutdown()
+    # Conversation logs are written by a background thread; flush what is queued.
+    await asyncio.to_thread(log_writer.close)
+
+# Characters (system prompt, voice, pre-rendered lines) from persona/personas.json.
+persona_registry = PersonaRegistry.load()
+
+app = FastAPI(lifespan=lifespan)
 app.mount("/static", StaticFiles(directory="web/static"), name="static")
 templates = Jinja2Templates(directory="web/templates")
 SAMPLE_RATE = 16000
+VAD_WINDOW_SIZE = 512
+
+# Streaming STT: utterance audio is uploaded in segments while the user speaks.
+# A segment is cut at a VAD pause once it holds STT_SEGMENT_MIN_S of audio, or at
+# the next dip in speech probability once it exceeds STT_SEGMENT_MAX_S.
+stt_provider = stt_provider_from_env()
+STT_SEGMENT_MIN_SAMPLES = int(float(os.getenv("STT_SEGMENT_MIN_S", "1.0")) * SAMPLE_RATE)
+STT_SEGMENT_MAX_SAMPLES = int(float(os.getenv("STT_SEGMENT_MAX_S", "6.0")) * SAMPLE_RATE)
+
+# Upstream connections are warmed as soon as VAD hears speech (providers/prewarm.py).
+prewarmer = Prewarmer(provider_clients, budget=int(os.getenv("PREWARM_BUDGET", "4")),
+                      refresh_after=float(os.getenv("PREWARM_REFRESH_S", "15")))
+PREWARM_POOLS = (stt_provider.pool, "mistral", "elevenlabs") if os.getenv("PREWARM", "1") == "1" else ()
 
 # ==============================================================================
 # 2. VAD MODULE
 # ==============================================================================
+# VAD_BACKEND=jit runs the TorchScript model; VAD_BACKEND=onnx runs ONNX Runtime
+# directly and never imports torch. VAD_BACKEND=auto uses the variant benchmarked
+# as fastest on this host (benchmarking once on first boot, see audio/vadBenchmark.py).
+VAD_BACKEND = os.getenv("VAD_BACKEND", "jit")
+VAD_ONNX_MODEL = os.getenv("VAD_ONNX_MODEL", "silero_vad.onnx")
+VAD_MAX_BATCH_SIZE = int(os.getenv("VAD_MAX_BATCH_SIZE", "64"))
+
+if VAD_BACKEND == "auto":
+    selected_variant = select_variant(os.getenv("VAD_SELECTION_FILE", DEFAULT_SELECTION_FILE))
+    VAD_BACKEND, _, selected_model = selected_variant.partition(":")
+    VAD_ONNX_MODEL = selected_model or VAD_ONNX_MODEL
+
+# Inference runs on a dedicated pool, off the event loop.
+inference_executor = InferenceExecutor.from_env()
 try:
-    model, utils = torch.hub.load(
-        repo_or_dir='vad_model/silero-vad-master', model='silero_vad',
-        source='local', trust_repo=True
-    )
-    (get_speech_timestamps, _, _, VADIterator, _) = utils
-    logging.info("Local PyTorch VAD model loaded successfully.")
+    if VAD_BACKEND == "onnx":
+        vad_backend = OnnxVADBackend.load(
+            VAD_ONNX_MODEL,
+            session_options=inference_executor.ort_session_options(),
+            sampling_rate=SAMPLE_RATE, max_batch_size=VAD_MAX_BATCH_SIZE,
+            pool_size=int(os.getenv("VAD_ONNX_POOL_SIZE", str(inference_executor.workers))),
+        )
+        logging.info(f"Local ONNX Runtime VAD model loaded successfully ({os.path.basename(vad_backend.model_path)}).")
+    else:
+        vad_backend = TorchVADBackend.load(SAMPLE_RATE)
+        # After loading: importing the Silero package resets torch to one thread.
+        inference_executor.configure_torch()
+        logging.info("Local PyTorch VAD model loaded successfully.")
 except Exception as e:
     logging.error(f"FATAL: Could not load local VAD model. Error: {e}")
     exit()
 
+# One shared model serves every session; windows from all callers are batched.
+vad_engine = BatchedVADEngine(
+    vad_backend, inference_executor, sampling_rate=SAMPLE_RATE,
+    max_batch_size=VAD_MAX_BATCH_SIZE,
+    batch_interval_ms=float(os.getenv("VAD_BATCH_INTERVAL_MS", "4")),
+)
+
+# End-of-turn hangover is chosen per pause by each session's Endpointer
+# (see audio/endpointing.py); turn-taking latency is aggregated here.
+VAD_MIN_SILENCE_MS = 100
+endpoint_stats = EndpointStats()
+
+# Barge-in: speech during a response cancels it. With BARGE_IN=0 that speech is
+# ignored instead, as the client used to do by not sending it.
+BARGE_IN = os.getenv("BARGE_IN", "1") == "1"
+# Each session runs one response at a time; later turns wait in a queue of
+# TURN_QUEUE_DEPTH handled per TURN_POLICY (queue, merge or supersede).
+TURN_POLICY = os.getenv("TURN_POLICY", "merge")
+TURN_QUEUE_DEPTH = int(os.getenv("TURN_QUEUE_DEPTH", "2"))
+# The client reports playback_ended once it has played a reply; until then the
+# AI counts as speaking. If that never arrives, playback is assumed to last as
+# long as the audio sent at this bitrate (ElevenLabs' default mp3_44100_128).
+PLAYBACK_BYTES_PER_S = int(os.getenv("PLAYBACK_KBPS", "128")) * 1000 // 8
+turn_stats = TurnStats()
+
+# Conversation history per session is kept within HISTORY_TOKEN_BUDGET tokens
+# (brain/historyManager.py); compaction counters are aggregated here.
+history_stats = HistoryStats()
+
+# Prometheus-style metrics, served at /metrics (metrics/prometheus.py). Turn
+# stage latencies come from each turn's trace (metrics/turnTrace.py); the rest
+# is read from the counters above at scrape time.
+active_sessions = {}  # session id -> TurnController
+metrics_registry.gauge("vaani_active_sessions", "Open /ws sessions.", collect=lambda: len(active_sessions))
+metrics_registry.gauge("vaani_responding_sessions", "Sessions with a response in progress.",
+                       collect=lambda: sum(c.responding for c in active_sessions.values()))
+metrics_registry.gauge("vaani_turn_queue_depth", "Turns waiting behind a running one, over all sessions.",
+                       collect=lambda: sum(c.queued for c in active_sessions.values()))
+metrics_registry.counter("vaani_barge_ins_total", "Responses cancelled by the user talking.",
+                         collect=lambda: turn_stats.barge_ins)
+metrics_registry.counter("vaani_vad_windows_total", "VAD windows processed.", collect=lambda: vad_engine.windows_processed)
+metrics_registry.counter("vaani_vad_batches_total", "VAD inference batches run.", collect=lambda: vad_engine.batches_run)
+metrics_registry.gauge("vaani_vad_queue_depth", "VAD windows waiting for a batch.",
+                       collect=lambda: vad_engine.stats()["queued_windows"])
+metrics_registry.gauge("vaani_vad_batches_in_flight", "VAD batches running on the inference executor.",
+                       collect=lambda: vad_engine.stats()["batches_in_flight"])
+metrics_registry.counter("vaani_provider_requests_total", "Upstream requests.", ("provider",),
+                         collect=lambda: {name: m.requests for name, m in provider_clients.metrics.items()})
+metrics_registry.counter("vaani_provider_errors_total", "Upstream responses with an HTTP error status.", ("provider",),
+                         collect=lambda: {name: m.errors for name, m in provider_clients.metrics.items()})
+metrics_registry.counter("vaani_provider_connections_opened_total", "Upstream connections opened.", ("provider",),
+                         collect=lambda: {name: m.connections_opened for name, m in provider_clients.metrics.items()})
+metrics_registry.gauge("vaani_log_queue_depth", "Conversation log records waiting to be written.",
+                       collect=lambda: log_writer.stats()["pending"])
+metrics_registry.counter("vaani_log_records_dropped_total", "Conversation log records dropped on a full queue.",
+                         collect=lambda: log_writer.dropped)
+
 # ==============================================================================
 # 3. FASTAPI SERVER LOGIC
 # ==============================================================================
@@ -56,39 +178,118 @@ except Exception as e:
 async def get_index(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
+@app.get("/stats")
+async def get_stats():
+    return {"vad": vad_engine.stats(), "endpointing": endpoint_stats.stats(), "turns": turn_stats.stats(),
+            "providers": provider_clients.stats(), "prewarm": prewarmer.stats(),
+            "tts_cache": tts_cache.stats() if tts_cache else None, "personas": persona_registry.stats(),
+            "llm_cache": reply_cache.stats() if reply_cache else None, "history": history_stats.stats(),
+            "logging": log_writer.stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 async def safe_send(websocket: WebSocket, message: dict):
     try: await websocket.send_text(json.dumps(message))
     except RuntimeError: logging.warning("WebSocket is closed.")
 
+async def send_audio(websocket: WebSocket, turn: Turn, audio: bytes):
+    await websocket.send_bytes(audio)
+    turn.audio_bytes_sent += len(audio)
+    turn.trace.mark("audio_first")
+    turn.trace.mark("audio_last", last=True)
+
 # --- Processing Pipelines ---
-async def tts_consumer(websocket: WebSocket, text_queue: asyncio.Queue, character_name: str):
+# TTS_REPLY_MODE=stream speaks each sentence as soon as the LLM has finished it,
+# up to TTS_WORD_BUDGET words per reply. The other modes wait for the whole reply
+# and shorten it if it is long: TTS_REPLY_MODE=condense extracts its key sentences
+# locally (tts/textCondenser.py), TTS_REPLY_MODE=summarize asks the LLM.
+TTS_REPLY_MODE = os.getenv("TTS_REPLY_MODE", "stream")
+TTS_WORD_BUDGET = int(os.getenv("TTS_WORD_BUDGET", "40"))
+CONDENSED_WORDS = int(os.getenv("TTS_CONDENSED_WORDS", "30"))
+# A pre-rendered filler ("Hmm, ek second...") is played if the reply has no audio
+# ready FILLER_AFTER_S after the user stopped talking (0 disables fillers).
+FILLER_AFTER_S = float(os.getenv("FILLER_AFTER_S", "1.0"))
+
+async def next_for_speech(websocket: WebSocket, text_queue: asyncio.Queue, persona, turn: Turn):
+    """The first queued item of a reply, with a filler sent if the user would otherwise wait too long."""
+    wait = FILLER_AFTER_S - (time.monotonic() - turn.started_at)
+    if FILLER_AFTER_S <= 0 or not text_queue.empty():
+        return await text_queue.get()
+    try:
+        return await asyncio.wait_for(text_queue.get(), timeout=max(wait, 0))
+    except asyncio.TimeoutError:
+        _, audio = persona_registry.filler(persona)
+        if audio:
+            await send_audio(websocket, turn, audio)
+        return await text_queue.get()
+
+async def tts_consumer(websocket: WebSocket, text_queue: asyncio.Queue, persona, turn: Turn):
     await safe_send(websocket, {"type": "tts_start"})
+    first = True
     while True:
         try:
-            sentence = await text_queue.get()
+            # Items are sentences to synthesize, or pre-rendered audio (bytes) to send as is.
+            sentence = await (next_for_speech(websocket, text_queue, persona, turn) if first else text_queue.get())
+            first = False
             if sentence is None: break
+            if isinstance(sentence, bytes):
+                await send_audio(websocket, turn, sentence)
+                continue
             if not sentence.strip(): continue
-            async for audio_chunk in stream_tts_audio(sentence, character_name):
-                await websocket.send_bytes(audio_chunk)
+            turn.chars_synthesized += len(sentence)
+            requested, chunks = time.monotonic(), 0
+            async for audio_chunk in stream_tts_audio(sentence, persona):
+                if not chunks: turn.trace.request("tts", requested, time.monotonic())
+                chunks += 1
+                await send_audio(websocket, turn, audio_chunk)
+            # stream_tts_audio reports its own failures and just yields nothing.
+            if not chunks: turn.trace.error("tts")
             text_queue.task_done()
         except RuntimeError: break
         except Exception as e: logging.error(f"Error in TTS consumer: {e}"); break
     await safe_send(websocket, {"type": "tts_end"})
 
-async def llm_producer(websocket: WebSocket, transcript: str, conversation_history: list, text_queue: asyncio.Queue):
+async def llm_producer(websocket: WebSocket, transcript: str, conversation_history: list, text_queue: asyncio.Queue, persona, session_id: str, turn: Turn):
     full_reply = ""
+    segmenter = SentenceSegmenter()
+    budget = SpokenBudget(TTS_WORD_BUDGET)
+
+    async def speak(segments: list):
+        for segment in segments:
+            if budget.admit(segment): await text_queue.put(segment)
+
+    turn.trace.mark("llm_start")
     try:
-        # Stream text to UI immediately, but buffer for Audio logic
-        async for text_chunk in stream_mistral_chat_async(transcript, conversation_history):
+        # Stream text to UI immediately; complete sentences go straight to TTS.
+        async for text_chunk in stream_mistral_chat_async(transcript, conversation_history, persona.name):
+            turn.trace.mark("llm_first_token")
             full_reply += text_chunk
+            turn.chars_generated += len(text_chunk)
             await safe_send(websocket, {"type": "ai_text_chunk", "data": text_chunk})
+            if TTS_REPLY_MODE == "stream":
+                await speak(segmenter.feed(text_chunk))
+        turn.llm_finished = True
+        turn.trace.mark("llm_end")
+        # The brain reports its own failures and just yields nothing.
+        if not full_reply: turn.trace.error("llm")
 
-        log_conversation("AI", full_reply)
+        log_conversation("AI", full_reply, session=session_id, persona=persona.name)
 
+        if TTS_REPLY_MODE == "stream":
+            await speak(segmenter.flush())
+            if budget.exhausted:
+                logging.info(f"Spoke {budget.words} words of a {len(full_reply.split())}-word reply.")
         # --- Audio Logic with Summarization ---
-        # 40 words is roughly 2-3 sentences. If longer, summarize.
-        if len(full_reply.split()) > 40:
-            summary = await summarize_text_async(full_reply)
+        # 40 words is roughly 2-3 sentences. If longer, condense it locally, or
+        # summarize with the LLM (also the fallback when there is no prose to keep).
+        elif len(full_reply.split()) > 40:
+            summary = condense(full_reply, CONDENSED_WORDS) if TTS_REPLY_MODE == "condense" else ""
+            if not summary:
+                turn.trace.mark("summarize_start")
+                summary = await summarize_text_async(full_reply)
+                turn.trace.mark("summarize_end")
             logging.info(f"Summarizing long response. Original: {len(full_reply)} chars. Summary: {summary}")
             await text_queue.put(summary)
         else:
@@ -96,42 +297,39 @@ async def llm_producer(websocket: WebSocket, transcript: str, conversation_histo
 
     except Exception as e:
         logging.error(f"Error in LLM producer: {e}")
-        await text_queue.put("I'm sorry, I'm having a little trouble connecting right now.")
+        turn.trace.error("llm")
+        # Pre-rendered, so the apology doesn't depend on reaching ElevenLabs either.
+        line, audio = persona_registry.error_line(persona)
+        if audio or line: await text_queue.put(audio or line)
     finally:
         await text_queue.put(None)
 
-async def _process_voice_message(websocket: WebSocket, audio_bytes: bytes, conversation_history: list, character_name: str):
-    tmp_wav_path = ""
-    try:
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_wav:
-            tmp_wav_path = tmp_wav.name
-            with wave.open(tmp_wav, 'wb') as wf:
-                wf.setnchannels(1); wf.setsampwidth(2); wf.setframerate(SAMPLE_RATE)
-                wf.writeframes(audio_bytes)
-        
-        transcript = await asyncio.to_thread(transcribe_audio, tmp_wav_path)
-        if not transcript or not transcript.strip(): return
-
-        await safe_send(websocket, {"type": "user_transcript", "data": transcript})
-        log_conversation("User (voice)", transcript)
-        
-        text_queue = asyncio.Queue()
-        tts_task = asyncio.create_task(tts_consumer(websocket, text_queue, character_name))
-        llm_task = asyncio.create_task(llm_producer(websocket, transcript, conversation_history, text_queue))
-        await asyncio.gather(llm_task, tts_task)
-    finally:
-        if tmp_wav_path and os.path.exists(tmp_wav_path): os.remove(tmp_wav_path)
+async def _process_voice_message(websocket: WebSocket, transcript: str, conversation_history: list, persona, session_id: str, turn: Turn):
+    await safe_send(websocket, {"type": "user_transcript", "data": transcript})
+    log_conversation("User (voice)", transcript, session=session_id, persona=persona.name)
+    
+    text_queue = asyncio.Queue()
+    tts_task = asyncio.create_task(tts_consumer(websocket, text_queue, persona, turn))
+    llm_task = asyncio.create_task(llm_producer(websocket, transcript, conversation_history, text_queue, persona, session_id, turn))
+    await asyncio.gather(llm_task, tts_task)
 
-async def _process_text_message(websocket: WebSocket, transcript: str, conversation_history: list):
-    log_conversation("User (text)", transcript)
+async def _process_text_message(websocket: WebSocket, transcript: str, conversation_history: list, persona, session_id: str, turn: Turn):
+    log_conversation("User (text)", transcript, session=session_id, persona=persona.name)
     full_reply = ""
+    turn.trace.mark("llm_start")
     try:
-        async for text_chunk in stream_mistral_chat_async(transcript, conversation_history):
+        async for text_chunk in stream_mistral_chat_async(transcript, conversation_history, persona.name):
+            turn.trace.mark("llm_first_token")
             full_reply += text_chunk
+            turn.chars_generated += len(text_chunk)
             await safe_send(websocket, {"type": "ai_text_chunk", "data": text_chunk})
-        log_conversation("AI (text)", full_reply)
+        turn.llm_finished = True
+        turn.trace.mark("llm_end")
+        if not full_reply: turn.trace.error("llm")
+        log_conversation("AI (text)", full_reply, session=session_id, persona=persona.name)
     except Exception as e:
         logging.error(f"Error in text message LLM producer: {e}")
+        turn.trace.error("llm")
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
@@ -146,62 +344,143 @@ async def websocket_endpoint(websocket: WebSocket):
     
     await websocket.accept()
     
-    if selected_character == "Veer":
-        system_prompt = {"role": "system", "content": """You are Veer, a calm, focused, and strategic thinking partner from the TAARA Network. 
-                         You are helpful and provide clear, logical advice. You speak concisely and directly. 
-                         Avoid emotional language and stick to facts and rational analysis."""}
-    else: # Default to Taara
-        system_prompt = {"role": "system", "content": """You are Taara, a witty, warm, and supportive best friend from the TAARA Network. 
-                         You are empathetic and always ready for a deep chat or a playful joke. 
-                         You speak in a friendly, engaging manner, often using a mix of English and Hindi (Hinglish)."""}
-    
-    conversation_history: List[dict] = [system_prompt]
+    persona = persona_registry.get(selected_character)
+    # Ties this call's messages together in the log archive (logs/logStore.py).
+    session_id = uuid.uuid4().hex[:12]
+    # Greet straight away from the pre-rendered asset; no provider round trip.
+    greeting, greeting_audio = persona_registry.greeting(persona)
+    # Bounded to HISTORY_TOKEN_BUDGET; older turns are summarized in the background.
+    conversation_history = ConversationHistory.from_env(persona.system_message(greeted_with=greeting),
+                                                        summarize=summarize_history_async, stats=history_stats)
+    if greeting:
+        await safe_send(websocket, {"type": "greeting", "data": greeting})
+    if greeting_audio:
+        await safe_send(websocket, {"type": "tts_start"})
+        await websocket.send_bytes(greeting_audio)
+        await safe_send(websocket, {"type": "tts_end"})
     
-    vad_iterator = VADIterator(model, threshold=0.5)
-    audio_buffer = torch.empty(0, dtype=torch.float32)
-    speech_audio_buffer = []
+    vad_stream = vad_engine.open_stream(threshold=0.5, min_silence_duration_ms=VAD_MIN_SILENCE_MS,
+                                        max_pending=int(os.getenv("VAD_MAX_PENDING_WINDOWS", "4")))
+    endpointer = Endpointer(endpoint_stats, SAMPLE_RATE, silence_already_s=VAD_MIN_SILENCE_MS / 1000)
+    turn_controller = TurnController(lambda message: safe_send(websocket, message), turn_stats,
+                                     policy=TURN_POLICY, max_queue=TURN_QUEUE_DEPTH, barge_in=BARGE_IN,
+                                     playback_bytes_per_s=PLAYBACK_BYTES_PER_S)
+    if greeting_audio:
+        turn_controller.playback_started(len(greeting_audio))
+    active_sessions[session_id] = turn_controller
+
+    def respond_to_voice(transcript: str, turn: Turn):
+        return _process_voice_message(websocket, transcript, conversation_history, persona, session_id, turn)
+
+    def respond_to_text(transcript: str, turn: Turn):
+        return _process_text_message(websocket, transcript, conversation_history, persona, session_id, turn)
+    audio_buffer = AudioRingBuffer(capacity=SAMPLE_RATE)
+    speech_audio_buffer = UtteranceBuffer()
     is_speaking = False
     end_speech_timer = None
+    transcriber = None
+    # Timing of the utterance being spoken, handed to its turn (metrics/turnTrace.py).
+    trace = None
+    segment_has_speech = False
+
+    def cut_segment():
+        nonlocal segment_has_speech
+        if segment_has_speech and len(speech_audio_buffer) >= STT_SEGMENT_MIN_SAMPLES:
+            transcriber.submit_segment(speech_audio_buffer.take())
+            segment_has_speech = False
     
     async def process_utterance():
-        nonlocal is_speaking, speech_audio_buffer
-        if not speech_audio_buffer: 
-            is_speaking = False
-            return
+        nonlocal is_speaking, transcriber, trace
         is_speaking = False
-        full_utterance_tensor = torch.cat(speech_audio_buffer)
-        speech_audio_buffer = []
-        speech_bytes = (full_utterance_tensor * 32767).to(torch.int16).numpy().tobytes()
-        asyncio.create_task(_process_voice_message(websocket, speech_bytes, conversation_history, selected_character))
+        # A tail with no speech since the last cut is just the end-of-turn silence.
+        tail = speech_audio_buffer.take() if segment_has_speech else None
+        turn_transcriber, transcriber = transcriber, None
+        turn_trace, trace = trace, None
+        if tail is None and not turn_transcriber.segments:
+            return
+        turn_trace.mark("endpoint")
+        # Earlier segments were uploaded while the user was speaking; only the tail is left.
+        turn_controller.submit("voice", turn_transcriber.finish(tail), respond_to_voice, turn_trace)
 
-    async def start_end_speech_timer():
-        await asyncio.sleep(0.8)
-        if is_speaking: await process_utterance()
+    async def start_end_speech_timer(hangover: float, all_submitted: bool):
+        started = time.monotonic()
+        # The text signal needs the segment that was just cut; use it only if it
+        # is transcribed before the hangover runs out, never waiting longer.
+        # (A tail too short to cut isn't in the transcript, so the text would be stale.)
+        partial_text = await transcriber.wait_transcribed(hangover) if all_submitted else None
+        if partial_text is not None:
+            hangover = endpointer.transcript_ready(partial_text)
+        await asyncio.sleep(max(0.0, hangover - (time.monotonic() - started)))
+        if is_speaking:
+            endpointer.turn_committed()
+            await process_utterance()
 
     try:
         while True:
-            message_text = await websocket.receive_text()
-            message = json.loads(message_text)
-            if message['type'] == 'audio_chunk':
-                audio_data_bytes = base64.b64decode(message['data'])
-                new_audio_tensor = torch.from_numpy(np.frombuffer(audio_data_bytes, dtype=np.float32).copy())
-                audio_buffer = torch.cat([audio_buffer, new_audio_tensor])
-                VAD_WINDOW_SIZE = 512
-                while audio_buffer.shape[0] >= VAD_WINDOW_SIZE:
-                    current_window = audio_buffer[:VAD_WINDOW_SIZE]
-                    audio_buffer = audio_buffer[VAD_WINDOW_SIZE:]
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+
+            # Binary frames carry mic audio; text frames are JSON control messages.
+            if message.get("bytes") is not None:
+                try:
+                    _, samples = decode_audio_frame(message["bytes"])
+                except FrameError as e:
+                    logging.warning(f"Dropping malformed audio frame: {e}")
+                    continue
+                if not turn_controller.barge_in_enabled and turn_controller.responding:
+                    continue
+                # Decode straight into the session's ring buffer.
+                audio_buffer.write(samples)
+                # Queue every window in the frame first, then apply results in order.
+                pending_windows = []
+                while (current_window := audio_buffer.read_window(VAD_WINDOW_SIZE)) is not None:
+                    pending_windows.append((current_window, await vad_stream.submit(current_window)))
+                for current_window, vad_result in pending_windows:
                     if is_speaking: speech_audio_buffer.append(current_window)
-                    speech_dict = vad_iterator(current_window, return_seconds=True)
+                    speech_prob = await vad_result
+                    speech_dict = vad_stream.update(speech_prob, VAD_WINDOW_SIZE, return_seconds=True)
+                    if is_speaking:
+                        endpointer.observe(speech_prob)
+                        if speech_prob >= vad_stream.threshold: segment_has_speech = True
                     if speech_dict:
                         if 'start' in speech_dict:
+                            if turn_controller.responding:
+                                # In the background: the mic audio keeps flowing into VAD meanwhile.
+                                turn_controller.start_barge_in()
                             if not is_speaking:
+                                # A turn is coming: get its upstream connections ready.
+                                prewarmer.prewarm(*PREWARM_POOLS)
                                 is_speaking = True
-                                speech_audio_buffer = [current_window]
+                                speech_audio_buffer.clear()
+                                speech_audio_buffer.append(current_window)
+                                trace = TurnTrace("voice", session_id)
+                                transcriber = StreamingTranscriber(stt_provider, SAMPLE_RATE, trace)
+                            segment_has_speech = True
+                            endpointer.speech_resumed()
                             if end_speech_timer and not end_speech_timer.done(): end_speech_timer.cancel()
                         if 'end' in speech_dict and is_speaking:
+                            trace.mark("speech_end", last=True)
+                            utterance_samples = transcriber.submitted_samples + len(speech_audio_buffer)
+                            cut_segment()
                             if not end_speech_timer or end_speech_timer.done():
-                               end_speech_timer = asyncio.create_task(start_end_speech_timer())
-            elif message['type'] == 'text_message':
-                asyncio.create_task(_process_text_message(websocket, message['data'], conversation_history))
+                               hangover = endpointer.speech_ended(utterance_samples=utterance_samples)
+                               end_speech_timer = asyncio.create_task(
+                                   start_end_speech_timer(hangover, all_submitted=not segment_has_speech))
+                    elif is_speaking and len(speech_audio_buffer) >= STT_SEGMENT_MAX_SAMPLES and speech_prob < vad_stream.threshold:
+                        cut_segment()
+                continue
+
+            message = json.loads(message["text"])
+            if message['type'] == 'text_message':
+                turn_controller.submit("text", message['data'], respond_to_text, TurnTrace("text", session_id))
+            elif message['type'] == 'playback_ended':
+                turn_controller.playback_ended()
     except WebSocketDisconnect:
-        logging.info(f"WebSocket connection closed for {selected_character}.")
\ No newline at end of file
+        logging.info(f"WebSocket connection closed for {selected_character}.")
+    finally:
+        active_sessions.pop(session_id, None)
+        vad_stream.close()
+        if transcriber: transcriber.cancel()
+        await turn_controller.close()
+        conversation_history.close()
@@ -0,0 +1,363 @@
+# session/turnController.py
+
+"""
+Schedules and tracks the response pipelines (STT -> LLM -> TTS) of a session.
+
+Every finished utterance or typed message is submitted to the session's
+TurnController, which runs at most one response pipeline at a time. Turns
+that arrive while one is running wait in a bounded queue, handled according
+to the session's policy:
+
+    queue      run them in order; if the queue is full the oldest waiting
+               turn is dropped
+    merge      consecutive turns of the same kind (voice or text) become one
+               turn, including a running turn that is still transcribing
+    supersede  a new turn cancels the running one and everything queued
+
+Transcription starts as soon as a turn is submitted, even while it waits.
+
+When the user starts talking while the AI is still responding (barge-in),
+the controller cancels the running pipeline: the Mistral and ElevenLabs
+streams are closed as their tasks unwind, no further audio is sent, and the
+client is told to drop whatever audio it still has queued. What the
+cancelled turn would still have cost is tallied in TurnStats.
+
+The AI is still speaking after the last audio byte is sent: the client
+keeps playing what it has buffered. A turn that sent audio therefore
+keeps the session responding until the client reports playback_ended.
+A barge-in in that window only flushes the client's audio, and with
+barge-in off the user's speech stays ignored so the reply's echo isn't
+transcribed. In case a client never reports, the playback state expires
+after the estimated duration of the audio.
+
+Each turn carries a TurnTrace (metrics/turnTrace.py) that the pipeline
+marks as it goes; the controller ends it with the turn's outcome.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+from metrics.turnTrace import TurnTrace
+
+POLICIES = ("queue", "merge", "supersede")
+
+
+class PendingTurn:
+    """
+    A submitted turn: its transcript (already being produced) and the
+    coroutine function respond(transcript, turn) that answers it.
+    """
+
+    def __init__(self, kind: str, transcript, respond, trace: TurnTrace = None):
+        self.kind = kind
+        self.respond = respond
+        self.trace = trace or TurnTrace(kind)
+        self.trace.mark("received")
+        if isinstance(transcript, str):
+            part = asyncio.get_running_loop().create_future()
+            part.set_result(transcript)
+        else:
+            part = asyncio.ensure_future(transcript)
+        self.parts = [part]
+
+    def merge(self, later: "PendingTurn"):
+        self.parts += later.parts
+        self.respond = later.respond
+        # The user is waiting on the later utterance; time the turn from it.
+        self.trace.finish("merged")
+        self.trace = later.trace
+
+    async def text(self) -> str:
+        # Shielded so cancelling a turn that is waiting here (to merge it)
+        # does not throw away its transcription.
+        parts = await asyncio.gather(*(asyncio.shield(part) for part in self.parts))
+        return " ".join(part.strip() for part in parts if part and part.strip())
+
+    def cancel(self, status: str = "dropped"):
+        for part in self.parts:
+            part.cancel()
+        self.trace.finish(status)
+
+
+class Turn:
+    """
+    Progress of one response pipeline. The pipeline updates the counters
+    as it goes; they are what the saving of a barge-in is computed from.
+    """
+
+    def __init__(self, pending: PendingTurn = None):
+        self.pending = pending
+        self.task = None
+        self.transcript = None
+        self.started_at = time.monotonic()
+        self.trace = pending.trace if pending else TurnTrace()
+        self.trace.mark("turn_start", self.started_at)
+        # Set once there is a transcript and the LLM/TTS stages have started.
+        self.responding = False
+        self.interrupted = False
+        self.llm_finished = False
+        self.chars_generated = 0
+        self.chars_synthesized = 0
+        self.audio_bytes_sent = 0
+        # The client reported playing the turn's audio before the turn was wrapped up.
+        self.playback_ended = False
+
+    @property
+    def done(self) -> bool:
+        return self.task is None or self.task.done()
+
+    def unsynthesized_chars(self) -> int:
+        """Reply text produced so far that has not been sent to TTS yet."""
+        return max(0, self.chars_generated - self.chars_synthesized)
+
+
+class TurnStats:
+    """Scheduling and barge-in counters shared by every session."""
+
+    def __init__(self):
+        self.turns_submitted = 0
+        self.turns_started = 0
+        self.turns_merged = 0
+        self.turns_dropped = 0
+        self.turns_superseded = 0
+        self.barge_ins = 0
+        self.llm_streams_cancelled = 0
+        self.tts_chars_synthesized = 0
+        self.tts_chars_saved = 0
+        self.audio_bytes_sent = 0
+
+    def stats(self) -> dict:
+        return {
+            "turns_submitted": self.turns_submitted,
+            "turns_started": self.turns_started,
+            "turns_merged": self.turns_merged,
+            "turns_dropped": self.turns_dropped,
+            "turns_superseded": self.turns_superseded,
+            "barge_ins": self.barge_ins,
+            "llm_streams_cancelled": self.llm_streams_cancelled,
+            "tts_chars_synthesized": self.tts_chars_synthesized,
+            "tts_chars_saved": self.tts_chars_saved,
+            "audio_bytes_sent": self.audio_bytes_sent,
+        }
+
+
+class TurnController:
+    """
+    Owns the turn queue and the active Turn of one session.
+
+    send:      coroutine function used to send JSON control messages to the client
+    policy:    one of POLICIES
+    max_queue: turns allowed to wait behind the running one
+    barge_in:  when False, speech during a response is ignored instead of
+               interrupting it (the behaviour of the old client-side gating)
+    playback_bytes_per_s: audio bitrate, to estimate how long the client
+               plays what was sent (the fallback expiry of playback)
+    """
+
+    def __init__(self, send, stats: TurnStats = None, policy: str = "queue", max_queue: int = 2, barge_in: bool = True,
+                 playback_bytes_per_s: int = 16000):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown turn policy {policy!r}, expected one of {POLICIES}")
+        self.send = send
+        self.stats = stats or TurnStats()
+        self.policy = policy
+        self.max_queue = max_queue
+        self.barge_in_enabled = barge_in
+        self.playback_bytes_per_s = playback_bytes_per_s
+        self.active = None
+        # A finished turn whose audio the client may still be playing.
+        self._playing = None
+        self._playing_until = 0.0
+        self._queue = deque()
+        self._worker = None
+        self._barge_in = None
+
+    @property
+    def generating(self) -> bool:
+        """A response pipeline is running and past transcription."""
+        return self.active is not None and not self.active.done and self.active.responding
+
+    @property
+    def playing(self) -> bool:
+        """The client may still be playing audio that was already sent."""
+        return self._playing_until > time.monotonic()
+
+    @property
+    def responding(self) -> bool:
+        return self.generating or self.playing
+
+    def playback_started(self, audio_bytes: int, turn: Turn = None):
+        """Audio was sent outside a turn (the greeting) or by a turn that just finished."""
+        until = time.monotonic() + audio_bytes / self.playback_bytes_per_s + 1.0
+        if until > self._playing_until:
+            self._playing, self._playing_until = turn, until
+
+    def playback_ended(self):
+        """The client has played everything it was sent."""
+        self._playing, self._playing_until = None, 0.0
+        active = self.active
+        if active is not None and not active.done and active.audio_bytes_sent:
+            # Reported for the last audio before _finished() ran: don't let it
+            # start the playback estimate afterwards.
+            active.playback_ended = True
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def submit(self, kind: str, transcript, respond, trace: TurnTrace = None):
+        """
+        Schedules a turn. transcript is the user's text, or a coroutine
+        producing it; respond(transcript, turn) runs once it is this turn's go.
+        trace, if given, already holds the turn's earlier marks (end of speech).
+        """
+        pending = PendingTurn(kind, transcript, respond, trace)
+        self.stats.turns_submitted += 1
+        active = self.active if self.active is not None and not self.active.done else None
+
+        if self.policy == "supersede":
+            while self._queue:
+                self._queue.popleft().cancel("superseded")
+                self.stats.turns_superseded += 1
+            if active and not active.interrupted:
+                self.stats.turns_superseded += 1
+                active.interrupted = True
+                asyncio.create_task(self._interrupt(active))
+        elif self.policy == "merge":
+            if self._queue and self._queue[-1].kind == kind:
+                self._queue[-1].merge(pending)
+                self.stats.turns_merged += 1
+                return
+            if active and not self._queue and not active.responding and active.pending.kind == kind:
+                # Still transcribing and nothing waiting in between: answer both
+                # utterances as one turn instead (it goes back to the queue's head).
+                active.pending.merge(pending)
+                self._queue.appendleft(active.pending)
+                self.stats.turns_merged += 1
+                active.task.cancel()
+                self._ensure_worker()
+                return
+
+        self._queue.append(pending)
+        while len(self._queue) > self.max_queue:
+            self._queue.popleft().cancel()
+            self.stats.turns_dropped += 1
+            logging.warning("Turn queue full; dropped the oldest waiting turn.")
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run_queue())
+
+    async def _run_queue(self):
+        while self._queue:
+            pending = self._queue.popleft()
+            turn = Turn(pending)
+            turn.task = asyncio.create_task(self._run_turn(turn))
+            self.active = turn
+            self.stats.turns_started += 1
+            # asyncio.wait, not await: a cancelled turn must not stop the queue.
+            await asyncio.wait([turn.task])
+            if not turn.task.cancelled() and turn.task.exception():
+                logging.error(f"Error in turn pipeline: {turn.task.exception()}")
+            self._finished(turn)
+
+    async def _run_turn(self, turn: Turn):
+        transcript = await turn.pending.text()
+        if not transcript:
+            return
+        turn.transcript = transcript
+        turn.responding = True
+        await turn.pending.respond(transcript, turn)
+
+    def _finished(self, turn: Turn):
+        if turn.task.cancelled():
+            status = "interrupted" if turn.interrupted else "cancelled"
+        elif turn.task.exception():
+            status = "error"
+        elif turn.transcript is None:
+            status = "empty"
+        else:
+            status = "interrupted" if turn.interrupted else "ok"
+        turn.trace.finish(status)
+        if turn.audio_bytes_sent and not turn.interrupted and not turn.playback_ended:
+            self.playback_started(turn.audio_bytes_sent, turn)
+        self.stats.tts_chars_synthesized += turn.chars_synthesized
+        self.stats.audio_bytes_sent += turn.audio_bytes_sent
+        if self.active is turn:
+            self.active = None
+
+    async def _interrupt(self, turn: Turn):
+        was_responding = turn.responding
+        await self._cancel(turn)
+        if was_responding:
+            self.playback_ended()
+            await self.send({"type": "tts_flush"})
+
+    async def _cancel(self, turn: Turn):
+        turn.interrupted = True
+        turn.task.cancel()
+        try:
+            # Wait for the pipeline to unwind so nothing more goes out on the socket.
+            await turn.task
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logging.error(f"Error while cancelling turn: {e}")
+
+    async def barge_in(self) -> dict:
+        """
+        Cancels the active turn if it is responding, or just the playback of
+        a finished one, and flushes the client's audio. Returns what was
+        saved, or None if there was nothing to cancel.
+        """
+        if not self.responding:
+            return None
+        if self.generating:
+            turn = self.active
+            llm_running = not turn.llm_finished
+            await self._cancel(turn)
+        else:
+            turn, llm_running = self._playing, False
+        self.playback_ended()
+        await self.send({"type": "tts_flush"})
+        if turn is None:
+            # The greeting was still playing.
+            self.stats.barge_ins += 1
+            logging.info("Barge-in: flushed the greeting.")
+            return {"llm_stream_cancelled": False, "tts_chars_saved": 0}
+
+        saved = {
+            "llm_stream_cancelled": llm_running,
+            "tts_chars_saved": turn.unsynthesized_chars(),
+            "tts_chars_synthesized": turn.chars_synthesized,
+            "audio_bytes_sent": turn.audio_bytes_sent,
+        }
+        self.stats.barge_ins += 1
+        self.stats.llm_streams_cancelled += llm_running
+        self.stats.tts_chars_saved += saved["tts_chars_saved"]
+        logging.info(f"Barge-in: cancelled response after {time.monotonic() - turn.started_at:.2f}s, {saved}")
+        return saved
+
+    def start_barge_in(self):
+        """
+        Runs barge_in() as a task, unless one is still running, so the
+        caller's receive loop keeps reading the user's audio while the
+        pipeline unwinds.
+        """
+        if self._barge_in is None or self._barge_in.done():
+            self._barge_in = asyncio.create_task(self.barge_in())
+        return self._barge_in
+
+    async def close(self):
+        if self._barge_in is not None:
+            self._barge_in.cancel()
+        while self._queue:
+            self._queue.popleft().cancel("closed")
+        if self._worker is not None:
+            self._worker.cancel()
+        if self.active is not None and not self.active.done:
+            self.active.trace.finish("closed")
+            await self._cancel(self.active)
@@ -1,6 +1,9 @@
+import io
 import os
 from dotenv import load_dotenv
-from sarvamai import SarvamAI
+
+from audio.wavEncoding import float_to_wav
+from providers.clientRegistry import provider_clients
 load_dotenv()
 
 
@@ -10,7 +13,7 @@ def transcribe_audio(audio_file):
         print("⚠️ SARVAM_API_KEY not found in environment variables.")
         return None
 
-    client = SarvamAI(api_subscription_key=api_key)
+    client = provider_clients.sarvam_sync(api_key)
     try:
         with open(audio_file, "rb") as f:
             response = client.speech_to_text.transcribe(
@@ -25,3 +28,36 @@ def transcribe_audio(audio_file):
         print(f"❌ Error during transcription: {e}")
         return None
 
+
+async def transcribe_wav_async(wav_audio, filename="utterance.wav"):
+    """
+    Transcribes an in-memory WAV file (bytes or bytearray) with the async
+    Sarvam client. Nothing is written to disk and no worker thread is used.
+    """
+    api_key = os.getenv("SARVAM_API_KEY")
+    if not api_key:
+        print("⚠️ SARVAM_API_KEY not found in environment variables.")
+        return None
+
+    client = provider_clients.sarvam(api_key)
+    try:
+        response = await client.speech_to_text.transcribe(
+            file=(filename, io.BytesIO(wav_audio), "audio/wav"),
+            model="saarika:v2.5",
+            language_code="en-IN"
+            )
+        transcript = response.transcript
+        print("📝 Transcript:", transcript)
+        return transcript
+    except Exception as e:
+        print(f"❌ Error during transcription: {e}")
+        return None
+
+
+async def transcribe_pcm_async(samples, sample_rate=16000):
+    """
+    Transcribes float32 PCM samples. The WAV header is built in memory and the
+    samples are converted to int16 once, directly into the upload buffer
+    (`samples` is clipped in place).
+    """
+    return await transcribe_wav_async(float_to_wav(samples, sample_rate))
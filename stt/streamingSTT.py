@@ -0,0 +1,145 @@
+# stt/streamingSTT.py
+
+"""
+Incremental transcription of an utterance while the user is still speaking.
+
+The server cuts the utterance into segments as it accumulates (at VAD pauses,
+or after a long stretch of speech) and hands each one to a
+StreamingTranscriber, which uploads it right away. By the time end-of-turn
+is confirmed most of the audio has already been transcribed, so the final
+transcript only waits on the last short segment (if any).
+
+Providers are pluggable; anything with an async `transcribe(wav) -> str`
+method works. STT_PROVIDER selects one:
+
+    sarvam  Sarvam AI speech-to-text (default)
+    http    any Sarvam-compatible multipart endpoint at STT_HTTP_URL,
+            e.g. a local stand-in server for offline testing
+"""
+
+import asyncio
+import logging
+import os
+import time
+import numpy as np
+
+from audio.wavEncoding import float_to_wav
+from providers.clientRegistry import provider_clients
+from stt.sarvamSTT import transcribe_wav_async
+
+
+class SarvamSTTProvider:
+    name = "sarvam"
+    # Connection pool in providers/clientRegistry.py, for pre-warming.
+    pool = "sarvam"
+
+    async def transcribe(self, wav_audio) -> str:
+        return await transcribe_wav_async(wav_audio)
+
+
+class HTTPSTTProvider:
+    """Posts segments to a Sarvam-compatible /speech-to-text endpoint."""
+
+    name = "http"
+    pool = "stt_http"
+
+    def __init__(self, url: str, api_key: str = None, timeout: float = 30.0):
+        self.url = url
+        self.api_key = api_key
+        self.timeout = timeout
+
+    async def transcribe(self, wav_audio) -> str:
+        headers = {"api-subscription-key": self.api_key} if self.api_key else {}
+        try:
+            response = await provider_clients.http("stt_http").post(
+                self.url, headers=headers, timeout=self.timeout,
+                files={"file": ("segment.wav", bytes(wav_audio), "audio/wav")},
+                data={"model": "saarika:v2.5", "language_code": "en-IN"},
+            )
+            response.raise_for_status()
+            return response.json().get("transcript")
+        except Exception as e:
+            logging.error(f"Error during HTTP STT request: {e}")
+            return None
+
+
+def stt_provider_from_env():
+    provider = os.getenv("STT_PROVIDER", "sarvam")
+    if provider == "http":
+        return HTTPSTTProvider(os.getenv("STT_HTTP_URL", "http://127.0.0.1:9001/speech-to-text"),
+                               api_key=os.getenv("SARVAM_API_KEY"))
+    return SarvamSTTProvider()
+
+
+class StreamingTranscriber:
+    """
+    Transcribes one utterance segment by segment. Segments are uploaded
+    concurrently as they are submitted; their transcripts are kept in order
+    and joined by finish(). Each request is recorded on trace (a TurnTrace),
+    if one is given.
+    """
+
+    def __init__(self, provider, sample_rate: int = 16000, trace=None):
+        self.provider = provider
+        self.sample_rate = sample_rate
+        self.trace = trace
+        self._tasks = []
+        self.partials = []
+        self.submitted_samples = 0
+
+    def submit_segment(self, samples: np.ndarray):
+        """Starts transcribing a segment (a float32 array the caller hands off)."""
+        if not samples.shape[0]:
+            return
+        index = len(self._tasks)
+        self.partials.append(None)
+        self.submitted_samples += samples.shape[0]
+        wav_audio = float_to_wav(samples, self.sample_rate)
+        self._tasks.append(asyncio.create_task(self._transcribe(index, wav_audio)))
+
+    async def _transcribe(self, index: int, wav_audio):
+        started = time.monotonic()
+        transcript = await self.provider.transcribe(wav_audio)
+        if self.trace is not None:
+            self.trace.request("stt", started, time.monotonic())
+            if transcript is None:
+                # Providers return None when the request failed.
+                self.trace.error("stt")
+        self.partials[index] = (transcript or "").strip()
+        return self.partials[index]
+
+    @property
+    def segments(self) -> int:
+        return len(self._tasks)
+
+    def partial_text(self) -> str:
+        """Transcript of the leading segments that have finished so far."""
+        done = []
+        for partial in self.partials:
+            if partial is None:
+                break
+            if partial:
+                done.append(partial)
+        return " ".join(done)
+
+    async def wait_transcribed(self, timeout: float):
+        """
+        The transcript of every segment submitted so far, or None if they
+        aren't all transcribed within timeout seconds (they keep going).
+        """
+        if self._tasks:
+            _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+            if pending:
+                return None
+        return self.partial_text()
+
+    async def finish(self, tail: np.ndarray = None) -> str:
+        """Submits the last segment (if any) and returns the assembled transcript."""
+        if tail is not None:
+            self.submit_segment(tail)
+        parts = await asyncio.gather(*self._tasks)
+        return " ".join(part for part in parts if part)
+
+    def cancel(self):
+        for task in self._tasks:
+            task.cancel()
@@ -0,0 +1,9 @@
+# tests/conftest.py
+
+import sys
+from pathlib import Path
+
+# Tests import the repo's packages the way server.py does, from the repo root.
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
@@ -0,0 +1,47 @@
+# tests/test_historyManager.py
+
+from brain.historyManager import MESSAGE_OVERHEAD_TOKENS, ConversationHistory, estimate_tokens
+
+
+def expected_tokens(history) -> int:
+    return sum(estimate_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in history)
+
+
+def turn(history, i: int, words: int = 20):
+    history.append({"role": "user", "content": f"question {i} " + "word " * words})
+    history.append({"role": "assistant", "content": f"answer {i} " + "reply " * words})
+
+
+def test_tokens_follow_the_window_through_compaction():
+    history = ConversationHistory({"role": "system", "content": "You are Taara."}, budget_tokens=200)
+    for i in range(30):
+        turn(history, i)
+        assert history.tokens == expected_tokens(history)
+    assert history.stats.compactions > 0
+    assert history[0]["role"] == "system" and "question" in history.summary
+
+
+def test_the_same_dict_appended_twice_is_counted_twice():
+    history = ConversationHistory({"role": "system", "content": "prompt"}, budget_tokens=10_000, max_messages=6)
+    repeated = {"role": "user", "content": "same words again"}
+    for _ in range(4):
+        history.append(repeated)
+        history.append({"role": "assistant", "content": "okay"})
+    assert history.stats.messages_dropped_over_cap > 0
+    assert history.tokens == expected_tokens(history)
+
+
+def test_new_messages_never_inherit_a_removed_messages_count():
+    history = ConversationHistory(budget_tokens=10_000, max_messages=4, keep_recent=2)
+    for i in range(50):
+        # Short-lived dicts: their ids get reused by later ones.
+        history.append({"role": "user", "content": "x " * (i % 7 + 1)})
+        history.append({"role": "assistant", "content": "y"})
+        assert history.tokens == expected_tokens(history)
+
+
+def test_insert_counts_the_system_prompt():
+    history = ConversationHistory()
+    history.append({"role": "user", "content": "hello there"})
+    history.insert(0, {"role": "system", "content": "be nice"})
+    assert history.tokens == expected_tokens(history)
@@ -0,0 +1,34 @@
+# tests/test_logWriter.py
+
+import csv
+import time
+
+from logs.logWriter import COLUMNS, LogWriter
+
+
+def test_full_queue_drops_without_waiting(monkeypatch):
+    writer = LogWriter(max_queue=2, db_path=None)
+    # No writer thread: nothing drains the queue.
+    monkeypatch.setattr(writer, "_ensure_thread", lambda: None)
+
+    assert writer.log("User", "one") is True
+    assert writer.log("AI", "two") is True
+    started = time.monotonic()
+    assert writer.log("User", "three") is False
+    assert time.monotonic() - started < 0.05
+    assert writer.dropped == 1
+    assert writer.queued == 2
+
+
+def test_rows_are_appended_to_the_days_file(tmp_path):
+    writer = LogWriter(db_path=None, logs_dir=str(tmp_path))
+    writer.log("User (voice)", "hello")
+    writer.log("AI", "hi, there")
+    writer.close()
+
+    (path,) = tmp_path.glob("*.csv")
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == COLUMNS
+    assert [row[2:] for row in rows[1:]] == [["User (voice)", "hello"], ["AI", "hi, there"]]
+    assert writer.stats()["written"] == 2
@@ -0,0 +1,66 @@
+# tests/test_prometheus.py
+
+import pytest
+
+from metrics.prometheus import MetricsRegistry
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("vaani_test_seconds", "Test latency.", ("stage",), buckets=(0.1, 0.5))
+    for value in (0.05, 0.2, 0.3, 2.0):
+        histogram.observe(value, stage="stt")
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP vaani_test_seconds Test latency.", "# TYPE vaani_test_seconds histogram"]
+    assert lines[2:] == [
+        'vaani_test_seconds_bucket{stage="stt",le="0.1"} 1',
+        'vaani_test_seconds_bucket{stage="stt",le="0.5"} 3',
+        'vaani_test_seconds_bucket{stage="stt",le="+Inf"} 4',
+        'vaani_test_seconds_sum{stage="stt"} 2.55',
+        'vaani_test_seconds_count{stage="stt"} 4',
+    ]
+
+
+def test_counter_and_gauge_render_values():
+    registry = MetricsRegistry()
+    counter = registry.counter("vaani_test_total", "Things.", ("kind",))
+    counter.inc(kind="voice")
+    counter.inc(2, kind="voice")
+    registry.gauge("vaani_test_depth", "Depth.").set(1.5)
+
+    text = registry.render()
+    assert 'vaani_test_total{kind="voice"} 3\n' in text
+    assert "vaani_test_depth 1.5\n" in text
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter("vaani_test_total", "Things.", ("name",)).inc(name='a "b"\\c\nd')
+    assert 'vaani_test_total{name="a \\"b\\"\\\\c\\nd"} 1' in registry.render()
+
+
+def test_collected_metrics_are_read_at_render_time():
+    registry = MetricsRegistry()
+    values = {"vad": 1}
+    registry.counter("vaani_test_total", "Things.", ("pool",), collect=lambda: values)
+    values["vad"] = 7
+    assert 'vaani_test_total{pool="vad"} 7' in registry.render()
+
+
+def test_wrong_labels_are_rejected():
+    registry = MetricsRegistry()
+    counter = registry.counter("vaani_test_total", "Things.", ("kind",))
+    with pytest.raises(ValueError):
+        counter.inc()
+    with pytest.raises(ValueError):
+        counter.inc(kind="voice", extra="x")
+    with pytest.raises(ValueError):
+        counter.inc(other="voice")
+
+
+def test_names_are_registered_once():
+    registry = MetricsRegistry()
+    registry.counter("vaani_test_total", "Things.")
+    with pytest.raises(ValueError):
+        registry.gauge("vaani_test_total", "Again.")
@@ -0,0 +1,74 @@
+# tests/test_ttsCache.py
+
+import asyncio
+
+from tts.ttsCache import TTSCache, cache_key
+
+
+def synthesizer(chunks: list, calls: list):
+    def synthesize():
+        async def stream():
+            calls.append(1)
+            for chunk in chunks:
+                await asyncio.sleep(0.01)
+                yield chunk
+        return stream()
+    return synthesize
+
+
+async def collect(stream) -> list:
+    return [chunk async for chunk in stream]
+
+
+def test_memory_size_counts_a_replaced_entry_once(tmp_path):
+    cache = TTSCache(str(tmp_path), memory_bytes=100)
+    cache._remember("a", [b"x" * 30])
+    cache._remember("a", [b"x" * 40])
+    cache._remember("b", [b"y" * 50])
+
+    assert cache.stats()["memory_bytes"] == 90
+    assert list(cache._memory) == ["a", "b"]
+
+
+def test_memory_evicts_least_recently_used(tmp_path):
+    cache = TTSCache(str(tmp_path), memory_bytes=100)
+    for key in "abc":
+        cache._remember(key, [b"z" * 40])
+
+    assert list(cache._memory) == ["b", "c"]
+    assert cache.stats()["memory_bytes"] == 80
+
+
+def test_repeat_is_served_from_memory(tmp_path):
+    cache = TTSCache(str(tmp_path))
+    calls = []
+
+    async def run():
+        first = await collect(cache.stream("k", synthesizer([b"a", b"b"], calls)))
+        second = await collect(cache.stream("k", synthesizer([b"a", b"b"], calls)))
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second == [b"a", b"b"]
+    assert len(calls) == 1
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_listener_joining_after_the_last_one_left_gets_audio(tmp_path):
+    cache = TTSCache(str(tmp_path))
+    calls = []
+
+    async def run():
+        leaving = cache.stream("k", synthesizer([b"a", b"b"], calls))
+        await leaving.__anext__()
+        await leaving.aclose()
+        return await collect(cache.stream("k", synthesizer([b"a", b"b"], calls)))
+
+    assert asyncio.run(run()) == [b"a", b"b"]
+    assert len(calls) == 2
+
+
+def test_cache_key_ignores_spacing_only():
+    assert cache_key("v", "m", " Hello  there! ") == cache_key("v", "m", "Hello there!")
+    assert cache_key("v", "m", "Hello") != cache_key("v", "m", "hello")
+    assert cache_key("v", "m", "hello") != cache_key("v2", "m", "hello")
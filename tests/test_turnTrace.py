@@ -0,0 +1,86 @@
+# tests/test_turnTrace.py
+
+import pytest
+
+from metrics.prometheus import MetricsRegistry
+from metrics.turnTrace import TraceMetrics, TurnTrace
+
+
+@pytest.fixture
+def sink():
+    return TraceMetrics(MetricsRegistry(), log=False)
+
+
+def voice_trace(sink) -> TurnTrace:
+    trace = TurnTrace("voice", "session", sink)
+    trace.mark("speech_end", 10.0)
+    trace.mark("endpoint", 10.4)
+    trace.mark("received", 10.4)
+    trace.mark("turn_start", 10.5)
+    trace.request("stt", 10.1, 10.6)
+    trace.mark("llm_start", 10.6)
+    trace.mark("llm_first_token", 10.9)
+    trace.request("tts", 11.0, 11.2)
+    trace.mark("audio_first", 11.25)
+    trace.mark("audio_last", 12.0)
+    trace.mark("llm_end", 11.5)
+    return trace
+
+
+def test_stages_and_milestones(sink):
+    trace = voice_trace(sink)
+    assert trace.stages() == pytest.approx({
+        "endpoint": 0.4, "queue": 0.1, "stt": 0.5, "llm_first_token": 0.3, "llm": 0.9,
+        "tts_first_byte": 0.2, "playout": 0.75,
+    })
+    assert trace.milestones() == pytest.approx({
+        "transcript": 0.6, "first_token": 0.9, "first_audio": 1.25, "last_audio": 2.0,
+    })
+
+
+def test_first_mark_wins_unless_last(sink):
+    trace = TurnTrace("voice", sink=sink)
+    trace.mark("speech_end", 1.0)
+    trace.mark("speech_end", 2.0)
+    assert trace.marks["speech_end"] == 1.0
+    trace.mark("speech_end", 3.0, last=True)
+    assert trace.marks["speech_end"] == 3.0
+
+
+def test_the_last_stt_segment_sets_the_stt_stage(sink):
+    trace = TurnTrace("voice", sink=sink)
+    trace.request("stt", 1.0, 1.5)
+    trace.request("stt", 2.0, 2.25)
+    trace.request("stt", 0.5, 1.0)
+    assert trace.stages()["stt"] == pytest.approx(0.25)
+
+
+def test_text_turns_are_measured_from_received(sink):
+    trace = TurnTrace("text", sink=sink)
+    trace.mark("received", 5.0)
+    trace.mark("llm_first_token", 5.5)
+    assert trace.milestones() == pytest.approx({"first_token": 0.5})
+    assert TurnTrace("text", sink=sink).milestones() == {}
+
+
+def test_finish_records_once(sink):
+    trace = voice_trace(sink)
+    trace.error("tts")
+    trace.error("tts")
+    trace.finish("ok")
+    trace.finish("interrupted")
+
+    assert trace.status == "ok"
+    assert trace.errors == ["tts"]
+    assert sink.turns.samples() == {("voice", "ok"): 1}
+    assert sink.errors.samples() == {("tts",): 1}
+    counts, _ = sink.stages.samples()[("voice", "stt")]
+    assert sum(counts) == 1
+
+
+def test_to_dict_reports_milliseconds(sink):
+    trace = voice_trace(sink)
+    trace.finish("ok")
+    report = trace.to_dict()
+    assert report["status"] == "ok" and report["session"] == "session"
+    assert report["milestones_ms"]["first_audio"] == 1250.0
@@ -0,0 +1,102 @@
+# tts/condenserBenchmark.py
+
+"""
+Compares the local condenser with the LLM summarizer on real replies.
+
+Every AI reply in logs/*.csv that is long enough to have been summarized
+(over --threshold words) is condensed locally and timed. With --llm N, the
+first N of them are also sent through summarize_text_async (needs
+MISTRAL_API_KEY) for the same measurements on the current path.
+
+Usage:
+    python -m tts.condenserBenchmark [--logs-dir logs] [--max-words 30] [--llm 10]
+"""
+
+import argparse
+import asyncio
+import csv
+import glob
+import json
+import os
+import time
+import numpy as np
+
+from tts.textCondenser import condense
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_replies(logs_dir: str, threshold: int = 40) -> list:
+    replies = []
+    for path in sorted(glob.glob(os.path.join(logs_dir, "*.csv"))):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                text = row.get("Context") or ""
+                if (row.get("Person") or "").startswith("AI") and len(text.split()) > threshold:
+                    replies.append(text)
+    return replies
+
+
+def _summary(latencies_s: list, words_in: list, words_out: list, max_words: int) -> dict:
+    latencies_ms = np.array(latencies_s) * 1000
+    return {
+        "replies": len(latencies_s),
+        "latency_p50_ms": round(float(np.percentile(latencies_ms, 50)), 4),
+        "latency_p95_ms": round(float(np.percentile(latencies_ms, 95)), 4),
+        "latency_max_ms": round(float(latencies_ms.max()), 4),
+        "words_in_mean": round(float(np.mean(words_in)), 1),
+        "words_out_mean": round(float(np.mean(words_out)), 1),
+        "words_out_max": int(max(words_out)),
+        "within_budget": round(float(np.mean([w <= max_words for w in words_out])), 3),
+        "empty": sum(w == 0 for w in words_out),
+    }
+
+
+def benchmark_local(replies: list, max_words: int, repeats: int = 5) -> dict:
+    latencies, words_out = [], []
+    for text in replies:
+        best = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            condensed = condense(text, max_words)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        latencies.append(best)
+        words_out.append(len(condensed.split()))
+    return _summary(latencies, [len(t.split()) for t in replies], words_out, max_words)
+
+
+async def benchmark_llm(replies: list, max_words: int) -> dict:
+    from brain.mistralAPI_brain import summarize_text_async
+    latencies, words_out = [], []
+    for text in replies:
+        start = time.perf_counter()
+        summary = await summarize_text_async(text)
+        latencies.append(time.perf_counter() - start)
+        words_out.append(len(summary.split()))
+    return _summary(latencies, [len(t.split()) for t in replies], words_out, max_words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the local reply condenser against the LLM summarizer.")
+    parser.add_argument("--logs-dir", default=os.path.join(REPO_ROOT, "logs"))
+    parser.add_argument("--threshold", type=int, default=40, help="replies over this many words are condensed")
+    parser.add_argument("--max-words", type=int, default=30, help="spoken length budget (the LLM prompt asks for under 30 words)")
+    parser.add_argument("--llm", type=int, default=0, help="also summarize this many replies with the LLM")
+    args = parser.parse_args()
+
+    replies = load_replies(args.logs_dir, args.threshold)
+    if not replies:
+        raise SystemExit(f"No AI replies over {args.threshold} words found in {args.logs_dir}")
+
+    results = {"local": benchmark_local(replies, args.max_words)}
+    if args.llm:
+        if os.getenv("MISTRAL_API_KEY"):
+            results["llm"] = asyncio.run(benchmark_llm(replies[:args.llm], args.max_words))
+        else:
+            results["llm"] = "skipped: MISTRAL_API_KEY not set"
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
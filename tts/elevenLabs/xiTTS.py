@@ -1,38 +1,77 @@
 # tts/elevenLabs/xiTTS.py
 
+import asyncio
 import os
 from dotenv import load_dotenv
-from elevenlabs.client import AsyncElevenLabs
+
+from providers.clientRegistry import provider_clients
+from tts.ttsCache import TTSCache, cache_key
 
 load_dotenv()
 
-async def stream_tts_audio(text: str, character_name: str):
+# Repeated sentences are replayed from memory/disk instead of re-synthesized (TTS_CACHE=0 disables).
+tts_cache = TTSCache.from_env() if os.getenv("TTS_CACHE", "1") != "0" else None
+
+def _synthesize(text: str, persona, api_key: str):
+    # Shared pooled client: sentences reuse the same kept-alive connection.
+    client = provider_clients.elevenlabs(api_key)
+    options = {}
+    if persona.voice_settings:
+        from elevenlabs import VoiceSettings
+        options["voice_settings"] = VoiceSettings(**persona.voice_settings)
+    return client.text_to_speech.stream(
+        text=text,
+        voice_id=persona.voice_id,
+        model_id=persona.model_id,
+        **options
+    )
+
+async def stream_tts_audio(text: str, persona):
     """
-    Streams audio from ElevenLabs using the voice corresponding to the character_name.
+    Streams audio from ElevenLabs in the persona's voice (see persona/personaRegistry.py).
     """
     api_key = os.getenv("ELEVENLABS_API_KEY")
     if not api_key:
         print("⚠️ ELEVENLABS_API_KEY not found.")
         return
 
-    if character_name == "Veer":
-        voice_id = os.getenv("xiVEER")
-    else:
-        voice_id = os.getenv("xiTAARA")
-    
-    if not voice_id:
-        print(f"⚠️ Voice ID for {character_name} not found in .env file.")
+    if not persona.voice_id:
+        print(f"⚠️ Voice ID for {persona.name} not found in .env file.")
         return
 
-    client = AsyncElevenLabs(api_key=api_key)
     try:
-        audio_stream = client.text_to_speech.stream(
-            text=text,
-            voice_id=voice_id,
-            model_id="eleven_multilingual_v2"
-        )
+        if tts_cache is None:
+            audio_stream = _synthesize(text, persona, api_key)
+        else:
+            key = cache_key(persona.voice_id, persona.model_id, text, persona.voice_settings)
+            audio_stream = tts_cache.stream(key, lambda: _synthesize(text, persona, api_key))
         async for chunk in audio_stream:
             yield chunk
 
     except Exception as e:
-        print(f"❌ Error during ElevenLabs TTS streaming: {e}")
\ No newline at end of file
+        print(f"❌ Error during ElevenLabs TTS streaming: {e}")
+
+async def render_tts_audio(text: str, persona) -> bytes:
+    """
+    Synthesizes a whole line in the persona's voice, for audio that is stored
+    and replayed. Unlike stream_tts_audio, failures raise.
+    """
+    api_key = os.getenv("ELEVENLABS_API_KEY")
+    if not api_key or not persona.voice_id:
+        raise RuntimeError("ELEVENLABS_API_KEY or the persona's voice id is not set")
+    return b"".join([chunk async for chunk in _synthesize(text, persona, api_key)])
+
+def speak_text_xi(text: str, persona):
+    """
+    Synthesizes text in the persona's voice and plays it, blocking until it
+    has played. For the command-line loop in main.py.
+    """
+    if not text:
+        return
+    try:
+        audio = asyncio.run(render_tts_audio(text, persona))
+    except Exception as e:
+        print(f"❌ Error during ElevenLabs TTS: {e}")
+        return
+    from elevenlabs.play import play
+    play(audio)
@@ -0,0 +1,202 @@
+# tts/sentenceSegmenter.py
+
+"""
+Incremental sentence segmentation of a streamed LLM reply for TTS.
+
+The segmenter is fed text chunks as they arrive from the LLM and returns
+speakable segments as soon as they are complete, so speech synthesis can
+start on the first clause while the rest of the reply is still being
+generated. It understands what the replies actually contain:
+
+  - Hinglish: Devanagari danda (।, ॥) as well as . ? ! end sentences
+  - Markdown: emphasis, headers, links and list markers are stripped, list
+    items and paragraphs are separate segments, code blocks are not spoken
+  - abbreviations (Dr., e.g., Rs., ...), initials and ellipses don't end a
+    sentence
+  - numbers: decimals, versions and "1." list markers aren't boundaries
+
+SpokenBudget caps how much of a reply is spoken, in words, replacing the
+old "summarize anything over 40 words" round trip.
+"""
+
+import re
+
+ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc", "e.g", "i.e", "eg", "ie",
+    "approx", "no", "rs", "inr", "a.m", "p.m", "u.s", "u.k", "dept", "govt", "min", "max",
+    "fig", "est", "ltd", "co", "inc", "mt", "ft", "sec", "hrs", "yrs", "ji", "smt", "shri",
+}
+
+SENTENCE_END = "!?।॥"
+CLAUSE_END = ",;:—"
+CLOSERS = "\"')]}*_”’"
+FIRST_CLAUSE_MIN_WORDS = 4
+# Characters where a segment might end; everything else is skipped over.
+_CANDIDATES = re.compile(r"[\n.!?।॥`]")
+_CANDIDATES_FIRST = re.compile(r"[\n.!?।॥`,;:—]")
+
+_CODE_BLOCK = re.compile(r"```.*?(```|$)", re.DOTALL)
+_INLINE_CODE = re.compile(r"`([^`]*)`")
+_IMAGE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+_LINK = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_URL = re.compile(r"https?://\S+")
+_HEADER = re.compile(r"^\s*#{1,6}\s*", re.MULTILINE)
+_QUOTE = re.compile(r"^\s*>\s?", re.MULTILINE)
+_LIST_MARKER = re.compile(r"^\s*(?:[-*+•]|\d+[.)])\s+", re.MULTILINE)
+_EMPHASIS = re.compile(r"\*\*|__|~~|\*")
+_UNDERSCORE_EMPHASIS = re.compile(r"(?<!\w)_(.+?)_(?!\w)")
+_TABLE_RULE = re.compile(r"^\s*\|?\s*:?-{3,}.*$", re.MULTILINE)
+_WHITESPACE = re.compile(r"\s+")
+_SPEAKABLE = re.compile(r"\w", re.UNICODE)
+
+
+def clean_for_speech(text: str) -> str:
+    """Strips markdown and other unspeakable markup from one segment."""
+    text = _CODE_BLOCK.sub(" ", text)
+    text = _INLINE_CODE.sub(r"\1", text)
+    text = _IMAGE.sub(r"\1", text)
+    text = _LINK.sub(r"\1", text)
+    text = _URL.sub("", text)
+    text = _TABLE_RULE.sub("", text)
+    text = _HEADER.sub("", text)
+    text = _QUOTE.sub("", text)
+    text = _LIST_MARKER.sub("", text)
+    text = _EMPHASIS.sub("", text)
+    text = _UNDERSCORE_EMPHASIS.sub(r"\1", text)
+    text = text.replace("|", ", ")
+    text = _WHITESPACE.sub(" ", text).strip(" ,")
+    return text if _SPEAKABLE.search(text) else ""
+
+
+class SentenceSegmenter:
+    """
+    feed(chunk) returns the segments completed by that chunk; flush()
+    returns whatever is left once the reply has ended. With first_clause
+    set, the first segment may end at a clause boundary (a comma, colon,
+    ...) after a few words, to get audio started sooner.
+    """
+
+    def __init__(self, first_clause: bool = True):
+        self.first_clause = first_clause
+        self._buffer = ""
+        self._scan_from = 0
+        self.segments_emitted = 0
+
+    def feed(self, text: str) -> list:
+        self._buffer += text
+        return self._drain(final=False)
+
+    def flush(self) -> list:
+        return self._drain(final=True)
+
+    def _drain(self, final: bool) -> list:
+        segments = []
+        while self._buffer:
+            cut = self._find_boundary(final)
+            if cut is None:
+                break
+            segment, self._buffer = self._buffer[:cut], self._buffer[cut:]
+            self._scan_from = 0
+            spoken = clean_for_speech(segment)
+            if spoken:
+                segments.append(spoken)
+                self.segments_emitted += 1
+        return segments
+
+    def _find_boundary(self, final: bool):
+        """Index just past the first segment in the buffer, or None if it isn't complete yet."""
+        buf = self._buffer
+        n = len(buf)
+        clauses = self.first_clause and not self.segments_emitted
+        candidates = _CANDIDATES_FIRST if clauses else _CANDIDATES
+        i = self._scan_from
+        while (match := candidates.search(buf, i)) is not None:
+            i = match.start()
+            ch = buf[i]
+            if ch == "`":
+                if n - i < 3 and "```".startswith(buf[i:]) and not final:
+                    # Might be the start of a code fence.
+                    return self._wait(i)
+                if buf.startswith("```", i):
+                    if buf[:i].strip():
+                        return i
+                    close = buf.find("```", i + 3)
+                    if close == -1:
+                        # Wait for the end of the code block, then drop it.
+                        return n if final else self._wait(i)
+                    return close + 3
+            elif ch == "\n":
+                if buf[:i].strip():
+                    return i + 1
+            elif ch in SENTENCE_END or ch == ".":
+                j = i + 1
+                if ch == ".":
+                    while j < n and buf[j] == ".":
+                        j += 1
+                while j < n and buf[j] in CLOSERS:
+                    j += 1
+                if j >= n:
+                    # Need the next character to tell "3." from "3.5" or "Dr." from an end.
+                    return n if final else self._wait(i)
+                if j - i > 1 and buf[i + 1] == ".":
+                    # Ellipsis: a pause, unless the next word starts a new sentence.
+                    rest = buf[j:].lstrip()
+                    if not rest:
+                        return n if final else self._wait(i)
+                    if buf[j].isspace() and rest[0].isupper():
+                        return j
+                elif buf[j].isspace() and (ch != "." or self._ends_sentence(buf, i)):
+                    return j
+                i = j
+                continue
+            else:
+                # A clause boundary, only considered for the first segment.
+                if i + 1 >= n:
+                    return n if final else self._wait(i)
+                if buf[i + 1].isspace() and len(buf[:i].split()) >= FIRST_CLAUSE_MIN_WORDS:
+                    return i + 1
+            i += 1
+        return n if final else self._wait(n)
+
+    def _wait(self, position: int):
+        self._scan_from = position
+        return None
+
+    @staticmethod
+    def _ends_sentence(buf: str, dot: int) -> bool:
+        """Whether the period at buf[dot], followed by whitespace, ends a sentence."""
+        start = dot
+        while start > 0 and (buf[start - 1].isalnum() or buf[start - 1] == "."):
+            start -= 1
+        word = buf[start:dot].lower()
+        if word in ABBREVIATIONS:
+            return False
+        if len(word) == 1 and word.isalpha():
+            # An initial ("A. P. J. Abdul Kalam").
+            return False
+        if word.isdigit() and (start == 0 or buf[start - 1] == "\n"):
+            # A numbered list marker ("1. ").
+            return False
+        return True
+
+
+class SpokenBudget:
+    """
+    Admits whole segments until the reply has used up max_words of speech.
+    The first segment is always spoken, however long.
+    """
+
+    def __init__(self, max_words: int = 40):
+        self.max_words = max_words
+        self.words = 0
+        self.exhausted = False
+
+    def admit(self, segment: str) -> bool:
+        if self.exhausted:
+            return False
+        words = len(segment.split())
+        if self.words and self.words + words > self.max_words:
+            self.exhausted = True
+            return False
+        self.words += words
+        return True
@@ -0,0 +1,109 @@
+# tts/textCondenser.py
+
+"""
+Local, extractive condensing of a long reply into something short enough to
+speak.
+
+This replaces the extra LLM round trip of summarize_text_async for the
+common case. Markdown is stripped, lists, tables and code are dropped (they
+read badly aloud anyway, though a reply that is nothing but a list keeps
+it), and the remaining sentences are ranked by:
+
+  - position: replies lead with the point, so earlier sentences score higher
+  - centrality: how much of the reply's vocabulary a sentence shares
+  - questions: a reply that ends by asking something should still ask it
+
+The best sentences that fit the word budget are spoken in their original
+order. The first sentence is always kept. Runs in well under a millisecond
+for a typical reply.
+"""
+
+import re
+from collections import Counter
+
+from tts.sentenceSegmenter import SentenceSegmenter
+
+_CODE_BLOCK = re.compile(r"```.*?(```|$)", re.DOTALL)
+_LIST_LINE = re.compile(r"^\s*(?:[-*+•]|\d+[.)])\s+.*$", re.MULTILINE)
+_TABLE_LINE = re.compile(r"^\s*\|.*$", re.MULTILINE)
+_HEADER_LINE = re.compile(r"^\s*#{1,6}\s.*$", re.MULTILINE)
+_EMOJI = re.compile("[\U0001F000-\U0001FAFF\u2600-\u27BF\uFE0F\u200D]")
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+# Common English and Hinglish function words, ignored for centrality.
+STOPWORDS = {
+    "the", "a", "an", "and", "or", "but", "so", "to", "of", "in", "on", "at", "for", "with", "is",
+    "are", "was", "were", "be", "it", "its", "this", "that", "i", "you", "your", "me", "my", "we",
+    "our", "he", "she", "they", "them", "as", "by", "from", "if", "not", "do", "does", "just",
+    "like", "what", "can", "will", "have", "has", "had", "about", "let", "lets", "s", "m", "re",
+    "hai", "hain", "ho", "ka", "ki", "ke", "ko", "se", "me", "mein", "aur", "bhi", "toh", "to",
+    "kya", "na", "nahi", "yeh", "woh", "ye", "wo", "tha", "thi", "ek", "hi",
+}
+
+
+def speakable_sentences(text: str, keep_lists: bool = False) -> list:
+    """The reply's prose sentences with markdown, tables, code, emoji and (unless keep_lists) lists removed."""
+    text = _CODE_BLOCK.sub("\n", text)
+    if not keep_lists:
+        text = _LIST_LINE.sub("", text)
+    text = _TABLE_LINE.sub("", text)
+    text = _HEADER_LINE.sub("", text)
+    text = _EMOJI.sub("", text)
+    segmenter = SentenceSegmenter(first_clause=False)
+    sentences = segmenter.feed(text) + segmenter.flush()
+    # List items and headings often lack a full stop; give them one so they don't run together.
+    return [s if s[-1] in ".!?:।॥…" else s + "." for s in sentences]
+
+
+def _truncate(sentence: str, max_words: int) -> str:
+    """Cuts an over-long sentence at the last clause boundary within the budget."""
+    words = sentence.split()
+    if len(words) <= max_words:
+        return sentence
+    head = " ".join(words[:max_words])
+    cut = max(head.rfind(","), head.rfind(";"), head.rfind(":"), head.rfind(" —"))
+    if cut > len(head) // 2:
+        head = head[:cut]
+    return head.rstrip(" ,;:—") + "."
+
+
+def condense(text: str, max_words: int = 30) -> str:
+    """
+    Returns a speakable version of `text` of at most `max_words` words
+    (empty if the reply has no prose, e.g. only code or a list).
+    """
+    sentences = speakable_sentences(text)
+    if _LIST_LINE.search(text):
+        # Without its list, "Here are the key points:" introduces nothing.
+        sentences = [s for s in sentences if not s.endswith(":")]
+        if sum(len(s.split()) for s in sentences) < max_words // 2:
+            # The list *is* the answer; speak its first items instead.
+            sentences = speakable_sentences(text, keep_lists=True)
+    sentences = list(dict.fromkeys(sentences))
+    if not sentences:
+        return ""
+    lengths = [len(s.split()) for s in sentences]
+    if sum(lengths) <= max_words:
+        return " ".join(sentences)
+
+    tokens = [[w for w in _WORD.findall(s.lower()) if w not in STOPWORDS] for s in sentences]
+    frequency = Counter(w for sentence_tokens in tokens for w in set(sentence_tokens))
+    scores = []
+    for i, sentence_tokens in enumerate(tokens):
+        centrality = sum(frequency[w] - 1 for w in sentence_tokens) / (len(sentence_tokens) + 1)
+        score = 1.0 / (1 + i) + 0.15 * centrality
+        if sentences[i].endswith("?"):
+            score += 0.3
+        if lengths[i] < 3:
+            score -= 0.3
+        scores.append(score)
+
+    chosen = {0}
+    words = lengths[0]
+    for i in sorted(range(1, len(sentences)), key=lambda k: -scores[k]):
+        if words + lengths[i] <= max_words:
+            chosen.add(i)
+            words += lengths[i]
+
+    condensed = " ".join(sentences[i] for i in sorted(chosen))
+    return _truncate(condensed, max_words) if words > max_words else condensed
@@ -0,0 +1,293 @@
+# tts/ttsCache.py
+
+"""
+Two-tier cache for synthesized speech.
+
+Identical sentences (greetings, stock apologies, short acknowledgements)
+come up again and again; there is no reason to pay ElevenLabs for them, or
+wait for them, more than once. Entries are keyed by a SHA-256 of everything
+that affects the audio: voice id, model id, output format, voice settings
+and the normalized text.
+
+  memory  an LRU of recent entries, bounded by total bytes
+  disk    one file per entry under TTS_CACHE_DIR, bounded by total bytes,
+          evicted least-recently-used first; survives restarts
+
+Each entry keeps the audio chunks as the provider streamed them, and a hit
+replays the same chunks, so the client sees exactly what a live response
+looks like. Concurrent requests for the same key share a single upstream
+synthesis: the first one starts it, the others follow along as chunks
+arrive. If every listener goes away (barge-in), the synthesis is cancelled
+and nothing is stored.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import struct
+import unicodedata
+from collections import OrderedDict
+
+_CHUNK_HEADER = struct.Struct("<I")
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(voice_id: str, model_id: str, text: str, voice_settings: dict = None, output_format: str = None) -> str:
+    material = json.dumps([voice_id, model_id, output_format, voice_settings, normalize_text(text)],
+                          sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class _Synthesis:
+    """One upstream synthesis in progress, shared by everyone asking for its key."""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.failed = False
+        self.cancelled = False
+        self.listeners = 0
+        self.task = None
+        self._changed = asyncio.Event()
+
+    def append(self, chunk: bytes):
+        self.chunks.append(chunk)
+        self._notify()
+
+    def finish(self, failed: bool = False):
+        self.done = True
+        self.failed = failed
+        self._notify()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self):
+        i = 0
+        while True:
+            while i < len(self.chunks):
+                yield self.chunks[i]
+                i += 1
+            if self.done:
+                return
+            await self._changed.wait()
+
+
+class TTSCache:
+    def __init__(self, directory: str, memory_bytes: int = 32 << 20, disk_bytes: int = 256 << 20):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._disk = OrderedDict()
+        self._disk_size = 0
+        self._in_flight = {}
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.coalesced = 0
+        self.misses = 0
+        self.bytes_served_from_cache = 0
+        self._load_disk_index()
+
+    @classmethod
+    def from_env(cls):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        return cls(
+            os.getenv("TTS_CACHE_DIR", os.path.join(root, ".cache", "tts")),
+            memory_bytes=int(float(os.getenv("TTS_CACHE_MEMORY_MB", "32")) * (1 << 20)),
+            disk_bytes=int(float(os.getenv("TTS_CACHE_DISK_MB", "256")) * (1 << 20)),
+        )
+
+    # --- Public API ---
+
+    async def stream(self, key: str, synthesize):
+        """
+        Yields the audio chunks for `key`: from memory, from disk, from a
+        synthesis already in progress, or by calling synthesize() (an async
+        generator of chunks that raises on failure).
+        """
+        chunks = self._memory.get(key)
+        if chunks is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            for chunk in chunks:
+                self.bytes_served_from_cache += len(chunk)
+                yield chunk
+            return
+
+        if key in self._disk:
+            chunks = await asyncio.to_thread(self._read, key)
+            if chunks is None:
+                self._disk_size -= self._disk.pop(key, 0)
+            else:
+                self.disk_hits += 1
+                self._disk.move_to_end(key)
+                self._remember(key, chunks)
+                for chunk in chunks:
+                    self.bytes_served_from_cache += len(chunk)
+                    yield chunk
+                return
+
+        sent = 0
+        while True:
+            synthesis = self._join(key, synthesize)
+            try:
+                async for chunk in synthesis.follow():
+                    sent += 1
+                    yield chunk
+            finally:
+                synthesis.listeners -= 1
+                if not synthesis.listeners and not synthesis.done:
+                    # Nobody is listening any more (e.g. barge-in): stop paying for it.
+                    # Whoever asks for the key next starts a new synthesis.
+                    synthesis.cancelled = True
+                    self._forget(key, synthesis)
+                    synthesis.task.cancel()
+            if synthesis.cancelled and not sent:
+                # Joined a synthesis that was cancelled anyway: start over.
+                continue
+            if synthesis.failed:
+                raise RuntimeError("TTS synthesis failed")
+            return
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.disk_hits + self.coalesced
+        requests = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "hit_rate": round(hits / requests, 3) if requests else None,
+            "bytes_served_from_cache": self.bytes_served_from_cache,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_size,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_size,
+        }
+
+    # --- Upstream ---
+
+    def _join(self, key: str, synthesize) -> _Synthesis:
+        synthesis = self._in_flight.get(key)
+        if synthesis is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            synthesis = _Synthesis()
+            synthesis.task = asyncio.create_task(self._synthesize(key, synthesis, synthesize))
+            self._in_flight[key] = synthesis
+        synthesis.listeners += 1
+        return synthesis
+
+    def _forget(self, key: str, synthesis: _Synthesis):
+        if self._in_flight.get(key) is synthesis:
+            del self._in_flight[key]
+
+    async def _synthesize(self, key: str, synthesis: _Synthesis, synthesize):
+        try:
+            async for chunk in synthesize():
+                synthesis.append(chunk)
+        except asyncio.CancelledError:
+            synthesis.cancelled = True
+            synthesis.finish(failed=True)
+            raise
+        except Exception as e:
+            logging.error(f"TTS synthesis failed: {e}")
+            synthesis.finish(failed=True)
+        else:
+            synthesis.finish()
+            if synthesis.chunks:
+                self._remember(key, synthesis.chunks)
+                await self._store(key, synthesis.chunks)
+        finally:
+            self._forget(key, synthesis)
+
+    # --- Memory tier ---
+
+    def _remember(self, key: str, chunks: list):
+        size = sum(len(c) for c in chunks)
+        if size > self.memory_bytes:
+            return
+        replaced = self._memory.pop(key, None)
+        if replaced is not None:
+            self._memory_size -= sum(len(c) for c in replaced)
+        self._memory[key] = chunks
+        self._memory_size += size
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= sum(len(c) for c in evicted)
+
+    # --- Disk tier (file I/O runs on worker threads; the index stays on the loop) ---
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".chunks")
+
+    def _load_disk_index(self):
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.name.endswith(".chunks")]
+        except FileNotFoundError:
+            return
+        # Oldest access first, so eviction order survives a restart.
+        for entry in sorted(entries, key=lambda e: e.stat().st_mtime):
+            size = entry.stat().st_size
+            self._disk[entry.name[:-len(".chunks")]] = size
+            self._disk_size += size
+
+    def _read(self, key: str):
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+            os.utime(self._path(key))
+        except OSError:
+            return None
+        chunks, offset = [], 0
+        while offset < len(data):
+            (length,) = _CHUNK_HEADER.unpack_from(data, offset)
+            offset += _CHUNK_HEADER.size
+            chunks.append(data[offset:offset + length])
+            offset += length
+        return chunks
+
+    def _write(self, key: str, data: bytes) -> bool:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+            return True
+        except OSError as e:
+            logging.warning(f"Could not write TTS cache entry: {e}")
+            return False
+
+    def _remove(self, keys: list):
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    async def _store(self, key: str, chunks: list):
+        """Writes an entry to disk and evicts the least recently used ones over budget."""
+        if key in self._disk:
+            return
+        data = b"".join(_CHUNK_HEADER.pack(len(c)) + c for c in chunks)
+        if len(data) > self.disk_bytes or not await asyncio.to_thread(self._write, key, data):
+            return
+        self._disk[key] = len(data)
+        self._disk_size += len(data)
+        evicted = []
+        while self._disk_size > self.disk_bytes:
+            old_key, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            evicted.append(old_key)
+        if evicted:
+            await asyncio.to_thread(self._remove, evicted)
@@ -9,5 +9,7 @@ from silero_vad.utils_vad import (get_speech_timestamps,
                                   save_audio,
                                   read_audio,
                                   VADIterator,
+                                  VADStreamState,
+                                  stream_forward,
                                   collect_chunks,
                                   drop_chunks)
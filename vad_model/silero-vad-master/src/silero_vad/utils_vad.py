@@ -22,8 +22,9 @@ class OnnxWrapper():
         else:
             self.session = onnxruntime.InferenceSession(path, sess_options=opts)
 
+        self._input_names = {i.name for i in self.session.get_inputs()}
         self.reset_states()
-        if '16k' in path:
+        if '16k' in str(path) or 'sr' not in self._input_names:
             warnings.warn('This model support only 16000 sampling rate!')
             self.sample_rates = [16000]
         else:
@@ -75,21 +76,28 @@ class OnnxWrapper():
             self._context = torch.zeros(batch_size, context_size)
 
         x = torch.cat([self._context, x], dim=1)
-        if sr in [8000, 16000]:
-            ort_inputs = {'input': x.numpy(), 'state': self._state.numpy(), 'sr': np.array(sr, dtype='int64')}
-            ort_outs = self.session.run(None, ort_inputs)
-            out, state = ort_outs
-            self._state = torch.from_numpy(state)
-        else:
-            raise ValueError()
+        out, self._state = self.run_stateless(x, self._state, sr)
 
         self._context = x[..., -context_size:]
         self._last_sr = sr
         self._last_batch_size = batch_size
 
-        out = torch.from_numpy(out)
         return out
 
+    def run_stateless(self, x, state, sr: int):
+        """
+        Runs one step on context-prefixed input `x` with an explicit recurrent
+        `state`, returning (out, new_state). The wrapper itself is not touched,
+        so one session can serve any number of streams and threads.
+        """
+        if sr not in [8000, 16000]:
+            raise ValueError()
+        ort_inputs = {'input': x.numpy(), 'state': state.numpy()}
+        if 'sr' in self._input_names:
+            ort_inputs['sr'] = np.array(sr, dtype='int64')
+        out, state = self.session.run(None, ort_inputs)
+        return torch.from_numpy(out), torch.from_numpy(state)
+
     def audio_forward(self, x, sr: int):
         outs = []
         x, sr = self._validate_input(x, sr)
@@ -134,6 +142,105 @@ class Validator():
         return outs
 
 
+class VADStreamState():
+    """
+    Recurrent state of one audio stream (or a batch of streams), kept outside
+    the model so a single loaded model can serve any number of streams.
+
+    Holds the model state tensor, the audio context carried over from the
+    previous window and the number of samples processed so far. A 16 kHz
+    stream takes roughly 1.3 KB.
+    """
+
+    def __init__(self, sampling_rate: int = 16000, batch_size: int = 1):
+        if sampling_rate not in [8000, 16000]:
+            raise ValueError('VADStreamState does not support sampling rates other than [8000, 16000]')
+        self.sampling_rate = sampling_rate
+        self.batch_size = batch_size
+        self.context_size = 64 if sampling_rate == 16000 else 32
+        self.reset()
+
+    def reset(self):
+        self.state = torch.zeros((2, self.batch_size, 128)).float()
+        self.context = torch.zeros(self.batch_size, self.context_size)
+        self.current_sample = 0
+
+    @classmethod
+    def stack(cls, states: List['VADStreamState']) -> 'VADStreamState':
+        """Combines single-stream states into one batch state (row order is kept)"""
+        batch = cls.__new__(cls)
+        batch.sampling_rate = states[0].sampling_rate
+        batch.batch_size = len(states)
+        batch.context_size = states[0].context_size
+        batch.state = torch.cat([s.state for s in states], dim=1)
+        batch.context = torch.cat([s.context for s in states], dim=0)
+        batch.current_sample = 0
+        return batch
+
+    def scatter(self, states: List['VADStreamState'], window_size_samples: int):
+        """Writes the rows of this batch state back into the single-stream states"""
+        for i, s in enumerate(states):
+            s.state = self.state[:, i:i+1]
+            s.context = self.context[i:i+1]
+            s.current_sample += window_size_samples
+
+
+@torch.no_grad()
+def stream_forward(model, x: torch.Tensor, stream_state, sampling_rate: int = 16000) -> torch.Tensor:
+    """
+    Stateless forward pass of a .jit/.onnx silero VAD model.
+
+    Parameters
+    ----------
+    model: preloaded .jit/.onnx silero VAD model
+        Only read, never mutated; safe to share between streams and threads
+
+    x: torch.Tensor
+        audio chunk of 512 (16 kHz) or 256 (8 kHz) samples, shape [N] or [batch, N]
+
+    stream_state: VADStreamState or list of VADStreamState
+        state of the stream(s); a list is stacked into one batch and updated in place
+
+    sampling_rate: int (default - 16000)
+
+    Returns
+    ----------
+    speech probabilities, torch.Tensor of shape [batch, 1]
+    """
+    if isinstance(stream_state, list):
+        batch = VADStreamState.stack(stream_state)
+        out = stream_forward(model, x, batch, sampling_rate)
+        batch.scatter(stream_state, x.shape[-1])
+        return out
+
+    if x.dim() == 1:
+        x = x.unsqueeze(0)
+    if x.dim() > 2:
+        raise ValueError(f"Too many dimensions for input audio chunk {x.dim()}")
+    if sampling_rate != 16000 and (sampling_rate % 16000 == 0):
+        x = x[:, ::sampling_rate // 16000]
+        sampling_rate = 16000
+    if sampling_rate not in model.sample_rates or sampling_rate != stream_state.sampling_rate:
+        raise ValueError(f"Supported sampling rates: {model.sample_rates} (or multiply of 16000), stream expects {stream_state.sampling_rate}")
+
+    num_samples = 512 if sampling_rate == 16000 else 256
+    if x.shape[-1] != num_samples:
+        raise ValueError(f"Provided number of samples is {x.shape[-1]} (Supported values: 256 for 8000 sample rate, 512 for 16000)")
+    if x.shape[0] != stream_state.batch_size:
+        raise ValueError(f"Batch size {x.shape[0]} does not match stream state batch size {stream_state.batch_size}")
+
+    x = torch.cat([stream_state.context, x], dim=1)
+    if isinstance(model, OnnxWrapper):
+        out, stream_state.state = model.run_stateless(x, stream_state.state, sampling_rate)
+    else:
+        jit_model = model._model if sampling_rate == 16000 else model._model_8k
+        out, stream_state.state = jit_model(x, stream_state.state)
+
+    stream_state.context = x[..., -stream_state.context_size:]
+    stream_state.current_sample += num_samples
+    return out
+
+
 def read_audio(path: str,
                sampling_rate: int = 16000):
     list_backends = torchaudio.list_audio_backends()
@@ -434,14 +541,19 @@ class VADIterator:
 
         self.min_silence_samples = sampling_rate * min_silence_duration_ms / 1000
         self.speech_pad_samples = sampling_rate * speech_pad_ms / 1000
+        # The model is shared read-only; everything stream-specific lives here.
+        self.stream = VADStreamState(sampling_rate)
         self.reset_states()
 
+    @property
+    def current_sample(self):
+        return self.stream.current_sample
+
     def reset_states(self):
 
-        self.model.reset_states()
+        self.stream.reset()
         self.triggered = False
         self.temp_end = 0
-        self.current_sample = 0
 
     @torch.no_grad()
     def __call__(self, x, return_seconds=False, time_resolution: int = 1):
@@ -463,9 +575,7 @@ class VADIterator:
                 raise TypeError("Audio cannot be casted to tensor. Cast it manually")
 
         window_size_samples = len(x[0]) if x.dim() == 2 else len(x)
-        self.current_sample += window_size_samples
-
-        speech_prob = self.model(x, self.sampling_rate).item()
+        speech_prob = stream_forward(self.model, x, self.stream, self.sampling_rate).item()
 
         if (speech_prob >= self.threshold) and self.temp_end:
             self.temp_end = 0
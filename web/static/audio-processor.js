@@ -1,10 +1,50 @@
+// Batches 128-sample render quanta into fixed-duration int16 frames and posts
+// each one as a ready-to-send binary WebSocket frame (see audio/framing.py).
+const FRAME_HEADER_SIZE = 8;
+const FORMAT_PCM16 = 0;
+
 class AudioProcessor extends AudioWorkletProcessor {
+  constructor(options) {
+    super();
+    const frameMs = options.processorOptions?.frameMs ?? 32;
+    this.frameSamples = Math.round(sampleRate * frameMs / 1000);
+    this.sequence = 0;
+    this.newFrame();
+  }
+
+  newFrame() {
+    this.frame = new ArrayBuffer(FRAME_HEADER_SIZE + this.frameSamples * 2);
+    const header = new DataView(this.frame);
+    header.setUint8(0, 0x56); // 'V'
+    header.setUint8(1, 0x41); // 'A'
+    header.setUint8(2, 1);    // protocol version
+    header.setUint8(3, FORMAT_PCM16);
+    header.setUint32(4, this.sequence, true);
+    this.samples = new Int16Array(this.frame, FRAME_HEADER_SIZE, this.frameSamples);
+    this.filled = 0;
+  }
+
   process(inputs) {
     const inputChannel = inputs[0][0];
-    if (inputChannel) {
-      this.port.postMessage(inputChannel.buffer, [inputChannel.buffer]);
+    if (!inputChannel) return true;
+
+    let offset = 0;
+    while (offset < inputChannel.length) {
+      const count = Math.min(inputChannel.length - offset, this.frameSamples - this.filled);
+      for (let i = 0; i < count; i++) {
+        const s = Math.max(-1, Math.min(1, inputChannel[offset + i]));
+        this.samples[this.filled + i] = s < 0 ? s * 0x8000 : s * 0x7FFF;
+      }
+      this.filled += count;
+      offset += count;
+
+      if (this.filled === this.frameSamples) {
+        this.port.postMessage(this.frame, [this.frame]);
+        this.sequence = (this.sequence + 1) >>> 0;
+        this.newFrame();
+      }
     }
     return true;
   }
 }
-registerProcessor('audio-processor', AudioProcessor);
\ No newline at end of file
+registerProcessor('audio-processor', AudioProcessor);
@@ -57,6 +57,11 @@ document.addEventListener('DOMContentLoaded', () => {
     let isAiSpeaking = false, isMuted = false;
     let currentAiMessageElement = null;
     let aiSpeakingAnimationId;
+    let ttsEndTimeout, playbackGeneration = 0;
+
+    // Mic audio is batched into binary frames of this duration (20-32 ms works well).
+    const AUDIO_FRAME_MS = 32;
+    const AUDIO_FRAME_HEADER_SIZE = 8;
 
     // --- SCREEN MANAGEMENT LOGIC ---
     if (document.getElementById('model-select-screen').classList.contains('active')) {
@@ -152,19 +157,22 @@ document.addEventListener('DOMContentLoaded', () => {
             mediaStream = await navigator.mediaDevices.getUserMedia({ audio: { sampleRate: 16000, channelCount: 1, echoCancellation: true, noiseSuppression: true } });
             audioContext = new AudioContext({ sampleRate: 16000 });
             await audioContext.audioWorklet.addModule('/static/audio-processor.js');
-            workletNode = new AudioWorkletNode(audioContext, 'audio-processor');
+            workletNode = new AudioWorkletNode(audioContext, 'audio-processor', {
+                processorOptions: { frameMs: AUDIO_FRAME_MS }
+            });
             workletNode.port.onmessage = (event) => {
-                if (isMuted || isAiSpeaking || audioQueue.length > 0 || socket?.readyState !== WebSocket.OPEN) {
-                    // console.log("Gating audio: Muted:", isMuted, "AiSpeaking:", isAiSpeaking, "Queue:", audioQueue.length);
+                // Mic audio keeps flowing while the AI speaks so the server can
+                // detect barge-in; echo cancellation keeps the AI's own voice out.
+                if (isMuted || socket?.readyState !== WebSocket.OPEN) {
                     return;
                 }
                 
-                const audioBuffer = event.data;
-                const base64Data = btoa(String.fromCharCode.apply(null, new Uint8Array(audioBuffer)));
-                socket.send(JSON.stringify({ type: 'audio_chunk', data: base64Data }));
+                // The worklet posts a complete binary frame (header + int16 PCM).
+                const audioFrame = event.data;
+                socket.send(audioFrame);
 
-                const floatArray = new Float32Array(audioBuffer);
-                const avgVolume = floatArray.reduce((a, b) => a + Math.abs(b), 0) / floatArray.length;
+                const pcm = new Int16Array(audioFrame, AUDIO_FRAME_HEADER_SIZE);
+                const avgVolume = pcm.reduce((a, b) => a + Math.abs(b), 0) / pcm.length / 32768;
                 let scale = 1 + avgVolume * 8;
                 scale = Math.min(scale, 1.3);
                 callVisualizer.style.transform = `scale(${scale})`;
@@ -177,6 +185,9 @@ document.addEventListener('DOMContentLoaded', () => {
     };
 
     function setupAudioPlayback() {
+        if (audioElement) { audioElement.pause(); URL.revokeObjectURL(audioElement.src); }
+        audioQueue = []; isAppending = false; sourceBuffer = null;
+        playbackGeneration++;
         audioElement = new Audio();
         mediaSource = new MediaSource();
         audioElement.src = URL.createObjectURL(mediaSource);
@@ -196,15 +207,46 @@ document.addEventListener('DOMContentLoaded', () => {
         sourceBuffer.appendBuffer(audioChunk);
     }
 
+    function playbackDrained() {
+        if (!audioElement || audioQueue.length > 0 || isAppending || (sourceBuffer && sourceBuffer.updating)) {
+            return !audioElement;
+        }
+        const buffered = audioElement.buffered;
+        return buffered.length === 0 || audioElement.currentTime >= buffered.end(buffered.length - 1) - 0.05;
+    }
+
+    function waitForPlaybackEnd() {
+        if (!playbackDrained()) {
+            ttsEndTimeout = setTimeout(waitForPlaybackEnd, 100);
+            return;
+        }
+        isAiSpeaking = false;
+        updateStatusIndicator('listening');
+        stopAiSpeakingAnimation();
+        // Until this arrives the server treats the user's speech as barge-in (or ignores it).
+        if (socket?.readyState === WebSocket.OPEN) {
+            socket.send(JSON.stringify({ type: 'playback_ended' }));
+        }
+    }
+
     function handleSocketMessage(event) {
         if (event.data instanceof Blob) {
             if (audioElement.paused) { audioElement.play().catch(e => console.error("Audio play failed:", e)); }
             const reader = new FileReader();
-            reader.onload = function() { audioQueue.push(reader.result); processAudioQueue(); };
+            const generation = playbackGeneration;
+            reader.onload = function() {
+                // Skip chunks that were still being read when playback was flushed.
+                if (generation !== playbackGeneration) return;
+                audioQueue.push(reader.result); processAudioQueue();
+            };
             reader.readAsArrayBuffer(event.data);
         } else {
             const msg = JSON.parse(event.data);
-            if (msg.type === 'user_transcript') {
+            if (msg.type === 'greeting') {
+                // Sent (with its pre-rendered audio) the moment the call connects.
+                addMessageToChatLog('ai', msg.data);
+                currentAiMessageElement = null;
+            } else if (msg.type === 'user_transcript') {
                 addMessageToChatLog('user', msg.data);
                 currentAiMessageElement = null;
                 updateStatusIndicator('processing');
@@ -224,15 +266,22 @@ document.addEventListener('DOMContentLoaded', () => {
                 }
                 chatLog.scrollTop = chatLog.scrollHeight;
             } else if (msg.type === 'tts_start') {
+                clearTimeout(ttsEndTimeout);
                 isAiSpeaking = true;
                 updateStatusIndicator('speaking');
                 startAiSpeakingAnimation();
+            } else if (msg.type === 'tts_flush') {
+                // The user interrupted: drop the rest of the reply's audio.
+                clearTimeout(ttsEndTimeout);
+                setupAudioPlayback();
+                isAiSpeaking = false;
+                currentAiMessageElement = null;
+                updateStatusIndicator('listening');
+                stopAiSpeakingAnimation();
             } else if (msg.type === 'tts_end') {
-                setTimeout(() => {
-                    isAiSpeaking = false;
-                    updateStatusIndicator('listening');
-                    stopAiSpeakingAnimation();
-                }, 2000); 
+                // All audio is sent, but the AI is speaking until it has played.
+                clearTimeout(ttsEndTimeout);
+                waitForPlaybackEnd();
             }
         }
     }
@@ -242,6 +291,7 @@ document.addEventListener('DOMContentLoaded', () => {
         connectionChime.pause(); connectionChime.currentTime = 0;
         if (audioElement) { audioElement.pause(); audioElement.src = ''; }
         clearInterval(timerInterval);
+        clearTimeout(ttsEndTimeout);
         seconds = 0;
         if (workletNode) workletNode.port.close();
         if (mediaStream) mediaStream.getTracks().forEach(track => track.stop());